@@ -0,0 +1,151 @@
+# ASGI flavour of the API, with the same /api/check contract as main.py, for many concurrent connections:
+#   WEB_CONCURRENCY=4 gunicorn --preload -k uvicorn.workers.UvicornWorker asgi:app
+# Dictionaries are loaded once at import. With --preload, this happens in the master before the workers are forked,
+# and each worker forks its checking processes in turn: they all share the dictionaries memory, copy on write
+# (and the compiled index through the OS cache).
+# Checks are CPU bound, so the event loop hands them to a bounded pool of processes and stays free to accept
+# connections.
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import json
+import math
+import multiprocessing
+import os
+
+from passwordChecker.admission import BatchTooLarge, check_batch_size, check_password_length, DEFAULT_MAX_BATCH_SIZE, \
+    DEFAULT_MAX_PASSWORD_LENGTH, PasswordTooLong, RateLimited, SharedRateLimiter
+from passwordChecker.budget import DEFAULT_MAX_STEPS
+from passwordChecker.robustness import CheckPipeline, compute_robustness, compute_robustness_batch, PasswordPolicy
+from passwordChecker.service import create_dictionary_checker
+
+# next to this module, whatever the working directory of the server
+resources = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources')
+
+# MAX_EDIT_DISTANCE and MIN_EMBEDDED_LENGTH enable the fuzzy matching and the embedded words, MAX_WORK bounds the
+# search of each password, LOAD_PROCESSES projects the dictionary files in parallel and COMPACT packs them, as in main.py
+dico_checker = create_dictionary_checker(resources, max_edit_distance=int(os.environ.get('MAX_EDIT_DISTANCE', 0)),
+                                         min_embedded_length=int(os.environ.get('MIN_EMBEDDED_LENGTH', 0)),
+                                         max_work=int(os.environ.get('MAX_WORK', DEFAULT_MAX_STEPS)) or None,
+                                         load_processes=int(os.environ.get('LOAD_PROCESSES', 1)),
+                                         compact=bool(os.environ.get('COMPACT')))
+print(f'Dictionaries {dico_checker}')
+
+# MIN_LENGTH_SCORE and ALLOW_DICTIONARY_WORDS set the verdict of the checks, "fastVerdict" being accepted as in main.py
+check_policy = PasswordPolicy(min_length_score=int(os.environ.get('MIN_LENGTH_SCORE', 16)),
+                              allow_dictionary_words=bool(os.environ.get('ALLOW_DICTIONARY_WORDS')))
+check_pipeline = CheckPipeline(policy=check_policy)
+
+# checking processes per worker, by default the cpus shared among the WEB_CONCURRENCY workers (the workers count read
+# by gunicorn and uvicorn), and the checks waiting for one of them beyond which requests wait to be admitted
+web_concurrency = int(os.environ.get('WEB_CONCURRENCY', 1))
+executor_processes = int(os.environ.get('CHECK_PROCESSES', max(1, multiprocessing.cpu_count() // web_concurrency)))
+max_pending_checks = int(os.environ.get('MAX_PENDING_CHECKS', 4 * executor_processes))
+
+# admission control, as in main.py: MAX_PASSWORD_LENGTH, MAX_BATCH_SIZE, and the per client RATE_LIMIT_PER_SECOND,
+# RATE_LIMIT_BURST and RATE_LIMIT_CLIENT_HEADER
+max_password_length = int(os.environ.get('MAX_PASSWORD_LENGTH', DEFAULT_MAX_PASSWORD_LENGTH)) or None
+max_batch_size = int(os.environ.get('MAX_BATCH_SIZE', DEFAULT_MAX_BATCH_SIZE)) or None
+rate_limiter = None
+if os.environ.get('RATE_LIMIT_PER_SECOND'):
+    rate_limit_burst = os.environ.get('RATE_LIMIT_BURST')
+    rate_limiter = SharedRateLimiter(float(os.environ['RATE_LIMIT_PER_SECOND']),
+                                     float(rate_limit_burst) if rate_limit_burst else None)
+rate_limit_client_header = os.environ.get('RATE_LIMIT_CLIENT_HEADER', '').lower().encode('latin-1')
+
+_executor = None
+_pending_checks = None
+
+
+def _check(password: str, fast_verdict: bool = False):
+    return compute_robustness(password, dico_checker, pipeline=check_pipeline, fast_verdict=fast_verdict).serialize()
+
+
+def _check_batch(passwords: list):
+    return [r.serialize() for r in compute_robustness_batch(passwords, dico_checker, pipeline=check_pipeline)]
+
+
+def _start_executor():
+    global _executor, _pending_checks
+    # created in each worker, after the fork: the pool threads would not survive it
+    _executor = ProcessPoolExecutor(executor_processes, mp_context=multiprocessing.get_context('fork'))
+    _pending_checks = asyncio.Semaphore(max_pending_checks)
+
+
+async def _run_check(function, *args):
+    if _executor is None:
+        # the server did not run the lifespan startup
+        _start_executor()
+    async with _pending_checks:
+        return await asyncio.get_running_loop().run_in_executor(_executor, function, *args)
+
+
+async def _read_json(receive):
+    body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+    return json.loads(body)
+
+
+def _client_id(scope):
+    for name, value in scope.get('headers', ()):
+        if rate_limit_client_header and name == rate_limit_client_header:
+            # the last address is the one appended by the proxy in front of the API
+            return value.decode('latin-1').split(',')[-1].strip()
+    return scope['client'][0] if scope.get('client') else None
+
+
+async def _respond(send, status: int, payload, headers: list = ()):
+    body = json.dumps(payload).encode('utf-8')
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode()),
+                            *headers]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            _start_executor()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if _executor is not None:
+                _executor.shutdown()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+
+    if scope['type'] != 'http':
+        return
+    if scope['method'] != 'POST' or scope['path'] not in ('/api/check', '/api/check/batch'):
+        return await _respond(send, 404, {'error': 'not found'})
+
+    try:
+        body = await _read_json(receive)
+        passwords = [body['password']] if scope['path'] == '/api/check' else body['passwords']
+        # refused before any work is handed to the checking processes
+        check_batch_size(passwords, max_batch_size)
+        if rate_limiter is not None:
+            retry_after = rate_limiter.admit(_client_id(scope), len(passwords))
+            if retry_after:
+                raise RateLimited(retry_after)
+        for password in passwords:
+            check_password_length(password, max_password_length)
+        if scope['path'] == '/api/check':
+            result = await _run_check(_check, body['password'], bool(body.get('fastVerdict')))
+        else:
+            result = {'results': await _run_check(_check_batch, body['passwords'])}
+    except RateLimited as e:
+        return await _respond(send, 429, {'error': str(e)}, [(b'retry-after', str(math.ceil(e.retry_after)).encode())])
+    except (PasswordTooLong, BatchTooLarge) as e:
+        return await _respond(send, 413, {'error': str(e)})
+    except (ValueError, KeyError, TypeError) as e:
+        return await _respond(send, 400, {'error': str(e)})
+    await _respond(send, 200, result)
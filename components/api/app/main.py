@@ -1,24 +1,286 @@
-from flask import Flask, request, jsonify
+import json
+import math
+import os
+import re
+import secrets
+import time
 
-from passwordChecker.dictionary import DictionaryChecker
-from passwordChecker.robustness import compute_robustness
-from passwordChecker.substitute import CharacterProjector, ScramblingParams
+from flask import Flask, Response, abort, g, request, jsonify, send_from_directory, stream_with_context
+
+from passwordChecker.admission import BatchTooLarge, check_batch_size, check_password_length, DEFAULT_MAX_BATCH_SIZE, \
+    DEFAULT_MAX_PASSWORD_LENGTH, PasswordTooLong, RateLimited, SharedRateLimiter, SingleFlight
+from passwordChecker.budget import DEFAULT_MAX_STEPS
+from passwordChecker.cache import RobustnessCache
+from passwordChecker.metrics import Gauge, Histogram, MetricsRegistry, instrument
+from passwordChecker.robustness import CheckPipeline, compute_robustness, compute_robustness_batch, iter_robustness, \
+    PasswordPolicy
+from passwordChecker.service import create_dictionary_checker, DictionaryChanges, DictionaryReloader
+from passwordChecker.session import SessionStore
 
 app = Flask(__name__, static_url_path='')
 
-character_projector = CharacterProjector(scrambling_params=ScramblingParams(max_trailing=4))
-dico_checker = DictionaryChecker(character_projector=character_projector)
+# next to this module, whatever the working directory of the server
+resources = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources')
 
-dico_checker.load_all_dictionaries('resources/dictionaries')
+# MAX_EDIT_DISTANCE enables the fuzzy matching, e.g. 1 to report the dictionary words one typo away, and
+# MIN_EMBEDDED_LENGTH the search of words within the passwords, e.g. 4 to report the words of 4 characters or more.
+# MAX_WORK bounds the steps the search of one password takes, 0 for no limit.
+# LOAD_PROCESSES projects the dictionary files in that many processes (0 for the cpu count), 1 by default not to fork
+# from the uWSGI master, and COMPACT holds each of them packed (see passwordChecker.dictionary.CompactDictionary)
+dico_checker = create_dictionary_checker(resources, max_edit_distance=int(os.environ.get('MAX_EDIT_DISTANCE', 0)),
+                                         min_embedded_length=int(os.environ.get('MIN_EMBEDDED_LENGTH', 0)),
+                                         max_work=int(os.environ.get('MAX_WORK', DEFAULT_MAX_STEPS)) or None,
+                                         load_processes=int(os.environ.get('LOAD_PROCESSES', 1)),
+                                         compact=bool(os.environ.get('COMPACT')))
 print(f'Dictionaries {dico_checker}')
 
+robustness_cache = RobustnessCache(max_size=100000, ttl_seconds=3600)
+robustness_sessions = SessionStore(dico_checker, max_sessions=10000, ttl_seconds=300)
+
+# the checks tell whether a password is acceptable (see passwordChecker.robustness.PasswordPolicy): its length score
+# must reach MIN_LENGTH_SCORE, and it must not be found in a dictionary unless ALLOW_DICTIONARY_WORDS is set.
+# A check posted with "fastVerdict": true stops as soon as this is decided
+check_policy = PasswordPolicy(min_length_score=int(os.environ.get('MIN_LENGTH_SCORE', 16)),
+                              allow_dictionary_words=bool(os.environ.get('ALLOW_DICTIONARY_WORDS')))
+check_pipeline = CheckPipeline(policy=check_policy)
+
+# admission control (see passwordChecker.admission): the passwords longer than MAX_PASSWORD_LENGTH and the json
+# batches of more than MAX_BATCH_SIZE passwords are refused, and when RATE_LIMIT_PER_SECOND is set, each client gets
+# that many passwords checked per second, RATE_LIMIT_BURST at once.
+# Clients are told apart by their address, or behind a proxy by the last address of RATE_LIMIT_CLIENT_HEADER
+# (e.g. X-Forwarded-For). The buckets are shared by the workers forked after this module was loaded, as uWSGI does.
+# Concurrent checks of the same password share one computation, among the threads of a worker
+max_password_length = int(os.environ.get('MAX_PASSWORD_LENGTH', DEFAULT_MAX_PASSWORD_LENGTH)) or None
+max_batch_size = int(os.environ.get('MAX_BATCH_SIZE', DEFAULT_MAX_BATCH_SIZE)) or None
+rate_limiter = None
+if os.environ.get('RATE_LIMIT_PER_SECOND'):
+    rate_limit_burst = os.environ.get('RATE_LIMIT_BURST')
+    rate_limiter = SharedRateLimiter(float(os.environ['RATE_LIMIT_PER_SECOND']),
+                                     float(rate_limit_burst) if rate_limit_burst else None)
+rate_limit_client_header = os.environ.get('RATE_LIMIT_CLIENT_HEADER')
+check_flights = SingleFlight()
+
+# k-anonymity range buckets, built by python -m passwordChecker.ranges resources/dictionaries resources/ranges
+ranges_dir = os.path.join(resources, 'ranges')
+ranges_max_age = 24 * 3600
+
+# the admin endpoints are only open when a token is set.
+# Their changes are published to the workers forked after this module was loaded, as uWSGI does. Each worker builds the
+# new dictionaries in a background thread, started after the fork by its first request, and swaps them in when they
+# are ready: no request waits for them. With WATCH_DICTIONARIES_SECONDS, that thread checks the resources directory too
+admin_token = os.environ.get('ADMIN_TOKEN')
+dictionary_reloader = DictionaryReloader(dico_checker, resources, DictionaryChanges(),
+                                         watch_seconds=float(os.environ.get('WATCH_DICTIONARIES_SECONDS', 0)))
+
+
+@app.before_request
+def start_dictionary_reloader():
+    dictionary_reloader.start()
+
+
+# instrumentation is only installed when asked, it costs nothing otherwise
+metrics_registry = None
+if os.environ.get('METRICS'):
+    metrics_registry = MetricsRegistry()
+    instrument(metrics_registry)
+    request_durations = metrics_registry.register(Histogram(
+        'password_checker_request_duration_seconds', 'Time spent handling the API requests',
+        label_names=('endpoint',)))
+    metrics_registry.register(Gauge('password_checker_cache_entries', 'Results in the robustness cache',
+                                    lambda: len(robustness_cache)))
+    metrics_registry.register(Gauge('password_checker_cache_hits_total', 'Robustness cache hits',
+                                    lambda: robustness_cache.hits, metric_type='counter'))
+    metrics_registry.register(Gauge('password_checker_cache_misses_total', 'Robustness cache misses',
+                                    lambda: robustness_cache.misses, metric_type='counter'))
+    metrics_registry.register(Gauge('password_checker_sessions', 'Open type-ahead sessions',
+                                    lambda: len(robustness_sessions)))
+    metrics_registry.register(Gauge('password_checker_coalesced_checks_total',
+                                    'Checks sharing the computation of a concurrent identical one',
+                                    lambda: check_flights.shared, metric_type='counter'))
+    if rate_limiter is not None:
+        metrics_registry.register(Gauge('password_checker_rate_limited_total', 'Requests refused by the rate limiter',
+                                        lambda: rate_limiter.rejected, metric_type='counter'))
+
+    @app.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def observe_request_duration(response):
+        request_durations.observe(time.perf_counter() - g.request_start, request.endpoint or 'none')
+        return response
+
+
+def client_id():
+    if rate_limit_client_header and request.headers.get(rate_limit_client_header):
+        # the last address is the one appended by the proxy in front of the API, the others come from the client
+        return request.headers[rate_limit_client_header].split(',')[-1].strip()
+    return request.remote_addr
+
+
+def admit(passwords: list):
+    """
+    Refuse the passwords before any work, if their client went beyond its rate or if one of them is too long
+    """
+    if rate_limiter is not None:
+        retry_after = rate_limiter.admit(client_id(), len(passwords))
+        if retry_after:
+            raise RateLimited(retry_after)
+    for password in passwords:
+        check_password_length(password, max_password_length)
+
+
+@app.errorhandler(RateLimited)
+def too_many_requests(e):
+    response = jsonify({'error': str(e)})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(math.ceil(e.retry_after))
+    return response
+
+
+@app.errorhandler(PasswordTooLong)
+@app.errorhandler(BatchTooLarge)
+def password_too_long(e):
+    return jsonify({'error': str(e)}), 413
+
 
 @app.route('/api/check', methods=['POST'])
 def chek_password():
-    password = request.get_json()['password']
-    robustness = compute_robustness(password, dico_checker)
+    body = request.get_json()
+    password = body['password']
+    fast_verdict = bool(body.get('fastVerdict'))
+    admit([password])
+    robustness = check_flights.do((password, fast_verdict), lambda: compute_robustness(
+        password, dico_checker, robustness_cache, check_pipeline, fast_verdict))
     return jsonify(robustness.serialize())
 
 
+@app.route('/api/check/batch', methods=['POST'])
+def check_password_batch():
+    """
+    Either a json body {"passwords": [...]} of at most MAX_BATCH_SIZE passwords, answered with {"results": [...]},
+    or a application/x-ndjson stream of {"password": ...} lines, answered with one result per line, in the same order.
+    Each password counts for the rate limit; a stream stops with an {"error": ...} line at the first one refused, a
+    malformed line being answered with an {"error": ...} line of its own
+    """
+    if request.mimetype == 'application/x-ndjson':
+        def results():
+            # the passwords are handed one at a time to iter_robustness, so that a malformed line only gets its error
+            passwords = []
+            robustnesses = iter_robustness(iter(passwords.pop, None), dico_checker, robustness_cache, check_pipeline)
+            try:
+                for number, line in enumerate(request.stream, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        password = json.loads(line)['password']
+                        if not isinstance(password, str):
+                            raise TypeError(f'the password is a {type(password).__name__}, not a string')
+                    except (ValueError, KeyError, TypeError) as e:
+                        yield json.dumps({'error': f'malformed line {number}: {e!r}'}) + '\n'
+                        continue
+                    admit([password])
+                    passwords.append(password)
+                    yield json.dumps(next(robustnesses).serialize()) + '\n'
+            except (RateLimited, PasswordTooLong) as e:
+                yield json.dumps({'error': str(e)}) + '\n'
+
+        return Response(stream_with_context(results()), mimetype='application/x-ndjson')
+
+    passwords = request.get_json()['passwords']
+    check_batch_size(passwords, max_batch_size)
+    admit(passwords)
+    robustnesses = compute_robustness_batch(passwords, dico_checker, robustness_cache, check_pipeline)
+    return jsonify({'results': [r.serialize() for r in robustnesses]})
+
+
+@app.route('/api/check/session', methods=['POST'])
+def check_password_session():
+    """
+    For clients checking at each keystroke: {"sessionId": ..., "password": ...}, the sessionId being the one returned
+    by the previous call (none at first). Only the characters changed since the previous call are processed
+    """
+    body = request.get_json()
+    admit([body['password']])
+    session_id, session = robustness_sessions.get(body.get('sessionId'))
+    robustness = session.check(body['password'])
+    return jsonify({**robustness.serialize(), 'sessionId': session_id})
+
+
+def send_range_file(path: str, filename: str, mimetype: str):
+    response = send_from_directory(path, filename, mimetype=mimetype)
+    # static content, to be kept by any cache in front of the API
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = ranges_max_age
+    return response
+
+
+@app.route('/api/range/projection.json', methods=['GET'])
+def get_range_projection():
+    """
+    What clients need to build the candidates of a password and hash them (see passwordChecker.ranges)
+    """
+    return send_range_file(ranges_dir, 'projection.json', 'application/json')
+
+
+@app.route('/api/range/<prefix>', methods=['GET'])
+def get_range(prefix):
+    """
+    The '<suffix>:<dictionary mask>' lines of the hashed dictionary words starting with the prefix, so clients check
+    their password without sending it
+    """
+    if not re.fullmatch('[0-9A-Fa-f]+', prefix):
+        abort(404)
+    return send_range_file(f'{ranges_dir}/range', prefix.upper(), 'text/plain')
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    if metrics_registry is None:
+        abort(404)
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+def check_admin():
+    authorization = request.headers.get('Authorization', '')
+    if not admin_token or not secrets.compare_digest(authorization, f'Bearer {admin_token}'):
+        abort(403)
+
+
+@app.route('/api/admin/dictionaries', methods=['GET'])
+def list_dictionaries():
+    check_admin()
+    return jsonify({'generation': dico_checker.generation, 'dictionaries': [str(d) for d in dico_checker.dictionaries],
+                    'reloads': dictionary_reloader.reloads, 'appliedChange': dictionary_reloader.applied,
+                    'lastError': str(dictionary_reloader.last_error) if dictionary_reloader.last_error else None})
+
+
+@app.route('/api/admin/dictionaries/reload', methods=['POST'])
+def reload_dictionaries():
+    """
+    Reload all the dictionaries in the background, the current ones serving until the new ones are ready
+    """
+    check_admin()
+    return jsonify({'reloading': True, 'change': dictionary_reloader.reload()}), 202
+
+
+@app.route('/api/admin/dictionaries/<name>', methods=['PUT', 'DELETE'])
+def update_dictionary(name):
+    """
+    Load (PUT) or remove (DELETE) a single file of resources/dictionaries in the background, the others being left as
+    they are
+    """
+    check_admin()
+    try:
+        if request.method == 'PUT':
+            change = dictionary_reloader.add_dictionary(name)
+        else:
+            change = dictionary_reloader.remove_dictionary(name)
+    except (OSError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'change': change}), 202
+
+
 if __name__ == '__main__':
     app.run(debug=False, host='0.0.0.0')
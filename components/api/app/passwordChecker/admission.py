@@ -0,0 +1,308 @@
+# Admission control for the check endpoints. Every check costs CPU, so a single client posting long passwords as fast
+# as it can would take the workers from everyone else. Requests are admitted before any work is done: each client
+# draws from its own token bucket, too long passwords are refused, and concurrent checks of the same password wait for
+# a single computation instead of each running it.
+# The API runs in several worker processes (uWSGI in the Docker image): the buckets are then held in memory shared by
+# all of them (SharedRateLimiter), while concurrent checks are only coalesced among the threads of a worker.
+from hashlib import blake2b
+import mmap
+import multiprocessing
+import struct
+from threading import Event, Lock
+import time
+
+# the longest password accepted by the API: the patterns of longer ones are not analyzed anyway (see
+# passwordChecker.estimator), while their projections would still be searched, and beyond about 150 characters their
+# brute force time no longer fits in a float
+DEFAULT_MAX_PASSWORD_LENGTH = 128
+
+# the most passwords of a json batch, which is held whole and answered at once; streams are checked as they come
+DEFAULT_MAX_BATCH_SIZE = 1000
+
+
+class PasswordTooLong(ValueError):
+    """
+    A password beyond the accepted length, refused before being checked
+    """
+
+    def __init__(self, length: int, max_length: int):
+        super().__init__(f'password of {length} characters, beyond the {max_length} accepted')
+        self.length = length
+        self.max_length = max_length
+
+
+class BatchTooLarge(ValueError):
+    """
+    A batch of more passwords than accepted, refused before any of them is checked
+    """
+
+    def __init__(self, size: int, max_size: int):
+        super().__init__(f'batch of {size} passwords, beyond the {max_size} accepted')
+        self.size = size
+        self.max_size = max_size
+
+
+class RateLimited(Exception):
+    """
+    A request refused because its client went beyond its rate
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__(f'too many requests, retry after {retry_after:.1f}s')
+        self.retry_after = retry_after
+
+
+def check_password_length(password: str, max_length: int = DEFAULT_MAX_PASSWORD_LENGTH):
+    """
+    :param password: the password about to be checked
+    :type password: str
+    :param max_length: the longest password accepted, None for no limit [DEFAULT_MAX_PASSWORD_LENGTH]
+    :type max_length: int
+    :raise PasswordTooLong: if the password is longer
+    >>> check_password_length('paf', 3)
+    >>> check_password_length('chien', 3)
+    Traceback (most recent call last):
+    ...
+    passwordChecker.admission.PasswordTooLong: password of 5 characters, beyond the 3 accepted
+    """
+    if max_length is not None and len(password) > max_length:
+        raise PasswordTooLong(len(password), max_length)
+
+
+def check_batch_size(passwords: list, max_size: int = DEFAULT_MAX_BATCH_SIZE):
+    """
+    :param passwords: the passwords of a batch about to be checked
+    :type passwords: list[str]
+    :param max_size: the most passwords accepted, None for no limit [DEFAULT_MAX_BATCH_SIZE]
+    :type max_size: int
+    :raise BatchTooLarge: if there are more
+    >>> check_batch_size(['paf', 'chien'], 2)
+    >>> check_batch_size(['paf', 'chien', 'girafe'], 2)
+    Traceback (most recent call last):
+    ...
+    passwordChecker.admission.BatchTooLarge: batch of 3 passwords, beyond the 2 accepted
+    """
+    if max_size is not None and len(passwords) > max_size:
+        raise BatchTooLarge(len(passwords), max_size)
+
+
+class TokenBucket:
+    """
+    Tokens flowing in at a fixed rate, up to a burst, each request taking some of them.
+    A request costing more than what is there is admitted once the bucket is full enough (at most the burst), the
+    bucket then going into debt, so a large batch is served but delays the next requests accordingly
+
+    >>> bucket = TokenBucket(rate=1, burst=2, now=0)
+    >>> bucket.take(now=0), bucket.take(now=0), bucket.take(now=0)
+    (0.0, 0.0, 1.0)
+    >>> bucket.take(now=1.5)
+    0.0
+    >>> bucket.take(cost=5, now=3.5), bucket.take(now=4)
+    (0.0, 3.5)
+    """
+    rate: float
+    burst: float
+    tokens: float
+
+    def __init__(self, rate: float, burst: float, now: float):
+        """
+        :param rate: the tokens added per second
+        :type rate: float
+        :param burst: the tokens the bucket holds at most, and starts with
+        :type burst: float
+        :param now: the current time, in seconds
+        :type now: float
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self._updated = now
+
+    def __repr__(self):
+        return f'token bucket {self.tokens:.1f}/{self.burst} tokens, {self.rate}/s'
+
+    def take(self, cost: float = 1, now: float = None):
+        """
+        :param cost: the tokens the request takes [1]
+        :type cost: float
+        :param now: the current time, in seconds [time.monotonic()]
+        :type now: float
+        :return: 0 if the request is admitted, otherwise the seconds to wait before it would be
+        :rtype: float
+        """
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        needed = min(cost, self.burst)
+        if self.tokens < needed:
+            return (needed - self.tokens) / self.rate
+        self.tokens -= cost
+        return 0.0
+
+
+# the admitted and rejected counts, then for each slot: the client key (0 for a free slot), its tokens and last update
+_COUNTERS = struct.Struct('<QQ')
+_SLOT = struct.Struct('<Qdd')
+# the slots a client can take, from the one of its hash
+_PROBES = 8
+
+
+def _client_key(client):
+    return int.from_bytes(blake2b(str(client).encode('utf-8'), digest_size=8).digest(), 'little') or 1
+
+
+class SharedRateLimiter:
+    """
+    A token bucket per client, held in memory shared with the processes forked after its creation: the workers of
+    uWSGI (loading the app before forking them, as in the Docker image) or of gunicorn --preload then see the same
+    buckets, so a client gets its rate whatever the worker serving it.
+    The buckets are a table of max_clients slots, a client taking one of the few following the hash of its identity.
+    When they are all held by other clients, the least recently seen one is forgotten, its bucket being full again when
+    it comes back
+
+    >>> clock = iter([0, 0, 0, 0.5])
+    >>> limiter = SharedRateLimiter(rate=2, burst=1, clock=lambda: next(clock))
+    >>> limiter.admit('10.0.0.1'), limiter.admit('10.0.0.2'), limiter.admit('10.0.0.1'), limiter.admit('10.0.0.1')
+    (0.0, 0.0, 0.5, 0.0)
+    >>> limiter
+    shared rate limiter 2/s, burst 1, 3 admitted, 1 rejected
+    """
+    rate: float
+    burst: float
+    max_clients: int
+
+    def __init__(self, rate: float, burst: float = None, max_clients: int = 100000, clock=time.monotonic):
+        """
+        :param rate: the requests per second of each client
+        :type rate: float
+        :param burst: the requests a client can make at once [rate, at least 1]
+        :type burst: float
+        :param max_clients: the slots of the buckets [100000, 2.4MB]
+        :type max_clients: int
+        :param clock: gives the current time, in seconds, the same in all the processes [time.monotonic]
+        :type clock: callable
+        """
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1)
+        self.max_clients = max_clients
+        self._clock = clock
+        # anonymous and shared, zeroed: the slots are free
+        self._memory = mmap.mmap(-1, _COUNTERS.size + max_clients * _SLOT.size)
+        self._lock = multiprocessing.Lock()
+
+    def __repr__(self):
+        return f'shared rate limiter {self.rate}/s, burst {self.burst}, {self.admitted} admitted, ' \
+               f'{self.rejected} rejected'
+
+    @property
+    def admitted(self):
+        return _COUNTERS.unpack_from(self._memory, 0)[0]
+
+    @property
+    def rejected(self):
+        return _COUNTERS.unpack_from(self._memory, 0)[1]
+
+    def _offset(self, index: int):
+        return _COUNTERS.size + index * _SLOT.size
+
+    def admit(self, client: str, cost: float = 1):
+        """
+        :param client: identifies the client, such as its address
+        :type client: str
+        :param cost: the tokens the request takes, such as the number of passwords of a batch [1]
+        :type cost: float
+        :return: 0 if the request is admitted, otherwise the seconds the client should wait before trying again
+        :rtype: float
+        """
+        key = _client_key(client)
+        first = key % self.max_clients
+        with self._lock:
+            now = self._clock()
+            bucket = TokenBucket(self.rate, self.burst, now)
+            found = None
+            candidates = []
+            for probe in range(min(_PROBES, self.max_clients)):
+                index = (first + probe) % self.max_clients
+                slot_key, tokens, updated = _SLOT.unpack_from(self._memory, self._offset(index))
+                if slot_key == key:
+                    found = index
+                    bucket.tokens, bucket._updated = tokens, updated
+                    break
+                # a free slot first, or else the least recently seen client
+                candidates.append((slot_key != 0, updated, index))
+            index = found if found is not None else min(candidates)[2]
+
+            wait = bucket.take(cost, now)
+            _SLOT.pack_into(self._memory, self._offset(index), key, bucket.tokens, bucket._updated)
+            admitted, rejected = _COUNTERS.unpack_from(self._memory, 0)
+            _COUNTERS.pack_into(self._memory, 0, admitted + (not wait), rejected + bool(wait))
+            return wait
+
+
+class _Flight:
+    def __init__(self):
+        self.done = Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Runs one computation per key at a time: the callers asking for a key already being computed wait for that
+    computation and share its result (or its error), instead of running it again.
+    Keys are only held while they are being computed, in the memory of the process: only the threads of a same worker
+    share their computations
+
+    >>> flights = SingleFlight()
+    >>> flights.do('paf', lambda: 'computed paf')
+    'computed paf'
+    >>> flights
+    single flight 0 in flight, 1 computed, 0 shared
+    """
+    computed: int
+    shared: int
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = Lock()
+        self.computed = 0
+        self.shared = 0
+
+    def __repr__(self):
+        return f'single flight {len(self)} in flight, {self.computed} computed, {self.shared} shared'
+
+    def __len__(self):
+        return len(self._flights)
+
+    def do(self, key, compute):
+        """
+        :param key: identifies the computation, such as the password
+        :param compute: computes the value, when no other caller is doing it for the same key
+        :type compute: callable
+        :return: the value
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.computed += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
@@ -0,0 +1,108 @@
+# Complexity metrics for many passwords at once, with NumPy.
+# All the passwords are encoded into a single array of code points; characters are classified through a lookup table
+# and the metrics of the whole batch are computed in a handful of vector operations.
+# Brute force estimates are computed in log space, as alphabet_size ** length overflows floats for long passwords.
+from math import log10
+
+import numpy as np
+
+from passwordChecker.complexity import _character_types, OTHER_ALPHABET_SIZE
+
+# char types, in bit order. Characters of no known type (other scripts, emojis...) fall into 'other'
+_type_names = list(_character_types) + ['other']
+_type_sizes = np.array([len(_character_types[t]) for t in _character_types] + [OTHER_ALPHABET_SIZE], dtype=np.float64)
+_other_bit = 1 << (len(_type_names) - 1)
+
+_type_table = np.full(256, _other_bit, dtype=np.uint8)
+for _bit, _type_name in enumerate(_character_types):
+    for _char in _character_types[_type_name]:
+        _type_table[ord(_char)] = 1 << _bit
+
+_length_thresholds = np.array([5, 8, 10, 12, 16, 20])
+_length_scores = np.array([0, 16, 32, 48, 64, 80, 100])
+
+_log10_i7_ips = log10(317900000000)
+
+
+class BatchComplexity:
+    """
+    The complexity metrics of a batch of passwords, as arrays in the order of the passwords
+    """
+    length_scores: np.ndarray
+    alphabet_sizes: np.ndarray
+    log10_brute_force_ms: np.ndarray
+
+    def __init__(self, length_scores: np.ndarray, alphabet_sizes: np.ndarray, log10_brute_force_ms: np.ndarray):
+        self.length_scores = length_scores
+        self.alphabet_sizes = alphabet_sizes
+        self.log10_brute_force_ms = log10_brute_force_ms
+
+    def __len__(self):
+        return len(self.length_scores)
+
+    @property
+    def brute_force_ms(self):
+        """
+        :return: the estimated milliseconds to brute force, capped to the largest float
+        :rtype: np.ndarray
+        """
+        return np.power(10.0, np.minimum(self.log10_brute_force_ms, np.log10(np.finfo(np.float64).max)))
+
+
+def encode_passwords(passwords: list):
+    """
+    Encode the passwords into a single array of code points
+    :param passwords: the passwords
+    :type passwords: list[str]
+    :return: the concatenated code points, and the length of each password
+    :rtype: tuple[np.ndarray, np.ndarray]
+    >>> encode_passwords(['paf', '', 'é!'])
+    (array([112,  97, 102, 233,  33], dtype=uint32), array([3, 0, 2]))
+    """
+    lengths = np.fromiter((len(p) for p in passwords), dtype=np.int64, count=len(passwords))
+    code_points = np.frombuffer(''.join(passwords).encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+    return code_points, lengths
+
+
+def compute_complexity_batch(passwords: list):
+    """
+    Compute the length scores, alphabet sizes and brute force estimates of a batch of passwords.
+    As with complexity.get_char_type, characters of no known type count as an 'other' alphabet of OTHER_ALPHABET_SIZE.
+    :param passwords: the passwords
+    :type passwords: list[str]
+    :return: the metrics, in the passwords order
+    :rtype: BatchComplexity
+
+    >>> batch = compute_complexity_batch(['', 'haha', 'pafPAF42', '12345678901234567890', 'p4F le Chï3n !', '日本'])
+    >>> batch.length_scores.tolist()
+    [0, 0, 32, 100, 64, 0]
+    >>> batch.alphabet_sizes.tolist()
+    [0, 26, 62, 10, 106, 100]
+    >>> batch.brute_force_ms[1:2]
+    array([1.43748349e-06])
+    >>> batch.brute_force_ms[4:5]
+    array([7.11199734e+16])
+    """
+    code_points, lengths = encode_passwords(passwords)
+
+    # code points beyond the table are all 'other'
+    in_table = code_points < len(_type_table)
+    char_bits = np.full(len(code_points), _other_bit, dtype=np.uint8)
+    char_bits[in_table] = _type_table[code_points[in_table]]
+
+    # or-reduce the char type bits over each password; reduceat is not defined on empty segments
+    type_bits = np.zeros(len(passwords), dtype=np.uint8)
+    non_empty = lengths > 0
+    if len(code_points):
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        type_bits[non_empty] = np.bitwise_or.reduceat(char_bits, starts[non_empty])
+
+    type_flags = (type_bits[:, None] >> np.arange(len(_type_names), dtype=np.uint8)) & 1
+    alphabet_sizes = (type_flags * _type_sizes).sum(axis=1).astype(np.int64)
+
+    length_scores = _length_scores[np.searchsorted(_length_thresholds, lengths, side='right')]
+
+    log10_combinations = np.where(non_empty, lengths * np.log10(np.maximum(alphabet_sizes, 1)), 0.0)
+    log10_brute_force_ms = log10_combinations - _log10_i7_ips
+
+    return BatchComplexity(length_scores, alphabet_sizes, log10_brute_force_ms)
@@ -0,0 +1,130 @@
+# A Bloom filter answers "definitely not there" or "maybe there" from a few bits, so most of the passwords, which are
+# in no dictionary, can be rejected before any exact lookup.
+from hashlib import blake2b
+from math import ceil, log
+import struct
+
+_MAGIC = b'PWCBLM01'
+_HEADER = struct.Struct('<8sQIQd')
+
+
+class BloomFilter:
+    """
+    A fixed size Bloom filter over strings, sized for a capacity and a false positive rate.
+    It keeps track of how many lookups were answered as maybe present (hits) or absent (misses)
+
+    >>> bloom = BloomFilter(100, error_rate=0.01)
+    >>> bloom.add('chien')
+    >>> 'chien' in bloom
+    True
+    >>> 'girafe' in bloom
+    False
+    >>> bloom.hits, bloom.misses
+    (1, 1)
+    >>> bloom.size_bytes, bloom.hash_count
+    (120, 7)
+    """
+    capacity: int
+    error_rate: float
+    bit_count: int
+    hash_count: int
+    count: int
+    hits: int
+    misses: int
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        """
+        :param capacity: the number of items expected to be added
+        :type capacity: int
+        :param error_rate: the targeted false positive rate, once capacity items are added [0.01]
+        :type error_rate: float
+        """
+        if not 0 < error_rate < 1:
+            raise ValueError(f'error_rate must be between 0 and 1, got {error_rate}')
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.bit_count = ceil(-self.capacity * log(error_rate) / (log(2) ** 2))
+        # rounded to whole bytes
+        self.bit_count = 8 * ceil(self.bit_count / 8)
+        self.hash_count = max(1, round(self.bit_count / self.capacity * log(2)))
+        self.bits = bytearray(self.bit_count // 8)
+        self.count = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return f'bloom filter {self.count} items, {self.size_bytes} bytes, {self.hash_count} hashes, ' \
+               f'{self.hits} hits, {self.misses} misses'
+
+    @property
+    def size_bytes(self):
+        return len(self.bits)
+
+    def _positions(self, item: str):
+        # double hashing: the k positions are derived from two 64 bits hashes
+        digest = blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.bit_count for i in range(self.hash_count))
+
+    def copy(self):
+        """
+        :return: a filter of the same items, which can take more without changing this one
+
+        >>> bloom = BloomFilter(100)
+        >>> bloom.add('chien')
+        >>> copy = bloom.copy()
+        >>> copy.add('girafe')
+        >>> 'chien' in copy, 'girafe' in copy, 'girafe' in bloom
+        (True, True, False)
+        """
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        bloom.bits = bytearray(self.bits)
+        bloom.bit_count = self.bit_count
+        bloom.hash_count = self.hash_count
+        bloom.count = self.count
+        return bloom
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str):
+        bits = self.bits
+        for position in self._positions(item):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                self.misses += 1
+                return False
+        self.hits += 1
+        return True
+
+    def save(self, filename: str):
+        """
+        Write the filter to a file, to be read back with BloomFilter.load
+        :param filename: the file to write
+        :type filename: str
+        """
+        with open(filename, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, self.capacity, self.hash_count, self.count, self.error_rate))
+            f.write(self.bits)
+
+    @staticmethod
+    def load(filename: str):
+        """
+        Read a filter written by BloomFilter.save
+        :param filename: the file to read
+        :type filename: str
+        :return: the filter
+        :rtype: BloomFilter
+        """
+        with open(filename, 'rb') as f:
+            magic, capacity, hash_count, count, error_rate = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError(f'{filename} is not a saved Bloom filter')
+            bloom = BloomFilter(capacity, error_rate)
+            bloom.bits = bytearray(f.read())
+        bloom.bit_count = 8 * len(bloom.bits)
+        bloom.hash_count = hash_count
+        bloom.count = count
+        return bloom
@@ -0,0 +1,48 @@
+# Some passwords are far more expensive to search than others: every ambiguous character ('9', '0', '6', '!', '1'...)
+# multiplies the candidates to try. A budget caps the work spent on one password, so a crafted one cannot hold a
+# worker or its memory for long; the search then stops where it is and the result tells it is partial.
+
+# the steps allowed to the search of one password by the API and the command line: a few tens of milliseconds at worst,
+# when hashed dictionaries are enumerated, while the prefix tree walks of usual passwords take tens of steps
+DEFAULT_MAX_STEPS = 10000
+
+
+class WorkBudget:
+    """
+    A number of steps (prefix tree nodes visited, candidates built) to be spent on the search of one password
+
+    >>> budget = WorkBudget(2)
+    >>> budget.spend(), budget.spend(), budget.exceeded
+    (True, True, False)
+    >>> budget.spend(), budget.exceeded
+    (False, True)
+    """
+    max_steps: int
+    remaining: int
+    exceeded: bool
+
+    def __init__(self, max_steps: int):
+        """
+        :param max_steps: the steps that can be spent
+        :type max_steps: int
+        """
+        self.max_steps = max_steps
+        self.remaining = max_steps
+        self.exceeded = False
+
+    def __repr__(self):
+        return f'budget {self.max_steps - self.remaining}/{self.max_steps} steps'
+
+    def spend(self, steps: int = 1):
+        """
+        :param steps: the steps about to be spent [1]
+        :type steps: int
+        :return: False if the budget does not allow them, the search must then stop
+        :rtype: bool
+        """
+        if self.remaining < steps:
+            self.remaining = 0
+            self.exceeded = True
+            return False
+        self.remaining -= steps
+        return True
@@ -0,0 +1,120 @@
+# The same passwords are checked again and again (e.g. the UI submitting as the user types), so results are kept in a
+# bounded cache. Passwords are never stored: entries are keyed by a keyed hash, whose secret never leaves the process.
+from collections import OrderedDict
+from hashlib import blake2b
+import os
+from threading import Lock
+import time
+
+
+class RobustnessCache:
+    """
+    A least recently used cache, with a time to live, counting its hits, misses and evictions.
+    It is tied to the dictionaries it was filled with, and emptied as soon as they are reloaded.
+
+    >>> cache = RobustnessCache(max_size=2)
+    >>> cache.get_or_compute('paf', 0, lambda: 'computed paf')
+    'computed paf'
+    >>> cache.get_or_compute('paf', 0, lambda: 'computed again')
+    'computed paf'
+    >>> cache.get_or_compute('chien', 0, lambda: 'computed chien')
+    'computed chien'
+    >>> cache.get_or_compute('girafe', 0, lambda: 'computed girafe')
+    'computed girafe'
+    >>> cache
+    cache 2/2 entries, 1 hits, 3 misses, 1 evictions
+    >>> cache.get_or_compute('paf', 1, lambda: 'reloaded paf')
+    'reloaded paf'
+    >>> len(cache)
+    1
+    >>> cache = RobustnessCache(ttl_seconds=0)
+    >>> cache.get_or_compute('paf', 0, lambda: 'computed paf')
+    'computed paf'
+    >>> cache.get_or_compute('paf', 0, lambda: 'expired paf')
+    'expired paf'
+    """
+    max_size: int
+    ttl_seconds: float
+    hits: int
+    misses: int
+    evictions: int
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 3600, secret: bytes = None):
+        """
+        :param max_size: the maximum number of entries [10000]
+        :type max_size: int
+        :param ttl_seconds: how long an entry stays valid, None for ever [3600]
+        :type ttl_seconds: float
+        :param secret: the key of the password hash, random if not given [None]
+        :type secret: bytes
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._secret = secret or os.urandom(32)
+        self._entries = OrderedDict()
+        self._generation = None
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return f'cache {len(self)}/{self.max_size} entries, {self.hits} hits, {self.misses} misses, ' \
+               f'{self.evictions} evictions'
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def _key(self, password: str):
+        return blake2b(password.encode('utf-8', 'surrogatepass'), key=self._secret, digest_size=16).digest()
+
+    def invalidate(self):
+        """
+        Empty the cache
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def get_or_compute(self, password: str, generation, compute):
+        """
+        Get the cached value for the password, or compute and cache it
+        :param password: the password
+        :type password: str
+        :param generation: identifies the dictionaries state; when it changes, all entries are dropped
+        :param compute: computes the value if it is not cached
+        :type compute: callable
+        :return: the value
+        """
+        key = self._key(password)
+        now = time.monotonic()
+        with self._lock:
+            if generation != self._generation:
+                self._entries.clear()
+                self._generation = generation
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.evictions += 1
+            self.misses += 1
+
+        # computed out of the lock, so slow computations do not block the hits
+        value = compute()
+
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (value, now + self.ttl_seconds if self.ttl_seconds is not None else None)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
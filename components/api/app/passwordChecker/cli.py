@@ -0,0 +1,289 @@
+# Command line entry point, to audit password files without going through the API
+import argparse
+from collections import deque
+from contextlib import redirect_stdout
+import csv
+from itertools import islice
+import json
+from multiprocessing import Pool, cpu_count
+import os
+import sys
+import time
+
+from passwordChecker.batch_complexity import compute_complexity_batch
+from passwordChecker.budget import DEFAULT_MAX_STEPS
+from passwordChecker.dictionary import DictionaryChecker
+from passwordChecker.robustness import CheckPipeline, CheckStage, DEFAULT_STAGES, PasswordPolicy
+from passwordChecker.substitute import CharacterProjector, ScramblingParams
+
+_csv_fields = ['line', 'password', 'lengthScore', 'bruteForceMs', 'existsInDictionary', 'dictionaries',
+               'budgetExceeded', 'fuzzyMatch', 'embeddedWords', 'guesses', 'crackTimeMs', 'patterns', 'verdict',
+               'stages']
+
+# each worker process holds its own checker and policy, set once by _init_worker
+_worker_checker = None
+_worker_policy = None
+
+
+def build_dictionary_checker(dictionaries: str, index: str = None, max_trailing: int = 4, hashed: list = (),
+                             max_work: int = DEFAULT_MAX_STEPS, max_edit_distance: int = 0,
+                             min_embedded_length: int = 0, compact: bool = False):
+    """
+    Build a DictionaryChecker the same way the API does
+    :param dictionaries: the directory of dictionary files, used if no index is given
+    :type dictionaries: str
+    :param index: a compiled index file (see passwordChecker.index), with its Bloom filter if any [None]
+    :type index: str
+    :param max_trailing: the tolerated trailing numbers/punctuation [4]
+    :type max_trailing: int
+    :param hashed: hashed dictionary files (see passwordChecker.hashed), checked as well [()]
+    :type hashed: list[str]
+    :param max_work: the steps the search of one password can take, None for no limit [DEFAULT_MAX_STEPS]
+    :type max_work: int
+    :param max_edit_distance: the typos tolerated by the fuzzy matching, 0 to disable it [0]
+    :type max_edit_distance: int
+    :param min_embedded_length: the shortest dictionary words looked for within the passwords, 0 not to [0]
+    :type min_embedded_length: int
+    :param compact: hold each dictionary as a CompactDictionary rather than merging them [False]
+    :type compact: bool
+    :return: the loaded checker
+    :rtype: DictionaryChecker
+    """
+    scrambling_params = ScramblingParams(max_trailing=max_trailing, max_edit_distance=max_edit_distance,
+                                         min_embedded_length=min_embedded_length)
+    character_projector = CharacterProjector(scrambling_params=scrambling_params)
+    dico_checker = DictionaryChecker(character_projector=character_projector, merged=not compact, max_work=max_work,
+                                     compact=compact)
+    if index:
+        dico_checker.load_index(index)
+        if os.path.exists(f'{index}.bloom'):
+            dico_checker.load_prefilter(f'{index}.bloom')
+    else:
+        dico_checker.load_all_dictionaries(dictionaries)
+    for filename in hashed:
+        dico_checker.load_hashed_dictionary(filename)
+    if max_edit_distance > 0:
+        dico_checker.build_fuzzy_index()
+    dico_checker.build_word_automaton()
+    return dico_checker
+
+
+def _init_worker(dictionaries: str, index: str, max_trailing: int, hashed: list, max_work: int,
+                 max_edit_distance: int, min_embedded_length: int, compact: bool, min_length_score: int,
+                 allow_dictionary_words: bool):
+    global _worker_checker, _worker_policy
+    # loading reports on stdout, which may carry the results
+    with redirect_stdout(sys.stderr):
+        _worker_checker = build_dictionary_checker(dictionaries, index, max_trailing, hashed, max_work,
+                                                   max_edit_distance, min_embedded_length, compact)
+    _worker_policy = PasswordPolicy(min_length_score, allow_dictionary_words)
+
+
+def _batched_pipeline(length_scores: dict, brute_force_ms: dict, policy: PasswordPolicy):
+    """
+    :param length_scores: the length score of each password, computed for the chunk at once
+    :type length_scores: dict[str, int]
+    :param brute_force_ms: the brute force estimate of each password, computed for the chunk at once
+    :type brute_force_ms: dict[str, float]
+    :return: the default stages, their length and brute force stages taking the values computed for the chunk
+    :rtype: CheckPipeline
+    """
+
+    def length_stage(context):
+        context.robustness.length_score = length_scores[context.password]
+
+    def brute_force_stage(context):
+        context.robustness.brute_force_ms = brute_force_ms[context.password]
+
+    batched = {'length': length_stage, 'bruteForce': brute_force_stage}
+    return CheckPipeline([CheckStage(stage.name, stage.cost, batched.get(stage.name, stage.run), stage.requires)
+                          for stage in DEFAULT_STAGES], policy)
+
+
+def _audit_chunk(chunk: list):
+    """
+    :param chunk: a list of (line number, password)
+    :return: a list of serialized results
+    """
+    passwords = list(dict.fromkeys(password for _, password in chunk))
+    complexity = compute_complexity_batch(passwords)
+    pipeline = _batched_pipeline(dict(zip(passwords, complexity.length_scores.tolist())),
+                                 dict(zip(passwords, complexity.brute_force_ms.tolist())), _worker_policy)
+    computed = {password: pipeline.run(password, _worker_checker).serialize() for password in passwords}
+
+    return [{'line': line, 'password': password, **computed[password]} for line, password in chunk]
+
+
+def _read_chunks(lines, chunk_size: int):
+    numbered = ((i + 1, line.rstrip('\r\n')) for i, line in enumerate(lines))
+    while True:
+        chunk = list(islice(numbered, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class _NdjsonWriter:
+    def __init__(self, out):
+        self.out = out
+
+    def write(self, result: dict):
+        self.out.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+
+class _CsvWriter:
+    def __init__(self, out):
+        self.writer = csv.DictWriter(out, fieldnames=_csv_fields)
+        self.writer.writeheader()
+
+    def write(self, result: dict):
+        if 'dictionaries' in result:
+            result = {**result, 'dictionaries': ';'.join(result['dictionaries'])}
+        if result.get('fuzzyMatch'):
+            result = {**result, 'fuzzyMatch': result['fuzzyMatch']['word']}
+        if 'embeddedWords' in result:
+            result = {**result, 'embeddedWords': ';'.join(w['word'] for w in result['embeddedWords'])}
+        if 'patterns' in result:
+            result = {**result, 'patterns': ';'.join(p['kind'] for p in result['patterns'])}
+        if 'stages' in result:
+            result = {**result, 'stages': ';'.join(s['name'] for s in result['stages'])}
+        self.writer.writerow(result)
+
+
+def audit(lines, out, output_format: str = 'ndjson', processes: int = None, chunk_size: int = 1000,
+          dictionaries: str = 'resources/dictionaries', index: str = None, max_trailing: int = 4, hashed: list = (),
+          max_work: int = DEFAULT_MAX_STEPS, max_edit_distance: int = 0, min_embedded_length: int = 0,
+          compact: bool = False, min_length_score: int = 16, allow_dictionary_words: bool = False, progress=None):
+    """
+    Check all the passwords (one per line) and write the results as they come, in the same order.
+    Work is spread over a process pool, with a bounded number of chunks in flight, so memory does not depend on
+    the input size.
+    :param lines: the input lines
+    :type lines: iterable[str]
+    :param out: where to write the results
+    :type out: TextIO
+    :param output_format: 'ndjson' or 'csv' ['ndjson']
+    :type output_format: str
+    :param processes: the number of worker processes [cpu count]
+    :type processes: int
+    :param chunk_size: the number of passwords sent at once to a worker [1000]
+    :type chunk_size: int
+    :param dictionaries: the directory of dictionary files ['resources/dictionaries']
+    :type dictionaries: str
+    :param index: a compiled index file, used instead of the dictionaries directory [None]
+    :type index: str
+    :param max_trailing: the tolerated trailing numbers/punctuation [4]
+    :type max_trailing: int
+    :param hashed: hashed dictionary files, checked as well [()]
+    :type hashed: list[str]
+    :param max_work: the steps the search of one password can take, None for no limit [DEFAULT_MAX_STEPS]
+    :type max_work: int
+    :param max_edit_distance: the typos tolerated by the fuzzy matching, 0 to disable it [0]
+    :type max_edit_distance: int
+    :param min_embedded_length: the shortest dictionary words looked for within the passwords, 0 not to [0]
+    :type min_embedded_length: int
+    :param compact: hold the dictionaries of each worker as CompactDictionary [False]
+    :type compact: bool
+    :param min_length_score: the lowest length score of the passwords accepted by the verdict [16]
+    :type min_length_score: int
+    :param allow_dictionary_words: accept the passwords found in a dictionary in the verdict [False]
+    :type allow_dictionary_words: bool
+    :param progress: where to report progress, such as sys.stderr [None]
+    :type progress: TextIO
+    :return: the number of audited passwords
+    :rtype: int
+    """
+    writer = _CsvWriter(out) if output_format == 'csv' else _NdjsonWriter(out)
+    processes = processes or cpu_count()
+    max_in_flight = 2 * processes
+
+    count = 0
+    start = time.monotonic()
+    last_report = start
+
+    def report(force=False):
+        nonlocal last_report
+        now = time.monotonic()
+        if progress and (force or now - last_report >= 1):
+            last_report = now
+            rate = count / (now - start) if now > start else 0
+            progress.write(f'{count} passwords, {rate:.0f} passwords/s\n')
+            progress.flush()
+
+    with Pool(processes, initializer=_init_worker, initargs=(dictionaries, index, max_trailing, list(hashed),
+                                                               max_work, max_edit_distance,
+                                                               min_embedded_length, compact, min_length_score,
+                                                               allow_dictionary_words)) as pool:
+        in_flight = deque()
+
+        def write_oldest():
+            nonlocal count
+            for result in in_flight.popleft().get():
+                writer.write(result)
+                count += 1
+            report()
+
+        for chunk in _read_chunks(lines, chunk_size):
+            in_flight.append(pool.apply_async(_audit_chunk, (chunk,)))
+            if len(in_flight) >= max_in_flight:
+                write_oldest()
+        while in_flight:
+            write_oldest()
+
+    report(force=True)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='password-checker', description='Assess password robustness')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    audit_parser = subparsers.add_parser('audit', help='check a file of passwords, one per line')
+    audit_parser.add_argument('input', help="the password file, or '-' for stdin")
+    audit_parser.add_argument('-o', '--output', default='-', help="the result file, or '-' for stdout [-]")
+    audit_parser.add_argument('-f', '--format', choices=['ndjson', 'csv'], default='ndjson',
+                              help='the result format [ndjson]')
+    audit_parser.add_argument('-p', '--processes', type=int, default=None, help='worker processes [cpu count]')
+    audit_parser.add_argument('--chunk-size', type=int, default=1000, help='passwords per work unit [1000]')
+    audit_parser.add_argument('--dictionaries', default='resources/dictionaries',
+                              help='the dictionaries directory [resources/dictionaries]')
+    audit_parser.add_argument('--index', default=None, help='a compiled index, used instead of the dictionaries')
+    audit_parser.add_argument('--hashed', action='append', default=[],
+                              help='a hashed dictionary (e.g. a breach corpus) to check as well, can be repeated')
+    audit_parser.add_argument('--max-trailing', type=int, default=4,
+                              help='tolerated trailing numbers/punctuation [4]')
+    audit_parser.add_argument('--max-work', type=int, default=DEFAULT_MAX_STEPS,
+                              help=f'steps allowed to the search of one password, 0 for no limit [{DEFAULT_MAX_STEPS}]')
+    audit_parser.add_argument('--max-edit-distance', type=int, default=0,
+                              help='also report the dictionary words within this number of typos, 0 to disable [0]')
+    audit_parser.add_argument('--min-embedded-length', type=int, default=0,
+                              help='also report the dictionary words of at least this length found within the '
+                                   'passwords, 0 not to [0]')
+    audit_parser.add_argument('--compact', action='store_true',
+                              help='hold each dictionary packed, for much less memory per worker and slower lookups')
+    audit_parser.add_argument('--min-length-score', type=int, default=16,
+                              help='the lowest length score of the passwords accepted by the verdict [16]')
+    audit_parser.add_argument('--allow-dictionary-words', action='store_true',
+                              help='accept the passwords found in a dictionary in the verdict')
+    audit_parser.add_argument('-q', '--quiet', action='store_true', help='do not report progress')
+
+    args = parser.parse_args(argv)
+
+    input_file = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8', errors='replace')
+    output_file = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8', newline='')
+    try:
+        audit(input_file, output_file, output_format=args.format, processes=args.processes,
+              chunk_size=args.chunk_size, dictionaries=args.dictionaries, index=args.index,
+              max_trailing=args.max_trailing, hashed=args.hashed, max_work=args.max_work or None,
+              max_edit_distance=args.max_edit_distance, min_embedded_length=args.min_embedded_length,
+              compact=args.compact, min_length_score=args.min_length_score,
+              allow_dictionary_words=args.allow_dictionary_words, progress=None if args.quiet else sys.stderr)
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+
+
+if __name__ == '__main__':
+    main()
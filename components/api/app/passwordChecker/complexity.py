@@ -1,4 +1,5 @@
 import string
+import sys
 
 
 def password_length_score(password: str):
@@ -40,11 +41,13 @@ _character_types = {
 }
 _character_types['uppercase_chars'] = {x.upper() for x in _character_types['lowercase_chars']}
 _character_types['uppercase_accented'] = {x.upper() for x in _character_types['lowercase_accented']}
+# characters of no known type (other letters, scripts, emojis...) count as an alphabet of that size
+OTHER_ALPHABET_SIZE = 100
 
 
 def get_char_type(char: str):
     """
-    Get the char type ('numbers', 'lowercase_chars', ...)
+    Get the char type ('numbers', 'lowercase_chars', ..., 'other' for the characters of no known type)
     :param char: a single character
     :type char: str
     :return: the char type
@@ -61,10 +64,12 @@ def get_char_type(char: str):
     'uppercase_accented'
     >>> get_char_type('{')
     'punctuation'
+    >>> get_char_type('ñ')
+    'other'
     """
     type = next((x for x in _character_types.items() if char in x[1]), None)
     if type is None:
-        raise TypeError(f'No type found for char "{char}"')
+        return 'other'
     return type[0]
 
 
@@ -88,12 +93,29 @@ def alphabet_size(password: str):
     26
     >>> alphabet_size('pafPAF42')
     62
+    >>> alphabet_size('ñandú')
+    126
     """
 
     # get the unique char types ({} set notation)
     chars_types = {get_char_type(c) for c in password}
 
-    return sum([len(_character_types[t]) for t in chars_types])
+    return char_types_alphabet_size(chars_types)
+
+
+def char_types_alphabet_size(chars_types: set):
+    """
+    Get the length of the alphabet made of the given char types
+    :param chars_types: char types, as returned by get_char_type
+    :type chars_types: set[str]
+    :return: the length of the alphabet size
+    :rtype: int
+    >>> char_types_alphabet_size({'numbers', 'lowercase_chars'})
+    36
+    >>> char_types_alphabet_size({'numbers', 'other'})
+    110
+    """
+    return sum([len(_character_types[t]) if t in _character_types else OTHER_ALPHABET_SIZE for t in chars_types])
 
 
 def compute_brute_force_ms(password: str):
@@ -109,9 +131,34 @@ def compute_brute_force_ms(password: str):
     1.4374834853727588e-06
     >>> compute_brute_force_ms('p4F le Chï3n !')
     7.111997344304575e+16
+    >>> compute_brute_force_ms('ñandú')
+    0.09989924308273042
+    """
+    return estimate_brute_force_ms(alphabet_size(password), len(password))
+
+
+def estimate_brute_force_ms(alphabet_length: int, password_length: int):
+    """
+    Estimate the time to brute force a password of a given length over a given alphabet
+    :param alphabet_length: the size of the alphabet
+    :type alphabet_length: int
+    :param password_length: the length of the password
+    :type password_length: int
+    :return: estimated milliseconds to brute force, capped to the largest float
+    :rtype: float
+
+    >>> estimate_brute_force_ms(26, 4)
+    1.4374834853727588e-06
+    >>> estimate_brute_force_ms(100, 200) == sys.float_info.max
+    True
     """
     i7_ips = 317900000000
-    return (alphabet_size(password) ** len(password)) / float(i7_ips)
+    try:
+        # an int division, which only overflows when its result does
+        return (alphabet_length ** password_length) / i7_ips
+    except OverflowError:
+        # beyond about 150 characters, as passwordChecker.batch_complexity does
+        return sys.float_info.max
 
 
 if __name__ == "__main__":
@@ -1,7 +1,25 @@
-from itertools import chain
+from array import array
+from collections import namedtuple
+from threading import Lock
 
 # One technique to check for password robustness is to run them against dictionaries.
+from passwordChecker.bloom import BloomFilter
+from passwordChecker.budget import WorkBudget
+from passwordChecker.embedded import EmbeddedWord, WordAutomaton
+from passwordChecker.estimator import MIN_WORD_PATTERN_LENGTH
+from passwordChecker.fuzzy import DeletionIndex, FuzzyMatch
+from passwordChecker.hashed import HashedDictionary
 from passwordChecker.substitute import  CharacterProjector
+from passwordChecker.index import MappedIndex, PackedWords, SortedWordsDictionary
+from passwordChecker import loader
+from passwordChecker.trie import WordTrie, walk_projection
+
+# above this number of candidates, enumerating them to query the prefilter costs more than walking the dictionaries
+_MAX_PREFILTERED_CANDIDATES = 16
+
+# what the checks read from a DictionaryChecker. It is replaced as a whole when dictionaries are added or removed,
+# so a check in flight keeps walking a consistent set of dictionaries
+_Snapshot = namedtuple('_Snapshot', ['dictionaries', 'prefilter', 'generation', 'fuzzy_index', 'word_automaton'])
 
 
 class PasswordDictionary:
@@ -11,14 +29,20 @@ class PasswordDictionary:
     """
     name: str
     words: set
+    trie: WordTrie
 
     def __init__(self, name, words):
         self.name = name
-        self.words = set(words)
+        # a set just read is kept as it is, rather than copied
+        self.words = words if isinstance(words, set) else set(words)
+        self.trie = WordTrie(self.words)
 
     def __repr__(self):
         return f'{self.name} {len(self.words)} words'
 
+    def __iter__(self):
+        return iter(self.words)
+
     def contains_exact(self, indexed_password: str):
         """
         Check if the given password exist in the dictionary.
@@ -37,40 +61,576 @@ class PasswordDictionary:
 
         return indexed_password in self.words
 
+    def sources(self, indexed_password: str):
+        """
+        :param indexed_password: the projected password
+        :type indexed_password: str
+        :return: the names of the dictionaries containing the word
+        :rtype: list[str]
+        """
+        return [self.name] if indexed_password in self.words else []
+
+    def walk(self, projected_chars: list, lengths: range, budget: WorkBudget = None):
+        """
+        Search for all the words that can be reached from the projected characters.
+        :param projected_chars: for each position in the password, the list of projected characters
+        :type projected_chars: list[list[str]]
+        :param lengths: the accepted lengths for a word to match
+        :type lengths: range
+        :param budget: the work that can be spent, the walk stopping when it is exhausted [None]
+        :type budget: WorkBudget
+        :return: a generator of the matching indexed words
+        :rtype: generator
+
+        >>> dico = PasswordDictionary('test', ['fiap', 'ia', 'girafe'])
+        >>> list(dico.walk([['i'], ['a'], ['b', 'g']], range(2, 4)))
+        ['ia']
+        """
+        return (word for word, _ in walk_projection(self.trie, projected_chars, lengths, budget))
+
+    def prefix_tree(self):
+        """
+        :return: the tree to be walked (see passwordChecker.trie.walk_projection)
+        :rtype: WordTrie
+        """
+        return self.trie
+
+
+class CompactDictionary(SortedWordsDictionary):
+    """
+    The same words as a PasswordDictionary, packed: sorted, utf-8 encoded and concatenated into a single bytes blob,
+    delimited by an array of offsets. A word then costs its length plus 4 bytes, instead of a str object, its slot in
+    a set and its nodes in a trie. Lookups bisect the sorted words, in O(log n)
+
+    >>> dico = CompactDictionary('test', ['fiap', 'ia', 'girafe'])
+    >>> dico
+    test 3 words
+    >>> dico.contains_exact('paf'), dico.contains_exact('girafe'), dico.sources('ia')
+    (False, True, ['test'])
+    >>> list(dico.walk([['i'], ['a'], ['b', 'g']], range(2, 4)))
+    ['ia']
+    """
+    __slots__ = ('name', '_words')
+
+    def __init__(self, name: str, words):
+        """
+        :param name: the dictionary name
+        :type name: str
+        :param words: the indexed words, duplicates included or not
+        :type words: iterable[str]
+        """
+        self.name = name
+        # utf-8 bytes sort in the same order as the code points they encode
+        encoded = sorted({word.encode('utf-8') for word in words})
+        offsets = [0]
+        for word in encoded:
+            offsets.append(offsets[-1] + len(word))
+        self._words = PackedWords(array('I' if offsets[-1] < 1 << 32 else 'Q', offsets), b''.join(encoded))
+
+    def __repr__(self):
+        return f'{self.name} {len(self)} words'
+
+    def sources(self, indexed_password: str):
+        """
+        :param indexed_password: the projected password
+        :type indexed_password: str
+        :return: the names of the dictionaries containing the word
+        :rtype: list[str]
+        """
+        return [self.name] if self.contains_exact(indexed_password) else []
+
+
+class MergedDictionary:
+    """
+    Several dictionaries merged into a single map, from each indexed word to the bit mask of the dictionaries it comes
+    from. A word shared by several dictionaries is stored once, a lookup is one probe whatever the number of
+    dictionaries, and the matching dictionaries come along for free
+    """
+    name: str
+    dictionary_names: list
+    words: dict
+    trie: WordTrie
+
+    def __init__(self, name: str = 'merged'):
+        self.name = name
+        self.dictionary_names = []
+        self.words = {}
+        self.trie = WordTrie()
+
+    def __repr__(self):
+        return f'{self.name} {len(self.words)} words from {len(self.dictionary_names)} dictionaries'
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def add(self, name: str, words):
+        """
+        Merge a dictionary in
+        :param name: the dictionary name
+        :type name: str
+        :param words: the indexed words
+        :type words: iterable[str]
+
+        >>> merged = MergedDictionary()
+        >>> merged.add('one', ['paf', 'ie', 'chien'])
+        >>> merged.add('two', ['fiap', 'ia', 'chien'])
+        >>> merged
+        merged 5 words from 2 dictionaries
+        """
+        bit = 1 << len(self.dictionary_names)
+        self.dictionary_names.append(name)
+        for word in words:
+            mask = self.words.get(word, 0) | bit
+            self.words[word] = mask
+            self.trie.add(word, mask)
+
+    def _copy(self, dictionary_names: list, words: dict):
+        merged = MergedDictionary(self.name)
+        merged.dictionary_names = dictionary_names
+        merged.words = words
+        for word, mask in words.items():
+            merged.trie.add(word, mask)
+        return merged
+
+    def with_dictionary(self, name: str, words):
+        """
+        A copy with one more dictionary merged in, the words of the others being reused as they are.
+        This one is left untouched, so it can still be walked meanwhile
+        :param name: the dictionary name
+        :type name: str
+        :param words: the indexed words
+        :type words: iterable[str]
+        :return: the new merged dictionary
+        :rtype: MergedDictionary
+
+        >>> merged = MergedDictionary()
+        >>> merged.add('one', ['paf', 'ie', 'chien'])
+        >>> merged.with_dictionary('two', ['fiap', 'ia', 'chien']).sources('chien')
+        ['one', 'two']
+        >>> merged
+        merged 3 words from 1 dictionaries
+        """
+        bit = 1 << len(self.dictionary_names)
+        merged_words = dict(self.words)
+        for word in words:
+            merged_words[word] = merged_words.get(word, 0) | bit
+        return self._copy(self.dictionary_names + [name], merged_words)
+
+    def without(self, name: str):
+        """
+        A copy with a dictionary removed. The bits of the following dictionaries are shifted down, and the words left
+        without any dictionary are dropped. This one is left untouched
+        :param name: the name of the dictionary to remove
+        :type name: str
+        :return: the new merged dictionary
+        :rtype: MergedDictionary
+
+        >>> merged = MergedDictionary()
+        >>> merged.add('one', ['paf', 'ie', 'chien'])
+        >>> merged.add('two', ['fiap', 'ia', 'chien'])
+        >>> merged.add('three', ['ia', 'girafe'])
+        >>> removed = merged.without('two')
+        >>> removed
+        merged 5 words from 2 dictionaries
+        >>> removed.sources('ia'), removed.sources('chien'), removed.contains_exact('fiap')
+        (['three'], ['one'], False)
+        """
+        removed = self.dictionary_names.index(name)
+        lower_bits = (1 << removed) - 1
+        words = {}
+        for word, mask in self.words.items():
+            mask = (mask & lower_bits) | ((mask >> (removed + 1)) << removed)
+            if mask:
+                words[word] = mask
+        return self._copy(self.dictionary_names[:removed] + self.dictionary_names[removed + 1:], words)
+
+    def contains_exact(self, indexed_password: str):
+        """
+        Check if the given password exist in any of the merged dictionaries.
+        :param indexed_password: the password to check, already projected
+        :type indexed_password: str
+        :return: True if it was found
+        :rtype: bool
+        """
+        return indexed_password in self.words
+
+    def sources(self, indexed_password: str):
+        """
+        :param indexed_password: the projected password
+        :type indexed_password: str
+        :return: the names of the dictionaries containing the word
+        :rtype: list[str]
+
+        >>> merged = MergedDictionary()
+        >>> merged.add('one', ['paf', 'ie', 'chien'])
+        >>> merged.add('two', ['fiap', 'ia', 'chien'])
+        >>> merged.sources('chien')
+        ['one', 'two']
+        >>> merged.sources('ia')
+        ['two']
+        >>> merged.sources('girafe')
+        []
+        """
+        mask = self.words.get(indexed_password, 0)
+        return [name for bit, name in enumerate(self.dictionary_names) if mask & (1 << bit)]
+
+    def walk(self, projected_chars: list, lengths: range, budget: WorkBudget = None):
+        """
+        Search for all the words that can be reached from the projected characters.
+        :param projected_chars: for each position in the password, the list of projected characters
+        :type projected_chars: list[list[str]]
+        :param lengths: the accepted lengths for a word to match
+        :type lengths: range
+        :param budget: the work that can be spent, the walk stopping when it is exhausted [None]
+        :type budget: WorkBudget
+        :return: a generator of the matching indexed words
+        :rtype: generator
+        """
+        return (word for word, _ in walk_projection(self.trie, projected_chars, lengths, budget))
+
+    def prefix_tree(self):
+        """
+        :return: the tree to be walked (see passwordChecker.trie.walk_projection)
+        :rtype: WordTrie
+        """
+        return self.trie
+
 
 class DictionaryChecker:
     """
-    Manages a list of dictionaries
+    Manages a list of dictionaries.
+    Once serving, dictionaries are changed with add_dictionary, remove_dictionary or swap: they prepare the new list
+    aside and publish it at once, checks in flight going on with the previous one
     """
 
-    def __init__(self, character_projector: CharacterProjector):
+    def __init__(self, character_projector: CharacterProjector, merged: bool = False, max_work: int = None,
+                 compact: bool = False):
+        """
+        :param character_projector: how to project characters
+        :type character_projector: CharacterProjector
+        :param merged: load all the dictionaries into a single MergedDictionary [False]
+        :type merged: bool
+        :param max_work: the steps a password search can take (see WorkBudget), None for no limit [None]
+        :type max_work: int
+        :param compact: hold each dictionary as a CompactDictionary rather than a PasswordDictionary, when not merged
+        [False]
+        :type compact: bool
+        """
         self.character_projector = character_projector
-        self.dictionaries = []
+        self.merged = merged
+        self.max_work = max_work
+        self.compact = compact
+        self._snapshot = _Snapshot(dictionaries=[], prefilter=None, generation=0, fuzzy_index=None,
+                                   word_automaton=None)
+        # serializes the changes, not the checks
+        self._update_lock = Lock()
+
+    @property
+    def dictionaries(self):
+        return self._snapshot.dictionaries
+
+    @dictionaries.setter
+    def dictionaries(self, dictionaries: list):
+        self._snapshot = self._snapshot._replace(dictionaries=dictionaries)
+
+    @property
+    def prefilter(self):
+        return self._snapshot.prefilter
+
+    @prefilter.setter
+    def prefilter(self, prefilter: BloomFilter):
+        self._snapshot = self._snapshot._replace(prefilter=prefilter)
+
+    @property
+    def fuzzy_index(self):
+        return self._snapshot.fuzzy_index
+
+    @fuzzy_index.setter
+    def fuzzy_index(self, fuzzy_index: DeletionIndex):
+        self._snapshot = self._snapshot._replace(fuzzy_index=fuzzy_index)
+
+    @property
+    def word_automaton(self):
+        return self._snapshot.word_automaton
+
+    @word_automaton.setter
+    def word_automaton(self, word_automaton: WordAutomaton):
+        self._snapshot = self._snapshot._replace(word_automaton=word_automaton)
+
+    @property
+    def generation(self):
+        """
+        Incremented each time dictionaries are loaded, so cached results can be dropped
+        """
+        return self._snapshot.generation
+
+    @generation.setter
+    def generation(self, generation: int):
+        self._snapshot = self._snapshot._replace(generation=generation)
 
     def __str__(self):
-        return f'{len(self.dictionaries)} dictionaries\n' + '\n'.join([str(d) for d in self.dictionaries])
+        return f'{len(self.dictionaries)} dictionaries\n' + '\n'.join([str(d) for d in self.dictionaries]) + \
+               (f'\n{self.prefilter}' if self.prefilter is not None else '') + \
+               (f'\n{self.fuzzy_index}' if self.fuzzy_index is not None else '') + \
+               (f'\n{self.word_automaton}' if self.word_automaton is not None else '')
 
-    def load_all_dictionaries(self, dirname: str):
+    def load_all_dictionaries(self, dirname: str, processes: int = None):
         """
-        Loads dictionaries from all the file found in the given directory and index them
+        Loads dictionaries from all the file found in the given directory and index them, in name order.
+        Files are projected in parallel (see passwordChecker.loader), and may be compressed (.gz, .xz)
         :param dirname: path to search into (no recursion)
         :type dirname: str
-        :param character_projector: how to project characters
-        :type character_projector: CharacterProjector
+        :param processes: the processes projecting the files, 1 to do it in this process [cpu count]
+        :type processes: int
+        """
+        from os import listdir, path
+        filenames = [f'{dirname}/{filename}' for filename in sorted(listdir(dirname))
+                     if path.isfile(f'{dirname}/{filename}')]
+        with self._update_lock:
+            dictionaries = list(self.dictionaries)
+            merged = None
+            for filename, words in loader.read_all_words(filenames, self.character_projector, processes):
+                if not self.merged:
+                    dico = self._new_dictionary(filename, words)
+                    print(f'Loaded dictionary {dico}')
+                    dictionaries.append(dico)
+                    continue
+                if merged is None:
+                    # the published merged dictionary may be walked by checks in flight: the words go into a copy
+                    position = next((i for i, d in enumerate(dictionaries) if isinstance(d, MergedDictionary)),
+                                    len(dictionaries))
+                    merged = dictionaries[position] if position < len(dictionaries) else MergedDictionary()
+                    merged = merged.with_dictionary(filename, words)
+                    dictionaries[position:position + 1] = [merged]
+                else:
+                    merged.add(filename, words)
+                print(f'Loaded dictionary {filename} into {merged}')
+            self._publish_loaded(dictionaries)
+
+    def _publish_loaded(self, dictionaries: list):
+        """
+        Publish a new list of dictionaries in one step, without the prefilter, fuzzy index and word automaton, which
+        would not know about the new words
+        :param dictionaries: the new dictionaries
+        :type dictionaries: list
+        """
+        self._snapshot = self._snapshot._replace(dictionaries=dictionaries, prefilter=None, fuzzy_index=None,
+                                                 word_automaton=None, generation=self.generation + 1)
+
+    def _new_dictionary(self, name: str, words):
+        """
+        :return: a dictionary of the given words, compact or not
+        :rtype: PasswordDictionary | CompactDictionary
+        """
+        return CompactDictionary(name, words) if self.compact else PasswordDictionary(name, words)
+
+    def load_index(self, filename: str):
+        """
+        Loads a compiled index file (see passwordChecker.index), memory mapped so it is shared among processes
+        :param filename: the index file
+        :type filename: str
+        """
+        index = MappedIndex(filename)
+        print(f'Loaded index {index}')
+        with self._update_lock:
+            self._publish_loaded(self.dictionaries + [index])
+
+    def load_hashed_dictionary(self, filename: str):
+        """
+        Loads a hashed dictionary file (see passwordChecker.hashed), typically a large breach corpus, memory mapped
+        :param filename: the hashed dictionary file
+        :type filename: str
+        """
+        dictionary = HashedDictionary(filename)
+        print(f'Loaded hashed dictionary {dictionary}')
+        with self._update_lock:
+            self._publish_loaded(self.dictionaries + [dictionary])
+
+    def swap(self, other):
+        """
+        Replace all the dictionaries (and prefilter, fuzzy index and word automaton) by the ones of another checker,
+        typically loaded in the background, in one step
+        :param other: the checker holding the new dictionaries
+        :type other: DictionaryChecker
+        """
+        with self._update_lock:
+            self._snapshot = _Snapshot(dictionaries=list(other.dictionaries), prefilter=other.prefilter,
+                                       generation=max(self.generation, other.generation) + 1,
+                                       fuzzy_index=other.fuzzy_index, word_automaton=other.word_automaton)
+
+    def add_dictionary(self, filename: str):
+        """
+        Load a dictionary file, or reload it if a dictionary of the same name is there, without touching the others:
+        words are projected aside, then the new list of dictionaries is published in one step.
+        In merged mode, the word masks of the others are copied, not projected again
+        :param filename: the dictionary file, which is also its name
+        :type filename: str
+        """
+        words = self.read_words(filename)
+        with self._update_lock:
+            dictionaries = self._without(filename)
+            if self.merged:
+                position, merged = next(((i, d) for i, d in enumerate(dictionaries) if isinstance(d, MergedDictionary)),
+                                        (len(dictionaries), MergedDictionary()))
+                dictionaries[position:position + 1] = [merged.with_dictionary(filename, words)]
+            else:
+                dictionaries.append(self._new_dictionary(filename, words))
+            # the words of a replaced dictionary left in the prefilter only cost false positives, whereas the fuzzy
+            # index would report them, and the failure links of the word automaton would have to be computed again:
+            # all of them are built aside, the published ones being read by the checks in flight
+            prefilter, fuzzy_index, word_automaton = self.prefilter, self.fuzzy_index, self.word_automaton
+            if prefilter is not None:
+                prefilter = prefilter.copy()
+                for word in words:
+                    prefilter.add(word)
+            if fuzzy_index is not None:
+                fuzzy_index = self._build_fuzzy_index(dictionaries, fuzzy_index.max_distance)
+            if word_automaton is not None:
+                word_automaton = self._build_word_automaton(dictionaries, word_automaton.min_length)
+            self._snapshot = _Snapshot(dictionaries=dictionaries, prefilter=prefilter, generation=self.generation + 1,
+                                       fuzzy_index=fuzzy_index, word_automaton=word_automaton)
+        print(f'Loaded dictionary {filename} {len(words)} words')
+
+    def remove_dictionary(self, name: str):
+        """
+        Remove a dictionary, without touching the others
+        :param name: the dictionary name
+        :type name: str
+        """
+        with self._update_lock:
+            dictionaries = self._without(name)
+            if dictionaries == self.dictionaries:
+                raise ValueError(f'No dictionary {name}')
+            # the words left in the prefilter only cost false positives, which the dictionaries then rule out,
+            # whereas the fuzzy index and word automaton would report the removed words: they are built again, aside
+            fuzzy_index, word_automaton = self.fuzzy_index, self.word_automaton
+            if fuzzy_index is not None:
+                fuzzy_index = self._build_fuzzy_index(dictionaries, fuzzy_index.max_distance)
+            if word_automaton is not None:
+                word_automaton = self._build_word_automaton(dictionaries, word_automaton.min_length)
+            self._snapshot = _Snapshot(dictionaries=dictionaries, prefilter=self.prefilter,
+                                       generation=self.generation + 1, fuzzy_index=fuzzy_index,
+                                       word_automaton=word_automaton)
+        print(f'Removed dictionary {name}')
+
+    def _without(self, name: str):
+        """
+        :return: a new list of the dictionaries, without the named one, be it on its own or merged
+        :rtype: list
+        """
+        dictionaries = []
+        for dictionary in self.dictionaries:
+            if dictionary.name == name:
+                continue
+            if name in getattr(dictionary, 'dictionary_names', ()):
+                if not isinstance(dictionary, MergedDictionary):
+                    raise ValueError(f'{name} is compiled in {dictionary.name}, which must be compiled again')
+                dictionary = dictionary.without(name)
+            dictionaries.append(dictionary)
+        return dictionaries
+
+    def build_prefilter(self, error_rate: float = 0.01):
+        """
+        Build a Bloom filter over all the loaded words, consulted before walking the dictionaries, so most of the
+        absent passwords are answered from a few bits. Loading other dictionaries afterwards drops it.
+        :param error_rate: the false positive rate [0.01]
+        :type error_rate: float
+        :return: the built filter
+        :rtype: BloomFilter
+        """
+        words = set()
+        for dictionary in self.dictionaries:
+            if not hasattr(dictionary, '__iter__'):
+                raise ValueError(f'Cannot build a prefilter, {dictionary} does not list its words')
+            words.update(dictionary)
+        self.prefilter = BloomFilter(len(words), error_rate)
+        for word in words:
+            self.prefilter.add(word)
+        return self.prefilter
+
+    @staticmethod
+    def _listed_words(dictionaries: list):
+        words = set()
+        for dictionary in dictionaries:
+            # the hashed dictionaries cannot tell their words
+            if hasattr(dictionary, '__iter__'):
+                words.update(dictionary)
+        return words
+
+    @staticmethod
+    def _build_fuzzy_index(dictionaries: list, max_distance: int):
+        return DeletionIndex(DictionaryChecker._listed_words(dictionaries), max_distance)
+
+    def build_fuzzy_index(self, max_distance: int = None):
+        """
+        Index the words of the loaded dictionaries for fuzzy_match, all but the hashed ones, whose words are not known.
+        Loading other dictionaries afterwards drops it
+        :param max_distance: the largest edit distance searched for [the max_edit_distance of the ScramblingParams]
+        :type max_distance: int
+        :return: the built index
+        :rtype: DeletionIndex
+        """
+        if max_distance is None:
+            max_distance = self.character_projector.scrambling_params.max_edit_distance
+        self.fuzzy_index = self._build_fuzzy_index(self.dictionaries, max_distance)
+        return self.fuzzy_index
+
+    @staticmethod
+    def _build_word_automaton(dictionaries: list, min_length: int):
+        return WordAutomaton(DictionaryChecker._listed_words(dictionaries), min_length)
+
+    def build_word_automaton(self, min_length: int = None):
+        """
+        Build the automaton of embedded_words and of the dictionary patterns of passwordChecker.estimator, over the
+        words of the loaded dictionaries, all but the hashed ones. Loading other dictionaries afterwards drops it
+        :param min_length: the shortest words to be found [the shortest of the min_embedded_length of the
+            ScramblingParams, if any, and MIN_WORD_PATTERN_LENGTH]
+        :type min_length: int
+        :return: the built automaton
+        :rtype: WordAutomaton
         """
-        from os import listdir
-        files = listdir(dirname)
-        for filename in files:
-            dico = self.load_dictionary(f'{dirname}/{filename}')
-            print(f'Loaded dictionary {dico}')
-            self.dictionaries.append(dico)
+        if min_length is None:
+            min_embedded_length = self.character_projector.scrambling_params.min_embedded_length
+            min_length = min(min_embedded_length or MIN_WORD_PATTERN_LENGTH, MIN_WORD_PATTERN_LENGTH)
+        self.word_automaton = self._build_word_automaton(self.dictionaries, min_length)
+        return self.word_automaton
 
-    def contains(self, password: str):
+    def load_prefilter(self, filename: str):
+        """
+        Load a Bloom filter saved from build_prefilter().save(filename). It must have been built from the same words
+        :param filename: the saved filter
+        :type filename: str
+        """
+        self.prefilter = BloomFilter.load(filename)
+
+    def new_budget(self):
+        """
+        :return: the budget for the search of one password, None if it is not limited
+        :rtype: WorkBudget
+        """
+        return WorkBudget(self.max_work) if self.max_work is not None else None
+
+    def _rejected_by_prefilter(self, prefilter: BloomFilter, password: str, projected_chars: list, lengths: range):
+        """
+        :return: True if the prefilter tells for sure that no candidate can be in the dictionaries
+        """
+        if prefilter is None:
+            return False
+        candidate_counts = [1]
+        for alternatives in projected_chars:
+            candidate_counts.append(candidate_counts[-1] * len(alternatives))
+        if sum(candidate_counts[length] for length in lengths) > _MAX_PREFILTERED_CANDIDATES:
+            return False
+        return not any(c in prefilter for c in self.character_projector.iter_indexes(password))
+
+    def contains(self, password: str, budget: WorkBudget = None):
         """
         Check if the given password exist in any of the dictionaries. Let's remember that the password were indexed
         :param password: the password to check
         :type password: str
-        :return: True if it was found
+        :param budget: the work that can be spent on the search, shared by all the dictionaries [new_budget()]
+        :type budget: WorkBudget
+        :return: True if it was found, False if not or if the budget was exhausted before
         :rtype: bool
 
         >>> dicoChecker = DictionaryChecker(CharacterProjector())
@@ -81,16 +641,140 @@ class DictionaryChecker:
         True
         >>> dicoChecker.contains('paf')
         True
+        >>> dicoChecker.contains('9999999999990000')
+        False
+        >>> budget = WorkBudget(3)
+        >>> dicoChecker.contains('chien', budget), budget.exceeded
+        (False, True)
         """
+        if budget is None:
+            budget = self.new_budget()
 
-        index_to_search = self.character_projector.potential_indexes(password)
-        for to_search in index_to_search:
-            for dictionary in self.dictionaries:
-                if dictionary.contains_exact(to_search):
-                    return True
+        lengths = self.character_projector.truncation_lengths(password)
+        projected_chars = self.character_projector.project_chars(password[0:lengths[-1]])
+        snapshot = self._snapshot
+        if self._rejected_by_prefilter(snapshot.prefilter, password, projected_chars, lengths):
+            return False
+        for dictionary in snapshot.dictionaries:
+            for _ in dictionary.walk(projected_chars, lengths, budget):
+                return True
 
         return False
 
+    def matching_dictionaries(self, password: str, budget: WorkBudget = None):
+        """
+        Get the names of all the dictionaries the password was found in
+        :param password: the password to check
+        :type password: str
+        :param budget: the work that can be spent on the search, shared by all the dictionaries [new_budget()]
+        :type budget: WorkBudget
+        :return: the sorted dictionary names, empty if the password was not found. Only the dictionaries found before
+            the budget was exhausted are listed
+        :rtype: list[str]
+
+        >>> from passwordChecker.substitute import ScramblingParams
+        >>> dicoChecker = DictionaryChecker(CharacterProjector(scrambling_params=ScramblingParams(max_trailing=2)), merged=True)
+        >>> merged = MergedDictionary()
+        >>> merged.add('flap', ['fiap', 'ia', 'girafe'])
+        >>> merged.add('paf', ['paf', 'ie', 'chien', 'ia'])
+        >>> dicoChecker.dictionaries = [merged]
+        >>> dicoChecker.matching_dictionaries('LA12')
+        ['flap', 'paf']
+        >>> dicoChecker.matching_dictionaries('Ch1en')
+        ['paf']
+        >>> dicoChecker.matching_dictionaries('42')
+        []
+        """
+        if budget is None:
+            budget = self.new_budget()
+        lengths = self.character_projector.truncation_lengths(password)
+        projected_chars = self.character_projector.project_chars(password[0:lengths[-1]])
+        snapshot = self._snapshot
+        if self._rejected_by_prefilter(snapshot.prefilter, password, projected_chars, lengths):
+            return []
+        names = set()
+        for dictionary in snapshot.dictionaries:
+            for word in dictionary.walk(projected_chars, lengths, budget):
+                names.update(dictionary.sources(word))
+        return sorted(names)
+
+    def fuzzy_match(self, password: str, budget: WorkBudget = None):
+        """
+        Get the dictionary word nearest to a candidate of the password (see CharacterProjector.iter_indexes), within
+        the distance of the fuzzy index. Exact matches are better found by matching_dictionaries
+        :param password: the password to check
+        :type password: str
+        :param budget: the work that can be spent, on the candidates and their lookups [new_budget()]
+        :type budget: WorkBudget
+        :return: the nearest word, with the dictionaries it comes from, None if there is none or no fuzzy index was
+            built
+        :rtype: FuzzyMatch
+
+        >>> dicoChecker = DictionaryChecker(CharacterProjector())
+        >>> dicoChecker.dictionaries = [PasswordDictionary('flap', ['fiap', 'ia', 'girafe']), PasswordDictionary('paf', ['paf', 'ie', 'chien'])]
+        >>> dicoChecker.fuzzy_match('chiien') is None
+        True
+        >>> dicoChecker.build_fuzzy_index(max_distance=1)
+        deletion index of 3 words, 18 deletions, distance 1
+        >>> dicoChecker.fuzzy_match('chiien').serialize()
+        {'word': 'chien', 'distance': 1, 'dictionaries': ['paf']}
+        >>> dicoChecker.fuzzy_match('GIRAF').serialize()
+        {'word': 'girafe', 'distance': 1, 'dictionaries': ['flap']}
+        """
+        if budget is None:
+            budget = self.new_budget()
+        snapshot = self._snapshot
+        if snapshot.fuzzy_index is None:
+            return None
+        best = None
+        for candidate in self.character_projector.iter_indexes(password, budget):
+            match = snapshot.fuzzy_index.nearest(candidate, budget)
+            if match is not None and (best is None or (match.distance, match.word) < (best.distance, best.word)):
+                best = match
+        if best is None:
+            return None
+        names = set()
+        for dictionary in snapshot.dictionaries:
+            names.update(dictionary.sources(best.word))
+        return FuzzyMatch(best.word, best.distance, sorted(names))
+
+    def embedded_words(self, password: str, budget: WorkBudget = None):
+        """
+        Get all the dictionary words found anywhere within the password, with their positions, in one pass
+        :param password: the password to check
+        :type password: str
+        :param budget: the work that can be spent on the scan (see WordAutomaton.scan) [new_budget()]
+        :type budget: WorkBudget
+        :return: the words of at least the min_embedded_length of the ScramblingParams found, by end then start
+            position, empty if it is 0 or no word automaton was built
+        :rtype: list[EmbeddedWord]
+
+        >>> from passwordChecker.substitute import ScramblingParams
+        >>> dicoChecker = DictionaryChecker(CharacterProjector(scrambling_params=ScramblingParams(min_embedded_length=3)))
+        >>> dicoChecker.dictionaries = [PasswordDictionary('flap', ['fiap', 'ia', 'girafe']), PasswordDictionary('paf', ['paf', 'ie', 'chien'])]
+        >>> dicoChecker.build_word_automaton()
+        word automaton of 4 words, 19 states
+        >>> dicoChecker.embedded_words('xxCh1en2020yy')
+        [chien[2:7]]
+        >>> [w.serialize() for w in dicoChecker.embedded_words('monpafg1raf3')]
+        [{'word': 'paf', 'start': 3, 'end': 6, 'dictionaries': ['paf']}, {'word': 'girafe', 'start': 6, 'end': 12, 'dictionaries': ['flap']}]
+        """
+        if budget is None:
+            budget = self.new_budget()
+        min_length = self.character_projector.scrambling_params.min_embedded_length
+        snapshot = self._snapshot
+        if snapshot.word_automaton is None or min_length == 0:
+            return []
+        found = []
+        for start, end, word in snapshot.word_automaton.scan(self.character_projector.project_chars(password), budget):
+            if len(word) < min_length:
+                continue
+            names = set()
+            for dictionary in snapshot.dictionaries:
+                names.update(dictionary.sources(word))
+            found.append(EmbeddedWord(word, start, end, sorted(names)))
+        return found
+
     def load_dictionary(self, filename: str):
         """
         Load all the word (one per line) from a text file into a PasswordDictionary.
@@ -103,8 +787,14 @@ class DictionaryChecker:
         :return: the loaded dictionary with its words and filename as name
         :rtype: PasswordDictionary
         """
-        f = open(filename, "r")
-        words = [self.character_projector.index_password(w.strip())
-                 for w in list(f)]
-        f.close()
-        return PasswordDictionary(filename, list(chain(*words)))
+        return PasswordDictionary(filename, self.read_words(filename))
+
+    def read_words(self, filename: str):
+        """
+        Read and index all the words (one per line) from a text file, possibly compressed (.gz, .xz)
+        :param filename: the dictionary file
+        :type filename: str
+        :return: the indexed words
+        :rtype: set[str]
+        """
+        return loader.read_words(filename, self.character_projector)
@@ -0,0 +1,173 @@
+# Dictionary words are looked for at the start of a password only, up to its trailing numbers/punctuation: 'chien42'
+# is found, 'xxchien2020yy' or 'monpafdog' are not. An Aho-Corasick automaton over the projected words finds all the
+# words embedded anywhere in a password, in one pass over its characters, instead of searching every substring.
+# The automaton is the prefix tree of the words, plus for each node a failure link to the longest suffix of its
+# prefix that is also a prefix in the tree, followed when the next character leads nowhere.
+from collections import deque
+
+from passwordChecker.budget import WorkBudget
+
+
+class EmbeddedWord:
+    """
+    A dictionary word found within a password
+    """
+    word: str
+    start: int
+    end: int
+    dictionaries: list
+
+    def __init__(self, word: str, start: int, end: int, dictionaries: list = ()):
+        """
+        :param word: the projected dictionary word
+        :type word: str
+        :param start: the position of its first character in the password
+        :type start: int
+        :param end: the position after its last character in the password
+        :type end: int
+        :param dictionaries: the names of the dictionaries containing the word [()]
+        :type dictionaries: list[str]
+        """
+        self.word = word
+        self.start = start
+        self.end = end
+        self.dictionaries = list(dictionaries)
+
+    def __repr__(self):
+        return f'{self.word}[{self.start}:{self.end}]'
+
+    def serialize(self):
+        return {
+            "word": self.word,
+            "start": self.start,
+            "end": self.end,
+            "dictionaries": self.dictionaries
+        }
+
+
+class WordAutomaton:
+    """
+    An Aho-Corasick automaton over projected words.
+    Words shorter than min_length are left out, as they are found within about any password
+
+    >>> automaton = WordAutomaton(['chien', 'hien', 'paf', 'pafdog'], min_length=3)
+    >>> list(automaton.scan([[c] for c in 'xxchien20']))
+    [(2, 7, 'chien'), (3, 7, 'hien')]
+    >>> list(automaton.scan([[c] for c in 'monpafdog']))
+    [(3, 6, 'paf'), (3, 9, 'pafdog')]
+    >>> list(automaton.scan([['p'], ['a', 'q'], ['f']]))
+    [(0, 3, 'paf')]
+    """
+    min_length: int
+
+    def __init__(self, words, min_length: int = 4):
+        """
+        :param words: the projected words
+        :type words: iterable[str]
+        :param min_length: the shortest words to be found [4]
+        :type min_length: int
+        """
+        self.min_length = min_length
+        # state -> (char -> next state), the state 0 being the root
+        self._goto = [{}]
+        # state -> the word ending on it
+        self._words = {}
+        for word in words:
+            if len(word) < min_length:
+                continue
+            state = 0
+            for c in word:
+                child = self._goto[state].get(c)
+                if child is None:
+                    child = self._goto[state][c] = len(self._goto)
+                    self._goto.append({})
+                state = child
+            self._words[state] = word
+
+        # breadth first, so the failure links of the shorter prefixes are known
+        self._fail = [0] * len(self._goto)
+        # state -> the next state on the failure links where a word ends, 0 if none
+        self._output = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for c, child in self._goto[state].items():
+                queue.append(child)
+                fail = self._fail[state]
+                while fail and c not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(c, 0)
+                self._fail[child] = fail
+                self._output[child] = fail if fail in self._words else self._output[fail]
+
+    def __repr__(self):
+        return f'word automaton of {len(self._words)} words, {len(self._goto)} states'
+
+    def __len__(self):
+        return len(self._words)
+
+    def advance(self, states: set, alternatives: list, budget: WorkBudget = None):
+        """
+        One step of a scan: follow the next character of the password from the current states
+        :param states: the current states, {0} at the start of the password
+        :type states: set[int]
+        :param alternatives: the projected characters at this position
+        :type alternatives: list[str]
+        :param budget: one step is spent per state and alternative [None]
+        :type budget: WorkBudget
+        :return: the next states, None if the budget was exhausted
+        :rtype: set[int]
+        """
+        goto, fail = self._goto, self._fail
+        next_states = set()
+        for state in states:
+            for c in alternatives:
+                if budget is not None and not budget.spend():
+                    return None
+                s = state
+                while s and c not in goto[s]:
+                    s = fail[s]
+                next_states.add(goto[s].get(c, 0))
+        return next_states
+
+    def ending(self, states: set):
+        """
+        :param states: the states reached by advance
+        :type states: set[int]
+        :return: the words ending on the last character followed, each one once, longest first for each state
+        :rtype: generator
+        >>> automaton = WordAutomaton(['chien', 'hien'], min_length=3)
+        >>> def reach(word):
+        ...     states = {0}
+        ...     for c in word:
+        ...         states = automaton.advance(states, [c])
+        ...     return states
+        >>> sorted(automaton.ending(reach('chien') | reach('hien')))
+        ['chien', 'hien']
+        """
+        output, words = self._output, self._words
+        # the states share the end of their output chains (all the projections of '9999' end with the words of '999')
+        seen = set()
+        for state in states:
+            state = state if state in words else output[state]
+            while state and state not in seen:
+                seen.add(state)
+                yield words[state]
+                state = output[state]
+
+    def scan(self, projected_chars: list, budget: WorkBudget = None):
+        """
+        Find all the words within a password, all its projection alternatives being followed at once
+        :param projected_chars: for each position in the password, the list of projected characters
+        :type projected_chars: list[list[str]]
+        :param budget: one step is spent per state and alternative, the scan stops when it is exhausted [None]
+        :type budget: WorkBudget
+        :return: a generator of the (start, end, word) found, by end then start position
+        :rtype: generator
+        """
+        states = {0}
+        for end, alternatives in enumerate(projected_chars, 1):
+            states = self.advance(states, alternatives, budget)
+            if states is None:
+                return
+            yield from sorted({(end - len(word), end, word) for word in self.ending(states)})
@@ -0,0 +1,460 @@
+# compute_brute_force_ms takes every password for random characters, so 'Password2020!' looks as strong as any 13
+# characters. Attackers rather try dictionary words, keyboard walks, repeats, sequences and dates first.
+# In the way of zxcvbn, the password is split into such patterns, each taking a number of guesses, and the
+# segmentation needing the fewest guesses overall, the password estimate, is found by dynamic programming.
+# The pattern matchers and the dynamic programming share a single pass over the characters: the patterns ending on a
+# character are known as soon as it is read, and so is the best segmentation up to it, so a password being typed is
+# estimated incrementally (see GuessEstimator). Only the first MAX_ANALYZED_LENGTH characters are analysed, so the time
+# is bounded whatever the input.
+from copy import copy
+from functools import lru_cache
+from math import comb, factorial, log10
+
+from passwordChecker.budget import WorkBudget
+from passwordChecker.complexity import alphabet_size, char_types_alphabet_size, get_char_type
+
+MAX_ANALYZED_LENGTH = 100
+# more patterns cost a factorial of their count, so past a few of them a brute force is always cheaper
+MAX_PATTERNS = 10
+# the dictionary words shorter than this are better brute forced
+MIN_WORD_PATTERN_LENGTH = 3
+# the same hardware as compute_brute_force_ms
+GUESSES_PER_SECOND = 317900000000
+# dates and years are guessed starting from this one
+REFERENCE_YEAR = 2020
+MIN_YEAR_SPACE = 20
+
+_MIN_RUN_LENGTH = 3
+_KEYBOARDS = {
+    'qwerty': ['1234567890-=', 'qwertyuiop[]', "asdfghjkl;'", 'zxcvbnm,./'],
+    'azerty': ['1234567890)=', 'azertyuiop^$', 'qsdfghjklmù', 'wxcvbn,;:!'],
+}
+# each row being shifted right by about half a key, (r + 1, i - 1) and (r + 1, i) are below (r, i)
+_KEY_STEPS = {(0, -1), (0, 1), (-1, 0), (-1, 1), (1, -1), (1, 0)}
+
+
+class Pattern:
+    """
+    A part of a password, and the guesses it takes
+    """
+    kind: str
+    start: int
+    end: int
+    log10_guesses: float
+
+    def __init__(self, kind: str, start: int, end: int, log10_guesses: float):
+        """
+        :param kind: 'dictionary', 'keyboard', 'repeat', 'sequence', 'date', 'year' or 'bruteforce'
+        :type kind: str
+        :param start: the position of its first character in the password
+        :type start: int
+        :param end: the position after its last character in the password
+        :type end: int
+        :param log10_guesses: the decimal logarithm of its guesses
+        :type log10_guesses: float
+        """
+        self.kind = kind
+        self.start = start
+        self.end = end
+        self.log10_guesses = log10_guesses
+
+    def __repr__(self):
+        return f'{self.kind}[{self.start}:{self.end}]'
+
+    def serialize(self):
+        return {
+            "kind": self.kind,
+            "start": self.start,
+            "end": self.end,
+            "guesses": round(10 ** self.log10_guesses)
+        }
+
+
+class GuessEstimate:
+    """
+    The guesses needed to find a password, and the patterns they come from
+    """
+    log10_guesses: float
+    patterns: list
+
+    def __init__(self, log10_guesses: float, patterns: list):
+        """
+        :param log10_guesses: the decimal logarithm of the guesses
+        :type log10_guesses: float
+        :param patterns: the segmentation of the password
+        :type patterns: list[Pattern]
+        """
+        self.log10_guesses = log10_guesses
+        self.patterns = patterns
+
+    def __repr__(self):
+        return f'10^{self.log10_guesses:.1f} guesses {self.patterns}'
+
+    @property
+    def guesses(self):
+        return round(10 ** self.log10_guesses)
+
+    @property
+    def crack_time_ms(self):
+        """
+        :return: the milliseconds to make the guesses at GUESSES_PER_SECOND
+        :rtype: float
+        """
+        return 10 ** (self.log10_guesses - log10(GUESSES_PER_SECOND) + 3)
+
+
+@lru_cache(maxsize=4096)
+def _case_variations(token: str, word: str):
+    """
+    The ways of altering the characters of a dictionary word (case, substitutions) an attacker tries before reaching
+    the token, the common capitalizations first
+    >>> _case_variations('chien', 'chien'), _case_variations('Chien', 'chien'), _case_variations('ch1En', 'chien')
+    (1, 2, 15)
+    """
+    altered = sum(a != b for a, b in zip(token, word))
+    if altered == 0:
+        return 1
+    if token[1:] == word[1:] or token == word.upper():
+        return 2
+    return max(2, sum(comb(len(token), i) for i in range(1, min(altered, len(token) - altered) + 1)))
+
+
+def _date_log10_guesses(year: int):
+    return log10(max(abs(year - REFERENCE_YEAR), MIN_YEAR_SPACE))
+
+
+def _full_year(year: int):
+    return year + (1900 if year > 50 else 2000)
+
+
+def _is_day_month(day: int, month: int):
+    return 1 <= day <= 31 and 1 <= month <= 12
+
+
+def _date_pattern(digits: str, start: int, end: int):
+    """
+    :param digits: 4, 6 or 8 digits
+    :return: the cheapest reading of the digits as a year or a date, or None
+    :rtype: Pattern
+    >>> _date_pattern('1987', 0, 4), _date_pattern('140789', 0, 6), _date_pattern('20200229', 0, 8)
+    (year[0:4], date[0:6], date[0:8])
+    """
+    candidates = []
+    if len(digits) == 4:
+        year = int(digits)
+        if 1900 <= year <= 2099:
+            candidates.append(Pattern('year', start, end, _date_log10_guesses(year)))
+        if _is_day_month(int(digits[:2]), int(digits[2:])) or _is_day_month(int(digits[2:]), int(digits[:2])):
+            candidates.append(Pattern('date', start, end, log10(366)))
+    elif len(digits) == 6:
+        for day_month, year in [(digits[:4], digits[4:]), (digits[2:], digits[:2])]:
+            if _is_day_month(int(day_month[:2]), int(day_month[2:])) or \
+                    _is_day_month(int(day_month[2:]), int(day_month[:2])):
+                candidates.append(Pattern('date', start, end, log10(366) + _date_log10_guesses(_full_year(int(year)))))
+    else:
+        for day_month, year in [(digits[:4], digits[4:]), (digits[4:], digits[:4])]:
+            if 1900 <= int(year) <= 2099 and (_is_day_month(int(day_month[:2]), int(day_month[2:])) or
+                                               _is_day_month(int(day_month[2:]), int(day_month[:2]))):
+                candidates.append(Pattern('date', start, end, log10(366) + _date_log10_guesses(int(year))))
+    return min(candidates, key=lambda p: p.log10_guesses, default=None)
+
+
+class _RepeatMatcher:
+    """
+    Runs of the same character: 'aaaa'
+    """
+
+    def __init__(self):
+        self.start = 0
+        self.previous = None
+
+    def next(self, i: int, c: str):
+        if c != self.previous:
+            self.start = i
+            self.previous = c
+        length = i + 1 - self.start
+        if length >= _MIN_RUN_LENGTH:
+            yield Pattern('repeat', self.start, i + 1, log10(char_types_alphabet_size({get_char_type(c)}) * length))
+
+
+class _SequenceMatcher:
+    """
+    Runs of consecutive characters, upwards or downwards: 'abcd', '4321'
+    """
+
+    def __init__(self):
+        self.start = 0
+        self.first = None
+        self.previous = None
+        self.delta = None
+
+    def next(self, i: int, c: str):
+        delta = ord(c) - ord(self.previous) if self.previous is not None else None
+        if delta not in (-1, 1):
+            self.start, self.first = i, c
+        elif delta != self.delta:
+            self.start, self.first = i - 1, self.previous
+        self.previous, self.delta = c, delta
+        length = i + 1 - self.start
+        if length >= _MIN_RUN_LENGTH:
+            # the obvious starts are tried first
+            base = 4 if self.first in 'aAzZ019' else 10 if self.first.isdigit() else 26
+            yield Pattern('sequence', self.start, i + 1, log10(base * length * (2 if delta < 0 else 1)))
+
+
+def _key_positions(rows: list):
+    return {c: (r, i) for r, row in enumerate(rows) for i, c in enumerate(row)}
+
+
+def _average_degree(positions: dict):
+    keys = set(positions.values())
+    return sum((r + dr, i + di) in keys for r, i in keys for dr, di in _KEY_STEPS) / len(keys)
+
+
+_keyboard_positions = {name: _key_positions(rows) for name, rows in _KEYBOARDS.items()}
+_keyboard_degrees = {name: _average_degree(positions) for name, positions in _keyboard_positions.items()}
+
+
+class _KeyboardMatcher:
+    """
+    Walks of adjacent keys on a keyboard layout: 'azerty', 'qsdf', '1qaz'
+    """
+
+    def __init__(self, keyboard: str):
+        self.positions = _keyboard_positions[keyboard]
+        self.degree = _keyboard_degrees[keyboard]
+        self.start = 0
+        self.previous = None
+        self.direction = None
+        self.turns = 0
+
+    def next(self, i: int, c: str):
+        position = self.positions.get(c.lower())
+        step = (position[0] - self.previous[0], position[1] - self.previous[1]) \
+            if position is not None and self.previous is not None else None
+        if step in _KEY_STEPS:
+            if step != self.direction:
+                self.direction = step
+                self.turns += 1
+        else:
+            self.start, self.direction, self.turns = i, None, 0
+        self.previous = position
+        length = i + 1 - self.start
+        if length >= _MIN_RUN_LENGTH:
+            yield Pattern('keyboard', self.start, i + 1,
+                          _keyboard_log10_guesses(len(self.positions), self.degree, length, self.turns))
+
+
+@lru_cache(maxsize=4096)
+def _keyboard_log10_guesses(keys: int, degree: float, length: int, turns: int):
+    """
+    The walks of up to this length and turns: any start, then a direction out of degree at each turn
+    """
+    return log10(sum(comb(i - 1, j - 1) * keys * degree ** j
+                     for i in range(2, length + 1) for j in range(1, min(turns, i - 1) + 1)))
+
+
+class _DateMatcher:
+    """
+    Years and dates, without separators: '1987', '140789', '20200229'
+    """
+
+    def __init__(self):
+        self.digits = ''
+
+    def next(self, i: int, c: str):
+        if c not in '0123456789':
+            self.digits = ''
+            return
+        self.digits = self.digits[-7:] + c
+        for length in (4, 6, 8):
+            if len(self.digits) >= length:
+                pattern = _date_pattern(self.digits[-length:], i + 1 - length, i + 1)
+                if pattern is not None:
+                    yield pattern
+
+
+class _DictionaryMatcher:
+    """
+    The dictionary words within the password, through all their projections (see WordAutomaton)
+    """
+
+    def __init__(self, dictionary_checker, budget: WorkBudget):
+        self.automaton = dictionary_checker.word_automaton
+        self.project_char = dictionary_checker.character_projector.project_char
+        self.budget = budget
+        self.password = ''
+        self.states = {0}
+        # the dictionaries are not ranked by frequency: a word is found half way through them on average
+        self.log10_rank = log10(max(1, len(self.automaton) / 2))
+
+    def next(self, i: int, c: str):
+        self.password += c
+        if self.states is None:
+            return
+        self.states = self.automaton.advance(self.states, self.project_char(c), self.budget)
+        if self.states is None:
+            return
+        # the words of a same length, all projections of the same characters, only differ by their variations
+        cheapest = {}
+        for word in self.automaton.ending(self.states):
+            if len(word) >= MIN_WORD_PATTERN_LENGTH:
+                start = i + 1 - len(word)
+                log10_guesses = self.log10_rank + log10(_case_variations(self.password[start:], word))
+                if log10_guesses < cheapest.get(start, float('inf')):
+                    cheapest[start] = log10_guesses
+        for start, log10_guesses in cheapest.items():
+            yield Pattern('dictionary', start, i + 1, log10_guesses)
+
+
+class GuessEstimator:
+    """
+    The estimate of a password read one character at a time (see estimate_guesses): each character only advances the
+    matchers and the dynamic programming. The brute force guesses of a character depend on the alphabet of the whole
+    password, so it is set beforehand. Undoable, the last characters can also be removed, the state before each
+    character being kept
+
+    >>> estimator = GuessEstimator(alphabet_size('azerty123'), undoable=True)
+    >>> estimator.append('azerty12')
+    >>> estimator.pop()
+    >>> estimator.append('23')
+    >>> estimator.estimate()
+    10^4.4 guesses [keyboard[0:6], sequence[6:9]]
+    """
+    log10_alphabet: float
+    undoable: bool
+
+    def __init__(self, alphabet_length: int, dictionary_checker=None, budget: WorkBudget = None,
+                 undoable: bool = False):
+        """
+        :param alphabet_length: the alphabet of the brute forced characters, that of the whole password
+        :type alphabet_length: int
+        :param dictionary_checker: whose word automaton finds the dictionary words (see build_word_automaton), if any
+            [None]
+        :type dictionary_checker: DictionaryChecker
+        :param budget: the work the dictionary matching can spend, the other patterns being still matched [None]
+        :type budget: WorkBudget
+        :param undoable: keep what pop needs [False]
+        :type undoable: bool
+        """
+        self.log10_alphabet = log10(alphabet_length) if alphabet_length > 0 else 0.0
+        self.undoable = undoable
+        self._matchers = [_RepeatMatcher(), _SequenceMatcher(), _DateMatcher()] + \
+                         [_KeyboardMatcher(keyboard) for keyboard in _KEYBOARDS]
+        if dictionary_checker is not None and dictionary_checker.word_automaton is not None:
+            self._matchers.append(_DictionaryMatcher(dictionary_checker, budget))
+        # the characters appended, beyond MAX_ANALYZED_LENGTH included
+        self._length = 0
+        # best[k][count]: the fewest guesses (decimal logarithm) to find password[:k] as count patterns, reached from
+        # back[k][count]: (the start of the last pattern, the pattern or None for a brute force)
+        self._best = [[0.0] + [float('inf')] * MAX_PATTERNS]
+        self._back = [[None] * (MAX_PATTERNS + 1)]
+        # the cheapest start of a brute force after count patterns, kept as best[start][count] - start * log10_alphabet
+        self._brute_force = [(float('inf'), 0)] * MAX_PATTERNS
+        # before each character: the brute force starts and the matchers, when undoable
+        self._history = []
+
+    def __len__(self):
+        return self._length
+
+    def append(self, chars: str):
+        """
+        :param chars: the next characters of the password
+        :type chars: str
+        """
+        for c in chars:
+            self._length += 1
+            i = len(self._best) - 1
+            if i >= MAX_ANALYZED_LENGTH:
+                continue
+            if self.undoable:
+                self._history.append((self._brute_force, [copy(matcher) for matcher in self._matchers]))
+
+            log10_alphabet = self.log10_alphabet
+            best = self._best
+            brute_force = list(self._brute_force)
+            # no more patterns than characters
+            for count in range(min(i + 1, MAX_PATTERNS)):
+                offset = best[i][count] - i * log10_alphabet
+                if offset < brute_force[count][0]:
+                    brute_force[count] = (offset, i)
+            self._brute_force = brute_force
+            patterns = [pattern for matcher in self._matchers for pattern in matcher.next(i, c)]
+
+            k = i + 1
+            column = [float('inf')] * (MAX_PATTERNS + 1)
+            back = [None] * (MAX_PATTERNS + 1)
+            for count in range(1, min(k, MAX_PATTERNS) + 1):
+                offset, start = brute_force[count - 1]
+                column[count] = offset + k * log10_alphabet
+                back[count] = (start, None)
+                for pattern in patterns:
+                    guesses = best[pattern.start][count - 1] + pattern.log10_guesses
+                    if guesses < column[count]:
+                        column[count] = guesses
+                        back[count] = (pattern.start, pattern)
+            best.append(column)
+            self._back.append(back)
+
+    def pop(self, count: int = 1):
+        """
+        Remove the last characters, the estimator being undoable
+        :param count: the number of characters to remove [1]
+        :type count: int
+        """
+        if not self.undoable:
+            raise ValueError('the estimator does not keep what pop needs')
+        self._length = max(0, self._length - count)
+        k = min(self._length, MAX_ANALYZED_LENGTH)
+        if k < len(self._best) - 1:
+            self._brute_force, self._matchers = self._history[k]
+            del self._history[k:]
+            del self._best[k + 1:]
+            del self._back[k + 1:]
+
+    def estimate(self):
+        """
+        :return: the estimate of the characters read, with their cheapest segmentation
+        :rtype: GuessEstimate
+        """
+        n = len(self._best) - 1
+        best, back = self._best, self._back
+        # the patterns could come in any order
+        log10_guesses, count = min((best[n][count] + log10(factorial(count)), count)
+                                   for count in range(MAX_PATTERNS + 1))
+        sequence = []
+        k = n
+        while count > 0:
+            start, pattern = back[k][count]
+            sequence.append(pattern or Pattern('bruteforce', start, k, best[k][count] - best[start][count - 1]))
+            k = start
+            count -= 1
+        return GuessEstimate(log10_guesses, sequence[::-1])
+
+
+def estimate_guesses(password: str, dictionary_checker=None, budget: WorkBudget = None):
+    """
+    Estimate the guesses an attacker needs to find the password, trying the most common patterns first
+    :param password: the submitted password
+    :type password: str
+    :param dictionary_checker: whose word automaton finds the dictionary words (see build_word_automaton), if any
+        [None]
+    :type dictionary_checker: DictionaryChecker
+    :param budget: the work the dictionary matching can spend, the other patterns being still matched [None]
+    :type budget: WorkBudget
+    :return: the estimate, with the cheapest segmentation of the password
+    :rtype: GuessEstimate
+
+    >>> estimate_guesses('azerty123')
+    10^4.4 guesses [keyboard[0:6], sequence[6:9]]
+    >>> estimate_guesses('Chien1987!!!')
+    10^14.2 guesses [bruteforce[0:5], year[5:9], repeat[9:12]]
+    >>> round(estimate_guesses('xq7#Lm9!pz').log10_guesses) == round(10 * log10(94))
+    True
+    >>> estimate_guesses('')
+    10^0.0 guesses []
+    """
+    password = password[:MAX_ANALYZED_LENGTH]
+    estimator = GuessEstimator(alphabet_size(password), dictionary_checker, budget)
+    estimator.append(password)
+    return estimator.estimate()
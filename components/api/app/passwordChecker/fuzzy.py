@@ -0,0 +1,177 @@
+# Fuzzy matching finds dictionary words a few typos away from a password ('chiien', 'pafthe'), with a SymSpell
+# deletion index: every word is stored under all the strings obtained by deleting up to k of its characters. Two
+# words within edit distance k share at least one of those deletions, so the candidates of a password are found by
+# generating its own deletions and looking them up, instead of comparing it to every word.
+from passwordChecker.budget import WorkBudget
+
+
+def edit_distance(a: str, b: str, max_distance: int):
+    """
+    The optimal string alignment distance: insertions, deletions, substitutions and transpositions of adjacent
+    characters, each costing 1
+    :param a: a word
+    :type a: str
+    :param b: another word
+    :type b: str
+    :param max_distance: beyond it, the computation is given up
+    :type max_distance: int
+    :return: the distance, or max_distance + 1 if it is larger than max_distance
+    :rtype: int
+    >>> edit_distance('chien', 'chiien', 2), edit_distance('chien', 'cihen', 2), edit_distance('chien', 'chat', 2)
+    (1, 1, 3)
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    before_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            distance = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                distance = min(distance, before_previous[j - 2] + 1)
+            current[j] = distance
+        if min(current) > max_distance:
+            return max_distance + 1
+        before_previous, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+
+
+def deletions(word: str, max_distance: int):
+    """
+    :return: the strings obtained by deleting up to max_distance characters from the word, itself included
+    :rtype: set[str]
+    >>> sorted(deletions('paf', 1))
+    ['af', 'pa', 'paf', 'pf']
+    """
+    found = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        found |= frontier
+    return found
+
+
+class FuzzyMatch:
+    """
+    A dictionary word near a password
+    """
+    word: str
+    distance: int
+    dictionaries: list
+
+    def __init__(self, word: str, distance: int, dictionaries: list = ()):
+        """
+        :param word: the projected dictionary word
+        :type word: str
+        :param distance: its edit distance to the projected password
+        :type distance: int
+        :param dictionaries: the names of the dictionaries containing the word [()]
+        :type dictionaries: list[str]
+        """
+        self.word = word
+        self.distance = distance
+        self.dictionaries = list(dictionaries)
+
+    def __repr__(self):
+        return f'{self.word} at {self.distance}'
+
+    def serialize(self):
+        return {
+            "word": self.word,
+            "distance": self.distance,
+            "dictionaries": self.dictionaries
+        }
+
+
+class DeletionIndex:
+    """
+    The projected words of dictionaries, indexed by their deletions (SymSpell).
+    Words shorter than min_length are left out: a couple of edits turn short words into about anything
+
+    >>> index = DeletionIndex(['chien', 'girafe', 'paf'], max_distance=1)
+    >>> index.nearest('chiien')
+    chien at 1
+    >>> index.nearest('gjrafe')
+    girafe at 1
+    >>> index.nearest('paff') is None
+    True
+    >>> index.nearest('chat') is None
+    True
+    """
+    max_distance: int
+    min_length: int
+
+    def __init__(self, words, max_distance: int = 1, min_length: int = None):
+        """
+        :param words: the projected words
+        :type words: iterable[str]
+        :param max_distance: the largest edit distance searched for [1]
+        :type max_distance: int
+        :param min_length: the shortest words indexed or searched [2 * max_distance + 2]
+        :type min_length: int
+        """
+        self.max_distance = max_distance
+        self.min_length = min_length if min_length is not None else 2 * max_distance + 2
+        # deletion -> a word, or a tuple of words when several share it
+        self._deletions = {}
+        self._size = 0
+        for word in words:
+            self.add(word)
+
+    def __repr__(self):
+        return f'deletion index of {self._size} words, {len(self._deletions)} deletions, ' \
+               f'distance {self.max_distance}'
+
+    def __len__(self):
+        return self._size
+
+    def add(self, word: str):
+        """
+        Index one more word. Lookups in progress may see it or not, they are not disturbed
+        :param word: the projected word
+        :type word: str
+        """
+        # a word is its own deletion
+        indexed = self._deletions.get(word)
+        if len(word) < self.min_length or indexed == word or (isinstance(indexed, tuple) and word in indexed):
+            return
+        self._size += 1
+        for deletion in deletions(word, self.max_distance):
+            indexed = self._deletions.get(deletion)
+            if indexed is None:
+                self._deletions[deletion] = word
+            elif isinstance(indexed, tuple):
+                self._deletions[deletion] = indexed + (word,)
+            else:
+                self._deletions[deletion] = (indexed, word)
+
+    def nearest(self, word: str, budget: WorkBudget = None):
+        """
+        The nearest indexed word, within max_distance, the smallest one first on ties
+        :param word: the projected word
+        :type word: str
+        :param budget: one step is spent per deletion looked up [None]
+        :type budget: WorkBudget
+        :return: the match, without its dictionaries, or None
+        :rtype: FuzzyMatch
+        """
+        if len(word) < self.min_length:
+            return None
+        best = None
+        checked = set()
+        for deletion in deletions(word, self.max_distance):
+            if budget is not None and not budget.spend():
+                break
+            indexed = self._deletions.get(deletion)
+            if indexed is None:
+                continue
+            for candidate in indexed if isinstance(indexed, tuple) else (indexed,):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                distance = edit_distance(word, candidate, self.max_distance)
+                if distance <= self.max_distance and \
+                        (best is None or (distance, candidate) < (best.distance, best.word)):
+                    best = FuzzyMatch(candidate, distance)
+        return best
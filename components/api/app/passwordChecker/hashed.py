@@ -0,0 +1,305 @@
+# Breach corpora, with hundreds of millions of entries, cannot be held in memory as sets of strings.
+# They are compiled into a file of fixed width hashes of the projected words, sorted, which is memory mapped and
+# searched by interpolation (hashes are uniformly distributed). Only the pages actually touched are loaded, so the
+# resident memory does not depend on the corpus size.
+# The hashes of all the proper prefixes of the words are stored as well, so a password is walked as in a prefix tree:
+# a candidate is only extended while it is the prefix of some word, instead of enumerating all the projections.
+# They make the file 3 to 3.6 times larger than the word hashes alone on the shipped dictionaries, and 4.8 times on
+# random passwords of 6 to 12 characters, which share few prefixes. Files built without them (in the first format) are
+# searched by enumerating the candidates, which the work budget cuts short on passwords of many ambiguous characters.
+#
+# Layout: magic (8 bytes) | hash count | prefix hash count (uint64, little endian) | sorted hashes
+# | sorted prefix hashes (uint64, native byte order). The first format, without the prefixes, is still read.
+# With 64 bits hashes, the odds of a false positive stay below 1e-10 for a billion words.
+from array import array
+from hashlib import blake2b
+import heapq
+from itertools import product
+import mmap
+import os
+import struct
+from tempfile import TemporaryDirectory
+
+from passwordChecker.budget import WorkBudget
+
+_MAGIC = b'PWCHSH02'
+_HEADER = struct.Struct('<8sQQ')
+_MAGIC_V1 = b'PWCHSH01'
+_HEADER_V1 = struct.Struct('<8sQ')
+# hashes read at once from each sorted run, when merging them
+_RUN_BLOCK = 4096
+
+
+def word_hash(word: str):
+    """
+    The 64 bits hash under which a projected word is stored
+    :param word: the projected word
+    :type word: str
+    :return: the hash
+    :rtype: int
+    >>> word_hash('chien')
+    10396708378161257389
+    """
+    return int.from_bytes(blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _write_run(hashes: array, filename: str):
+    hashes = array('Q', sorted(hashes))
+    with open(filename, 'wb') as f:
+        hashes.tofile(f)
+
+
+def _read_run(filename: str):
+    with open(filename, 'rb') as f:
+        while True:
+            block = array('Q')
+            block.frombytes(f.read(8 * _RUN_BLOCK))
+            if not block:
+                return
+            yield from block
+
+
+def _write_merged(runs: list, f):
+    """
+    Merge the sorted runs into the file, without duplicates
+    :return: the number of distinct hashes written
+    :rtype: int
+    """
+    count = 0
+    block = array('Q')
+    previous = None
+    for h in heapq.merge(*[_read_run(run) for run in runs]):
+        if h == previous:
+            continue
+        previous = h
+        block.append(h)
+        if len(block) >= _RUN_BLOCK:
+            block.tofile(f)
+            count += len(block)
+            block = array('Q')
+    block.tofile(f)
+    return count + len(block)
+
+
+def build_hashed_dictionary(lines, filename: str, character_projector, chunk_size: int = 1000000,
+                            prefixes: bool = True):
+    """
+    Project and hash all the words and their prefixes, then write them sorted and deduplicated into a hashed
+    dictionary file.
+    Words are processed by chunks, each one sorted into temporary runs, the runs being merged at the end (external
+    sort): memory is bounded by the chunk size (about 40 bytes per hash while sorting), not by the corpus size.
+    :param lines: the corpus words, one per line
+    :type lines: iterable[str]
+    :param filename: the file to write
+    :type filename: str
+    :param character_projector: how to project characters, same as the one used to check passwords
+    :type character_projector: CharacterProjector
+    :param chunk_size: the number of hashes, words and prefixes, sorted in memory at once [1M]
+    :type chunk_size: int
+    :param prefixes: store the prefix hashes, otherwise write the first format, several times smaller [True]
+    :type prefixes: bool
+    :return: the number of distinct word hashes written
+    :rtype: int
+    """
+    with TemporaryDirectory() as tmp_dir:
+        word_runs, prefix_runs = [], []
+        word_hashes, prefix_hashes = array('Q'), array('Q')
+        for line in lines:
+            for word in character_projector.index_password(line.strip()):
+                word_hashes.append(word_hash(word))
+                if prefixes:
+                    prefix_hashes.extend(word_hash(word[:length]) for length in range(1, len(word)))
+            if len(word_hashes) + len(prefix_hashes) >= chunk_size:
+                word_runs.append(f'{tmp_dir}/words{len(word_runs)}.run')
+                _write_run(word_hashes, word_runs[-1])
+                prefix_runs.append(f'{tmp_dir}/prefixes{len(prefix_runs)}.run')
+                _write_run(prefix_hashes, prefix_runs[-1])
+                word_hashes, prefix_hashes = array('Q'), array('Q')
+        word_runs.append(f'{tmp_dir}/words{len(word_runs)}.run')
+        _write_run(word_hashes, word_runs[-1])
+        prefix_runs.append(f'{tmp_dir}/prefixes{len(prefix_runs)}.run')
+        _write_run(prefix_hashes, prefix_runs[-1])
+        del word_hashes, prefix_hashes
+
+        with open(filename, 'wb') as f:
+            if not prefixes:
+                f.write(_HEADER_V1.pack(_MAGIC_V1, 0))
+                count = _write_merged(word_runs, f)
+                f.seek(0)
+                f.write(_HEADER_V1.pack(_MAGIC_V1, count))
+                return count
+            f.write(_HEADER.pack(_MAGIC, 0, 0))
+            count = _write_merged(word_runs, f)
+            prefix_count = _write_merged(prefix_runs, f)
+            f.seek(0)
+            f.write(_HEADER.pack(_MAGIC, count, prefix_count))
+    return count
+
+
+def _search(hashes, key: int):
+    """
+    interpolation search, falling back on a bisection step when the interpolation does not narrow enough
+    """
+    lo, hi = 0, len(hashes) - 1
+    while lo <= hi:
+        lo_value, hi_value = hashes[lo], hashes[hi]
+        if key < lo_value or key > hi_value:
+            return False
+        if lo_value == hi_value:
+            return lo_value == key
+        position = lo + (key - lo_value) * (hi - lo) // (hi_value - lo_value)
+        value = hashes[position]
+        if value == key:
+            return True
+        if value < key:
+            lo = position + 1
+            if hi - lo > 64:
+                middle = (lo + hi) // 2
+                if hashes[middle] < key:
+                    lo = middle + 1
+        else:
+            hi = position - 1
+            if hi - lo > 64:
+                middle = (lo + hi) // 2
+                if hashes[middle] > key:
+                    hi = middle - 1
+    return False
+
+
+class HashedDictionary:
+    """
+    A dictionary of hashed projected words, memory mapped from a file written by build_hashed_dictionary.
+    As only hashes are stored, it has no prefix tree: the candidates are built a character at a time and checked one by
+    one, each being extended only while it is the prefix of some word
+    """
+    name: str
+
+    def __init__(self, filename: str):
+        self.name = filename
+        with open(filename, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        magic = bytes(view[:len(_MAGIC)])
+        if magic == _MAGIC:
+            _, count, prefix_count = _HEADER.unpack_from(self._mmap, 0)
+            start = _HEADER.size
+            self._hashes = view[start:start + 8 * count].cast('Q')
+            start += 8 * count
+            self._prefixes = view[start:start + 8 * prefix_count].cast('Q')
+        elif magic == _MAGIC_V1:
+            _, count = _HEADER_V1.unpack_from(self._mmap, 0)
+            self._hashes = view[_HEADER_V1.size:_HEADER_V1.size + 8 * count].cast('Q')
+            # the candidates are then enumerated
+            self._prefixes = None
+        else:
+            view.release()
+            raise ValueError(f'{filename} is not a hashed dictionary')
+        view.release()
+
+    def __repr__(self):
+        return f'{self.name} {len(self)} hashed words'
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def contains_exact(self, indexed_password: str):
+        """
+        Check if the given password, already projected, exists in the dictionary (up to hash collisions)
+        :param indexed_password: the password to check
+        :type indexed_password: str
+        :return: True if it was found
+        :rtype: bool
+        """
+        return _search(self._hashes, word_hash(indexed_password))
+
+    def sources(self, indexed_password: str):
+        """
+        :param indexed_password: the projected password
+        :type indexed_password: str
+        :return: the names of the dictionaries containing the word
+        :rtype: list[str]
+        """
+        return [self.name] if self.contains_exact(indexed_password) else []
+
+    def walk(self, projected_chars: list, lengths: range, budget: WorkBudget = None):
+        """
+        Check the candidates that can be built from the projected characters, lazily, the shortest first: a candidate
+        is only extended while it is the prefix of some word
+        :param projected_chars: for each position in the password, the list of projected characters
+        :type projected_chars: list[list[str]]
+        :param lengths: the accepted lengths for a word to match
+        :type lengths: range
+        :param budget: one step is spent per candidate, the walk stops when it is exhausted [None]
+        :type budget: WorkBudget
+        :return: a generator of the matching indexed words
+        :rtype: generator
+        """
+        if self._prefixes is None:
+            yield from self._enumerate(projected_chars, lengths, budget)
+            return
+        last = min(max(lengths, default=0), len(projected_chars))
+        candidates = ['']
+        for position in range(last):
+            extended = []
+            for candidate in candidates:
+                for c in projected_chars[position]:
+                    if budget is not None and not budget.spend():
+                        return
+                    word = candidate + c
+                    key = word_hash(word)
+                    if position + 1 in lengths and _search(self._hashes, key):
+                        yield word
+                    if position + 1 < last and _search(self._prefixes, key):
+                        extended.append(word)
+            candidates = extended
+
+    def _enumerate(self, projected_chars: list, lengths: range, budget: WorkBudget = None):
+        """
+        The walk of the files without prefixes: all the candidates are enumerated
+        """
+        for length in lengths:
+            for chars in product(*projected_chars[0:length]):
+                if budget is not None and not budget.spend():
+                    return
+                word = ''.join(chars)
+                if self.contains_exact(word):
+                    yield word
+
+    def prefix_tree(self):
+        """
+        :return: None, hashes cannot be walked by prefix
+        """
+        return None
+
+    def close(self):
+        self._hashes.release()
+        if self._prefixes is not None:
+            self._prefixes.release()
+        self._mmap.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    from passwordChecker.loader import open_dictionary
+    from passwordChecker.substitute import CharacterProjector
+
+    parser = argparse.ArgumentParser(description='Compile a large word list (e.g. a breach corpus) into a hashed '
+                                                 'dictionary, sorted on disk')
+    parser.add_argument('corpus', nargs='+', help='the word list file(s), one word per line, possibly .gz or .xz')
+    parser.add_argument('output', help='the hashed dictionary file to write')
+    parser.add_argument('--chunk-size', type=int, default=1000000, help='hashes sorted in memory at once [1M]')
+    parser.add_argument('--no-prefixes', action='store_true',
+                        help='do not store the prefix hashes: a file several times smaller, whose search enumerates '
+                             'the candidates')
+    args = parser.parse_args()
+
+
+    def read_all(filenames):
+        for filename in filenames:
+            with open_dictionary(filename) as f:
+                yield from f
+
+
+    count = build_hashed_dictionary(read_all(args.corpus), args.output, CharacterProjector(),
+                                    chunk_size=args.chunk_size, prefixes=not args.no_prefixes)
+    print(f'Wrote {count} hashes into {args.output} ({os.path.getsize(args.output)} bytes)')
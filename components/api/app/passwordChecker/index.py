@@ -0,0 +1,228 @@
+# Dictionaries can be compiled once into a single binary file, holding the projected words sorted and deduplicated,
+# each of them with a bit mask telling which dictionaries it comes from.
+# The file is memory mapped when loaded: nothing is parsed at start up and all the processes reading it share the same
+# pages through the OS cache.
+#
+# Layout (little endian):
+#   magic (8 bytes) | dictionary count (uint32) | word count (uint32) | names length (uint64)
+#   names, utf-8, '\n' separated, padded to 8 bytes
+#   offsets: (word count + 1) x uint64, position of each word in the words blob
+#   masks: word count x uint32, bit i set if the word comes from the i-th dictionary (padded to 8 bytes)
+#   words blob: the utf-8 encoded words, concatenated in sorted order
+from bisect import bisect_left
+import mmap
+import struct
+
+from passwordChecker.budget import WorkBudget
+from passwordChecker.trie import walk_projection
+
+_MAGIC = b'PWCIDX01'
+_HEADER = struct.Struct('<8sIIQ')
+_MAX_DICTIONARIES = 32
+
+
+def _padding(length: int):
+    return (8 - length % 8) % 8
+
+
+def compile_index(dictionaries: list, filename: str):
+    """
+    Write the words of the given dictionaries into a single index file
+    :param dictionaries: the dictionaries to be compiled, with their words already projected
+    :type dictionaries: list[PasswordDictionary]
+    :param filename: the index file to write
+    :type filename: str
+    :return: the number of distinct words written
+    :rtype: int
+    """
+    if len(dictionaries) > _MAX_DICTIONARIES:
+        raise ValueError(f'Cannot compile more than {_MAX_DICTIONARIES} dictionaries into one index')
+
+    masks = {}
+    for i, dictionary in enumerate(dictionaries):
+        for word in dictionary.words:
+            masks[word] = masks.get(word, 0) | (1 << i)
+    # the code point order is the same as the utf-8 bytes order, which is used when searching
+    words = sorted(masks)
+
+    names = '\n'.join(d.name for d in dictionaries).encode('utf-8')
+    encoded_words = [w.encode('utf-8') for w in words]
+    offsets = [0]
+    for w in encoded_words:
+        offsets.append(offsets[-1] + len(w))
+
+    with open(filename, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, len(dictionaries), len(words), len(names)))
+        f.write(names + b'\0' * _padding(len(names)))
+        f.write(struct.pack(f'<{len(offsets)}Q', *offsets))
+        f.write(struct.pack(f'<{len(words)}I', *[masks[w] for w in words]))
+        f.write(b'\0' * _padding(4 * len(words)))
+        for w in encoded_words:
+            f.write(w)
+    return len(words)
+
+
+class PackedWords:
+    """
+    A read only sequence of words (as bytes) packed one after the other in a blob, such as the mapped file, the i-th
+    one going from offsets[i] to offsets[i + 1], so bisect can search through them
+    """
+    __slots__ = ('offsets', 'blob')
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]])
+
+
+class SortedWordsDictionary:
+    """
+    The lookups of a dictionary whose words are sorted as utf-8 bytes in self._words (see PackedWords): exact
+    searches by bisection, and walks of the sorted words as an implicit prefix tree
+    """
+    __slots__ = ()
+
+    def __len__(self):
+        return len(self._words)
+
+    def __iter__(self):
+        return (word.decode('utf-8') for word in self._words)
+
+    def _find(self, encoded_word: bytes):
+        i = bisect_left(self._words, encoded_word)
+        if i < len(self._words) and self._words[i] == encoded_word:
+            return i
+        return None
+
+    def contains_exact(self, indexed_password: str):
+        """
+        Check if the given password, already projected, exists in the dictionary
+        :param indexed_password: the password to check
+        :type indexed_password: str
+        :return: True if it was found
+        :rtype: bool
+        """
+        return self._find(indexed_password.encode('utf-8')) is not None
+
+    def walk(self, projected_chars: list, lengths: range, budget: WorkBudget = None):
+        """
+        Search for all the words that can be reached from the projected characters.
+        :param projected_chars: for each position in the password, the list of projected characters
+        :type projected_chars: list[list[str]]
+        :param lengths: the accepted lengths for a word to match
+        :type lengths: range
+        :param budget: the work that can be spent, the walk stopping when it is exhausted [None]
+        :type budget: WorkBudget
+        :return: a generator of the matching indexed words
+        :rtype: generator
+        """
+        return (word for word, _ in walk_projection(self, projected_chars, lengths, budget))
+
+    def prefix_tree(self):
+        """
+        The sorted words are walked as an implicit prefix tree, each node being the range of words sharing a prefix
+        :return: the tree to be walked (see passwordChecker.trie.walk_projection)
+        """
+        return self
+
+    def root(self):
+        return 0, len(self._words), b''
+
+    def child(self, node, char: str):
+        """
+        :return: the range of words starting with the node prefix followed by char, or None if it is empty
+        """
+        lo, hi, prefix = node
+        child_prefix = prefix + char.encode('utf-8')
+        child_lo = bisect_left(self._words, child_prefix, lo, hi)
+        # no utf-8 encoded string contains 0xff, so it bounds all the words starting with the prefix
+        child_hi = bisect_left(self._words, child_prefix + b'\xff', child_lo, hi)
+        if child_lo < child_hi:
+            return child_lo, child_hi, child_prefix
+        return None
+
+    def value(self, node):
+        """
+        :return: True if the node prefix is itself a word, None otherwise
+        """
+        lo, hi, prefix = node
+        if lo < hi and self._words[lo] == prefix:
+            return True
+        return None
+
+
+class MappedIndex(SortedWordsDictionary):
+    """
+    A compiled index file, memory mapped. It exposes the same lookups as a PasswordDictionary,
+    and tells from which of the original dictionaries a word comes from.
+    """
+    name: str
+    dictionary_names: list
+
+    def __init__(self, filename: str):
+        self.name = filename
+        with open(filename, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, dictionary_count, word_count, names_length = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC:
+            raise ValueError(f'{filename} is not a compiled dictionary index')
+
+        view = memoryview(self._mmap)
+        position = _HEADER.size
+        names = bytes(view[position:position + names_length]).decode('utf-8')
+        self.dictionary_names = names.split('\n') if dictionary_count else []
+        position += names_length + _padding(names_length)
+
+        offsets = view[position:position + 8 * (word_count + 1)].cast('Q')
+        position += 8 * (word_count + 1)
+        self._masks = view[position:position + 4 * word_count].cast('I')
+        position += 4 * word_count + _padding(4 * word_count)
+        self._words = PackedWords(offsets, view[position:])
+
+    def __repr__(self):
+        return f'{self.name} {len(self)} words from {len(self.dictionary_names)} dictionaries'
+
+    def sources(self, indexed_password: str):
+        """
+        :param indexed_password: the projected password
+        :type indexed_password: str
+        :return: the names of the dictionaries containing the word
+        :rtype: list[str]
+        """
+        i = self._find(indexed_password.encode('utf-8'))
+        if i is None:
+            return []
+        mask = self._masks[i]
+        return [name for bit, name in enumerate(self.dictionary_names) if mask & (1 << bit)]
+
+    def close(self):
+        # the views over the mapped memory must be released before it can be unmapped
+        self._words.offsets.release()
+        self._words.blob.release()
+        self._masks.release()
+        self._mmap.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    from passwordChecker.dictionary import DictionaryChecker
+    from passwordChecker.substitute import CharacterProjector
+
+    parser = argparse.ArgumentParser(description='Compile a directory of dictionaries into a single index file')
+    parser.add_argument('dictionaries', help='the directory containing the dictionary files')
+    parser.add_argument('index', help='the index file to write')
+    parser.add_argument('--bloom-error-rate', type=float, default=0.01,
+                        help='false positive rate of the Bloom filter written along, as <index>.bloom [0.01]')
+    args = parser.parse_args()
+
+    dico_checker = DictionaryChecker(CharacterProjector())
+    dico_checker.load_all_dictionaries(args.dictionaries)
+    count = compile_index(dico_checker.dictionaries, args.index)
+    print(f'Compiled {count} words into {args.index}')
+    dico_checker.build_prefilter(args.bloom_error_rate).save(f'{args.index}.bloom')
+    print(f'Saved {dico_checker.prefilter} into {args.index}.bloom')
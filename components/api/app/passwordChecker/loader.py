@@ -0,0 +1,91 @@
+# Reading the dictionary files. Each one is streamed line by line, its projected words going straight into a set, so
+# no copy of the file is held along the way, and compressed files (.gz, .xz) are read as
+# they are. The files of a directory are projected in parallel, one file per task of a process pool, each worker
+# sending back the set of words of its file. Only a few files are in flight at once, so the sets waiting to be consumed
+# stay bounded whatever the number of files.
+from collections import deque
+import gzip
+import lzma
+from multiprocessing import Pool, cpu_count, current_process
+import os
+
+from passwordChecker.substitute import CharacterProjector
+
+_openers = {'.gz': gzip.open, '.xz': lzma.open}
+
+# each worker process holds its own projector, built once by _init_worker
+_worker_projector = None
+
+
+def open_dictionary(filename: str):
+    """
+    :param filename: a dictionary file, one word per line, compressed if its name ends with .gz or .xz
+    :type filename: str
+    :return: the file, opened as utf-8 text
+    :rtype: TextIO
+    """
+    opener = _openers.get(os.path.splitext(filename)[1], open)
+    return opener(filename, 'rt', encoding='utf-8', errors='replace')
+
+
+def iter_words(filename: str, character_projector: CharacterProjector):
+    """
+    Stream the indexed words of a dictionary file (see CharacterProjector.index_password)
+    :param filename: the dictionary file
+    :type filename: str
+    :param character_projector: how to project characters
+    :type character_projector: CharacterProjector
+    :return: a generator of the indexed words, with the duplicates
+    :rtype: generator
+    """
+    with open_dictionary(filename) as f:
+        for line in f:
+            yield from character_projector.index_password(line.strip())
+
+
+def read_words(filename: str, character_projector: CharacterProjector):
+    """
+    :return: the indexed words of a dictionary file
+    :rtype: set[str]
+    """
+    return set(iter_words(filename, character_projector))
+
+
+def _init_worker(subst_dict: dict, scrambling_params):
+    global _worker_projector
+    _worker_projector = CharacterProjector(subst_dict, scrambling_params)
+
+
+def _read_words_task(filename: str):
+    return filename, read_words(filename, _worker_projector)
+
+
+def read_all_words(filenames: list, character_projector: CharacterProjector, processes: int = None):
+    """
+    Read dictionary files, in parallel if there are several of them and several processes, at most two files per
+    process being read or waiting to be consumed
+    :param filenames: the dictionary files
+    :type filenames: list[str]
+    :param character_projector: how to project characters
+    :type character_projector: CharacterProjector
+    :param processes: the worker processes, 1 to read the files in this process [cpu count]
+    :type processes: int
+    :return: a generator of (filename, the set of its indexed words), in the order of the files
+    :rtype: generator
+    """
+    processes = min(processes or cpu_count(), len(filenames))
+    # the workers of a pool, such as the ones of the audit command, cannot have a pool of their own
+    if processes <= 1 or current_process().daemon:
+        for filename in filenames:
+            yield filename, read_words(filename, character_projector)
+        return
+    max_in_flight = 2 * processes
+    with Pool(processes, initializer=_init_worker,
+              initargs=(character_projector.subst_dict, character_projector.scrambling_params)) as pool:
+        in_flight = deque()
+        for filename in filenames:
+            in_flight.append(pool.apply_async(_read_words_task, (filename,)))
+            if len(in_flight) >= max_in_flight:
+                yield in_flight.popleft().get()
+        while in_flight:
+            yield in_flight.popleft().get()
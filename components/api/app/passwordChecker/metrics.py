@@ -0,0 +1,306 @@
+# Optional instrumentation of the hot path, exposed in the Prometheus text format.
+# Nothing is measured until instrument() is called: it replaces the hot functions by timed wrappers, and
+# uninstrument() puts the original ones back, so the disabled cost is nil.
+from bisect import bisect_left
+import functools
+import math
+from threading import Lock
+import time
+
+from passwordChecker import complexity, estimator, robustness
+from passwordChecker.budget import WorkBudget
+from passwordChecker.dictionary import DictionaryChecker
+from passwordChecker.robustness import PasswordRobustness
+from passwordChecker.substitute import CharacterProjector
+
+# seconds, from a few microseconds (a prefix tree walk) to a second
+DURATION_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                    0.1, 0.25, 0.5, 1)
+# candidates built or prefix tree nodes visited for one password
+CANDIDATE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 100000)
+
+
+def _escape_label_value(value):
+    """
+    The backslashes, double quotes and line feeds of a label value, such as a dictionary path, escaped
+
+    >>> print(_escape_label_value('the "paf" dictionary'))
+    the \\"paf\\" dictionary
+    """
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: tuple):
+    return ','.join(f'{name}="{_escape_label_value(value)}"' for name, value in labels)
+
+
+def _format_value(value: float):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Counts observations into cumulative buckets, by label values
+
+    >>> histogram = Histogram('paf_seconds', 'Paf duration', buckets=(0.1, 1), label_names=('kind',))
+    >>> histogram.observe(0.05, 'dog')
+    >>> histogram.observe(0.5, 'dog')
+    >>> print(histogram.render())
+    # HELP paf_seconds Paf duration
+    # TYPE paf_seconds histogram
+    paf_seconds_bucket{kind="dog",le="0.1"} 1
+    paf_seconds_bucket{kind="dog",le="1.0"} 2
+    paf_seconds_bucket{kind="dog",le="+Inf"} 2
+    paf_seconds_sum{kind="dog"} 0.55
+    paf_seconds_count{kind="dog"} 2
+    """
+    name: str
+    help: str
+    buckets: tuple
+    label_names: tuple
+
+    def __init__(self, name: str, help: str, buckets: tuple = DURATION_BUCKETS, label_names: tuple = ()):
+        """
+        :param name: the metric name
+        :type name: str
+        :param help: the metric description
+        :type help: str
+        :param buckets: the upper bounds of the buckets, sorted [DURATION_BUCKETS]
+        :type buckets: tuple[float]
+        :param label_names: the names of the labels, whose values are given to observe [()]
+        :type label_names: tuple[str]
+        """
+        self.name = name
+        self.help = help
+        self.buckets = tuple(float(bound) for bound in buckets)
+        self.label_names = tuple(label_names)
+        # label values -> [bucket counts (the last one beyond all the bounds), sum]
+        self._series = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, *label_values):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0]
+            series[0][i] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((k, (list(v[0]), v[1])) for k, v in self._series.items())
+        for label_values, (counts, total) in series:
+            labels = tuple(zip(self.label_names, label_values))
+            cumulated = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulated += count
+                lines.append(f'{self.name}_bucket{{{_format_labels(labels + (("le", _format_value(bound)),))}}} '
+                             f'{cumulated}')
+            suffix = f'{{{_format_labels(labels)}}}' if labels else ''
+            lines.append(f'{self.name}_sum{suffix} {_format_value(total)}')
+            lines.append(f'{self.name}_count{suffix} {cumulated}')
+        return '\n'.join(lines)
+
+
+class Counter:
+    """
+    A monotonic count, by label values
+
+    >>> counter = Counter('paf_total', 'Pafs', label_names=('kind',))
+    >>> counter.inc('dog')
+    >>> counter.inc('dog', amount=2)
+    >>> print(counter.render())
+    # HELP paf_total Pafs
+    # TYPE paf_total counter
+    paf_total{kind="dog"} 3
+    """
+    name: str
+    help: str
+    label_names: tuple
+
+    def __init__(self, name: str, help: str, label_names: tuple = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            labels = _format_labels(tuple(zip(self.label_names, label_values)))
+            lines.append(f'{self.name}{{{labels}}} {_format_value(value)}' if labels else
+                         f'{self.name} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Gauge:
+    """
+    A value read when the metrics are rendered, such as a cache size, or a count kept by some other object
+
+    >>> print(Gauge('paf_size', 'Paf size', lambda: 42).render())
+    # HELP paf_size Paf size
+    # TYPE paf_size gauge
+    paf_size 42
+    """
+
+    def __init__(self, name: str, help: str, read, metric_type: str = 'gauge'):
+        """
+        :param read: returns the current value
+        :type read: callable
+        :param metric_type: the Prometheus type, 'counter' if the value only grows ['gauge']
+        :type metric_type: str
+        """
+        self.name = name
+        self.help = help
+        self.read = read
+        self.metric_type = metric_type
+
+    def render(self):
+        return f'# HELP {self.name} {self.help}\n# TYPE {self.name} {self.metric_type}\n' \
+               f'{self.name} {_format_value(self.read())}'
+
+
+class MetricsRegistry:
+    """
+    The metrics to be rendered together, in registration order
+    """
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """
+        :return: all the metrics, in the Prometheus text exposition format
+        :rtype: str
+        """
+        return '\n'.join(metric.render() for metric in self.metrics) + '\n'
+
+
+class _HotPathMetrics:
+    def __init__(self, registry: MetricsRegistry):
+        self.durations = registry.register(Histogram(
+            'password_checker_function_duration_seconds', 'Time spent in the hot path functions',
+            label_names=('function',)))
+        self.candidates = registry.register(Histogram(
+            'password_checker_candidates', 'Candidates built or prefix tree nodes visited for one password',
+            buckets=CANDIDATE_BUCKETS, label_names=('function',)))
+        self.checks = registry.register(Counter(
+            'password_checker_dictionary_checks_total', 'Passwords searched in the dictionaries',
+            label_names=('function',)))
+        self.found = registry.register(Counter(
+            'password_checker_dictionary_found_total', 'Passwords found in at least one dictionary',
+            label_names=('function',)))
+        self.dictionary_hits = registry.register(Counter(
+            'password_checker_dictionary_hits_total', 'Passwords found, by dictionary', label_names=('dictionary',)))
+        self.budget_exceeded = registry.register(Counter(
+            'password_checker_budget_exceeded_total', 'Dictionary searches cut short by their work budget'))
+
+
+# (owner, attribute) -> original function, while instrumented
+_originals = {}
+
+
+def _replace(owner, attribute: str, wrapper):
+    original = getattr(owner, attribute)
+    _originals[(owner, attribute)] = original
+    setattr(owner, attribute, functools.wraps(original)(wrapper(original)))
+
+
+def _timed(metrics: _HotPathMetrics, function_name: str, count=None):
+    """
+    :param count: tells the number of candidates from the result, if any [None]
+    """
+
+    def wrapper(original):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            result = original(*args, **kwargs)
+            metrics.durations.observe(time.perf_counter() - start, function_name)
+            if count is not None:
+                metrics.candidates.observe(count(result), function_name)
+            return result
+
+        return timed
+
+    return wrapper
+
+
+def _searched(metrics: _HotPathMetrics, function_name: str, names=None):
+    """
+    Time a dictionary search, count the work it took from its budget and whether it found the password.
+    The budget may be shared with the searches before it (see passwordChecker.robustness.CheckPipeline): only what was
+    spent, or exceeded, during this one is counted
+    :param names: tells the names of the dictionaries found from the search result, if any [None]
+    """
+
+    def wrapper(original):
+        def searched(self, password, budget=None):
+            if budget is None:
+                # an unlimited checker gets a budget anyway, to count the work
+                budget = self.new_budget() or WorkBudget(2 ** 62)
+            remaining, exceeded = budget.remaining, budget.exceeded
+            start = time.perf_counter()
+            result = original(self, password, budget)
+            metrics.durations.observe(time.perf_counter() - start, function_name)
+            metrics.candidates.observe(remaining - budget.remaining, function_name)
+            metrics.checks.inc(function_name)
+            if result:
+                metrics.found.inc(function_name)
+                for name in names(result) if names is not None else ():
+                    metrics.dictionary_hits.inc(name)
+            if budget.exceeded and not exceeded:
+                metrics.budget_exceeded.inc()
+            return result
+
+        return searched
+
+    return wrapper
+
+
+def instrument(registry: MetricsRegistry):
+    """
+    Start measuring the hot path: projection, dictionary searches, brute force estimates and serialization
+    :param registry: where the metrics are registered
+    :type registry: MetricsRegistry
+    """
+    if _originals:
+        raise ValueError('Already instrumented')
+    metrics = _HotPathMetrics(registry)
+    # the candidates are built while walking the dictionaries, and counted there from the budget
+    _replace(CharacterProjector, 'truncation_lengths', _timed(metrics, 'truncation_lengths'))
+    _replace(CharacterProjector, 'project_chars', _timed(metrics, 'project_chars'))
+    _replace(DictionaryChecker, 'contains', _searched(metrics, 'contains'))
+    _replace(DictionaryChecker, 'matching_dictionaries', _searched(metrics, 'matching_dictionaries', names=list))
+    _replace(DictionaryChecker, 'fuzzy_match', _searched(metrics, 'fuzzy_match'))
+    _replace(DictionaryChecker, 'embedded_words', _searched(metrics, 'embedded_words'))
+    # imported by name in robustness, so both are replaced
+    for module in (complexity, robustness):
+        _replace(module, 'compute_brute_force_ms', _timed(metrics, 'compute_brute_force_ms'))
+    # imported by name in robustness as well
+    for module in (estimator, robustness):
+        _replace(module, 'estimate_guesses', _timed(metrics, 'estimate_guesses'))
+    _replace(PasswordRobustness, 'serialize', _timed(metrics, 'serialize'))
+
+
+def uninstrument():
+    """
+    Put the original functions back
+    """
+    for (owner, attribute), original in _originals.items():
+        setattr(owner, attribute, original)
+    _originals.clear()
@@ -0,0 +1,146 @@
+# k-anonymity lookups, in the way of the "Have I Been Pwned" range API: the hashes of the projected dictionary words
+# are split into buckets by hash prefix. A client projects and hashes the password itself, then downloads the buckets
+# of its candidates prefixes: the server never sees the password, and only learns prefixes shared by many words.
+# Buckets are precomputed static files, so they can be served and cached by nginx or a CDN, off the checks CPU.
+#
+# Layout of the ranges directory:
+#   projection.json: what a client needs to build the candidates (see CharacterProjector) and read the buckets:
+#       the substitutions, their reverse projection, the trailing characters to wipe, the prefix length...
+#   range/<PREFIX>: for each hash prefix (upper case hexadecimal), one '<SUFFIX>:<mask>' line per word whose hash
+#       starts with it, bit i of the decimal mask being set if the word comes from the i-th dictionary
+from hashlib import sha256
+import json
+import os
+
+from passwordChecker.budget import WorkBudget
+from passwordChecker.substitute import CharacterProjector
+
+DEFAULT_PREFIX_LENGTH = 3
+
+
+def word_digest(word: str):
+    """
+    :param word: a projected word
+    :type word: str
+    :return: the upper case hexadecimal SHA-256 of its utf-8 encoding
+    :rtype: str
+    >>> word_digest('chien')[:16]
+    'F0A34945F0DAA984'
+    """
+    return sha256(word.encode('utf-8')).hexdigest().upper()
+
+
+def build_ranges(dictionaries: list, character_projector: CharacterProjector, dirname: str,
+                 prefix_length: int = DEFAULT_PREFIX_LENGTH):
+    """
+    Write the range buckets of the dictionaries words, with the projection.json manifest.
+    All the prefixes get a file, even empty, so any request is answered by a static file
+    :param dictionaries: the dictionaries, iterable over their projected words
+    :type dictionaries: list[PasswordDictionary]
+    :param character_projector: the projection the words were indexed with, published for the clients
+    :type character_projector: CharacterProjector
+    :param dirname: the ranges directory, created if needed
+    :type dirname: str
+    :param prefix_length: the hexadecimal characters of the prefixes: the larger, the smaller the buckets but the
+        fewer words share a prefix [3]
+    :type prefix_length: int
+    :return: the number of distinct words written
+    :rtype: int
+    """
+    masks = {}
+    for i, dictionary in enumerate(dictionaries):
+        for word in dictionary:
+            masks[word] = masks.get(word, 0) | (1 << i)
+
+    buckets = {}
+    for word, mask in masks.items():
+        digest = word_digest(word)
+        buckets.setdefault(digest[:prefix_length], []).append(f'{digest[prefix_length:]}:{mask}\n')
+
+    os.makedirs(f'{dirname}/range', exist_ok=True)
+    for i in range(16 ** prefix_length):
+        prefix = f'{i:0{prefix_length}X}'
+        with open(f'{dirname}/range/{prefix}', 'w') as f:
+            f.writelines(sorted(buckets.get(prefix, [])))
+
+    manifest = {
+        'hash': 'SHA-256',
+        'prefixLength': prefix_length,
+        'dictionaries': [d.name for d in dictionaries],
+        'substitutions': character_projector.subst_dict,
+        'projection': character_projector.character_projection,
+        'trailingChars': ''.join(character_projector.trailing_chars()),
+        'maxTrailing': character_projector.scrambling_params.max_trailing,
+    }
+    with open(f'{dirname}/projection.json', 'w') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    return len(masks)
+
+
+def parse_range(text: str):
+    """
+    :param text: the content of a range bucket
+    :type text: str
+    :return: the dictionary mask, by hash suffix
+    :rtype: dict[str, int]
+    >>> parse_range('0A1:1\\n0B2:3\\n')
+    {'0A1': 1, '0B2': 3}
+    """
+    masks = {}
+    for line in text.splitlines():
+        if line:
+            suffix, mask = line.split(':')
+            masks[suffix] = int(mask)
+    return masks
+
+
+def lookup_password(password: str, character_projector: CharacterProjector, fetch_range, prefix_length: int,
+                    dictionary_names: list, budget: WorkBudget = None):
+    """
+    What a remote client does: build the candidates locally, and check their hashes against the downloaded buckets.
+    The password, as well as its candidates, never leave the client, only the prefixes of their hashes do
+    :param password: the password to check
+    :type password: str
+    :param character_projector: built from the substitutions and maxTrailing of projection.json
+    :type character_projector: CharacterProjector
+    :param fetch_range: returns the content of the bucket of a prefix, e.g. from GET /api/range/<prefix>
+    :type fetch_range: callable
+    :param prefix_length: from projection.json
+    :type prefix_length: int
+    :param dictionary_names: from projection.json
+    :type dictionary_names: list[str]
+    :param budget: caps the candidates to hash [None]
+    :type budget: WorkBudget
+    :return: the sorted names of the dictionaries the password was found in
+    :rtype: list[str]
+    """
+    buckets = {}
+    mask = 0
+    for candidate in character_projector.iter_indexes(password, budget):
+        digest = word_digest(candidate)
+        prefix = digest[:prefix_length]
+        if prefix not in buckets:
+            buckets[prefix] = parse_range(fetch_range(prefix))
+        mask |= buckets[prefix].get(digest[prefix_length:], 0)
+    return sorted(name for bit, name in enumerate(dictionary_names) if mask & (1 << bit))
+
+
+if __name__ == '__main__':
+    import argparse
+    from passwordChecker.dictionary import DictionaryChecker
+    from passwordChecker.substitute import ScramblingParams
+
+    parser = argparse.ArgumentParser(description='Write the k-anonymity range buckets of a directory of dictionaries')
+    parser.add_argument('dictionaries', help='the directory containing the dictionary files')
+    parser.add_argument('ranges', help='the directory to write the buckets and projection.json into')
+    parser.add_argument('--prefix-length', type=int, default=DEFAULT_PREFIX_LENGTH,
+                        help=f'hexadecimal characters of the hash prefixes [{DEFAULT_PREFIX_LENGTH}]')
+    parser.add_argument('--max-trailing', type=int, default=4,
+                        help='trailing numbers/punctuation the clients should tolerate [4]')
+    args = parser.parse_args()
+
+    character_projector = CharacterProjector(scrambling_params=ScramblingParams(max_trailing=args.max_trailing))
+    dico_checker = DictionaryChecker(character_projector)
+    dico_checker.load_all_dictionaries(args.dictionaries)
+    count = build_ranges(dico_checker.dictionaries, dico_checker.character_projector, args.ranges, args.prefix_length)
+    print(f'Wrote {count} words into {16 ** args.prefix_length} ranges in {args.ranges}')
@@ -1,5 +1,15 @@
+# A check runs as a pipeline of stages, from the cheapest to the most expensive: length score and brute force
+# estimate first, then the dictionary searches and the guess estimate. A policy can tell from a partial result whether
+# a password is acceptable, so a caller asking for a fast verdict stops there, e.g. a 4 characters password is refused
+# on its length before any dictionary is searched. The stages that ran are reported with their duration.
+from collections import OrderedDict
+import time
+
+from passwordChecker.cache import RobustnessCache
 from passwordChecker.complexity import password_length_score, compute_brute_force_ms
 from passwordChecker.dictionary import DictionaryChecker
+from passwordChecker.estimator import GuessEstimate, estimate_guesses
+from passwordChecker.fuzzy import FuzzyMatch
 
 
 class PasswordRobustness:
@@ -9,32 +19,382 @@ class PasswordRobustness:
     length_score: int
     brute_force_ms: float
     exists_in_dictionary: bool
+    dictionaries: list
+    budget_exceeded: bool
+    fuzzy_match: FuzzyMatch
+    embedded_words: list
+    guess_estimate: GuessEstimate
+    verdict: bool
+    stages: list
 
-    def __init__(self, length_score: int, brute_force_ms: float, exists_in_dictionary: bool):
+    def __init__(self, length_score: int, brute_force_ms: float, exists_in_dictionary: bool, dictionaries: list = (),
+                 budget_exceeded: bool = False, fuzzy_match: FuzzyMatch = None, embedded_words: list = (),
+                 guess_estimate: GuessEstimate = None, verdict: bool = None, stages: list = ()):
         self.length_score = length_score
         self.brute_force_ms = brute_force_ms
         self.exists_in_dictionary = exists_in_dictionary
+        self.dictionaries = list(dictionaries)
+        # the dictionary search was cut short, a not found password may be in a dictionary after all
+        self.budget_exceeded = budget_exceeded
+        # a dictionary word a few typos away, when the password is not in the dictionaries as such
+        self.fuzzy_match = fuzzy_match
+        # the dictionary words found anywhere within the password
+        self.embedded_words = list(embedded_words)
+        # the guesses of the patterns the password is made of, more realistic than brute_force_ms
+        self.guess_estimate = guess_estimate
+        # whether the password is acceptable to the policy of the pipeline, None without policy or undecided
+        self.verdict = verdict
+        # the pipeline stages that ran, the metrics of the others being left to None
+        self.stages = list(stages)
 
     def serialize(self):
         return {
             "lengthScore": self.length_score,
             "bruteForceMs": self.brute_force_ms,
-            "existsInDictionary": self.exists_in_dictionary
+            "existsInDictionary": self.exists_in_dictionary,
+            "dictionaries": self.dictionaries,
+            "budgetExceeded": self.budget_exceeded,
+            "fuzzyMatch": self.fuzzy_match.serialize() if self.fuzzy_match is not None else None,
+            "embeddedWords": [w.serialize() for w in self.embedded_words],
+            "guesses": self.guess_estimate.guesses if self.guess_estimate is not None else None,
+            "crackTimeMs": self.guess_estimate.crack_time_ms if self.guess_estimate is not None else None,
+            "patterns": [p.serialize() for p in self.guess_estimate.patterns]
+            if self.guess_estimate is not None else [],
+            "verdict": self.verdict,
+            "stages": [s.serialize() for s in self.stages]
+        }
+
+    def without_stages(self):
+        """
+        :return: a copy telling no stage ran, for a result taken from a cache
+        :rtype: PasswordRobustness
+        """
+        return PasswordRobustness(self.length_score, self.brute_force_ms, self.exists_in_dictionary, self.dictionaries,
+                                  self.budget_exceeded, self.fuzzy_match, self.embedded_words, self.guess_estimate,
+                                  self.verdict)
+
+
+class StageRun:
+    """
+    A stage that ran on a password, and how long it took
+    """
+    name: str
+    ms: float
+
+    def __init__(self, name: str, ms: float):
+        self.name = name
+        self.ms = ms
+
+    def __repr__(self):
+        return f'{self.name} {self.ms:.3f}ms'
+
+    def serialize(self):
+        return {
+            "name": self.name,
+            "ms": round(self.ms, 3)
         }
 
 
-def compute_robustness(password: str, dictionaryChecker: DictionaryChecker):
+class CheckContext:
+    """
+    What the stages of one check share: the password, the dictionaries with the work budget of the search, and the
+    robustness being filled
+    """
+    password: str
+    dictionary_checker: DictionaryChecker
+    robustness: PasswordRobustness
+
+    def __init__(self, password: str, dictionary_checker: DictionaryChecker):
+        self.password = password
+        self.dictionary_checker = dictionary_checker
+        self.budget = dictionary_checker.new_budget()
+        self.robustness = PasswordRobustness(length_score=None, brute_force_ms=None, exists_in_dictionary=None)
+
+
+class CheckStage:
+    """
+    A step of the check, filling some of the robustness metrics
+    """
+    name: str
+    cost: int
+    requires: tuple
+
+    def __init__(self, name: str, cost: int, run, requires: tuple = ()):
+        """
+        :param name: the stage name, as reported
+        :type name: str
+        :param cost: how expensive the stage is, relatively to the others: cheaper ones run first
+        :type cost: int
+        :param run: fills the robustness of the context, given the metrics of the stages that ran before
+        :type run: callable[CheckContext]
+        :param requires: the names of the stages whose metrics run depends on, which must run before [()]
+        :type requires: tuple[str]
+        """
+        self.name = name
+        self.cost = cost
+        self.run = run
+        self.requires = tuple(requires)
+
+    def __repr__(self):
+        return f'{self.name} ({self.cost})'
+
+
+def _length_stage(context: CheckContext):
+    context.robustness.length_score = password_length_score(context.password)
+
+
+def _brute_force_stage(context: CheckContext):
+    context.robustness.brute_force_ms = compute_brute_force_ms(context.password)
+
+
+def _dictionary_stage(context: CheckContext):
+    dictionaries = context.dictionary_checker.matching_dictionaries(context.password, context.budget)
+    context.robustness.dictionaries = dictionaries
+    context.robustness.exists_in_dictionary = len(dictionaries) > 0
+    # so the policy knows whether not found means not in the dictionaries
+    context.robustness.budget_exceeded = context.budget is not None and context.budget.exceeded
+
+
+def _fuzzy_stage(context: CheckContext):
+    # only searched if enabled (see DictionaryChecker.build_fuzzy_index), for the passwords not found as such
+    if not context.robustness.dictionaries:
+        context.robustness.fuzzy_match = context.dictionary_checker.fuzzy_match(context.password, context.budget)
+
+
+def _embedded_stage(context: CheckContext):
+    # only searched if enabled (see DictionaryChecker.build_word_automaton)
+    context.robustness.embedded_words = context.dictionary_checker.embedded_words(context.password, context.budget)
+
+
+def _estimate_stage(context: CheckContext):
+    context.robustness.guess_estimate = estimate_guesses(context.password, context.dictionary_checker, context.budget)
+
+
+DEFAULT_STAGES = [
+    CheckStage('length', 1, _length_stage),
+    CheckStage('bruteForce', 1, _brute_force_stage),
+    CheckStage('dictionary', 10, _dictionary_stage),
+    CheckStage('fuzzy', 20, _fuzzy_stage, requires=('dictionary',)),
+    CheckStage('embedded', 20, _embedded_stage),
+    CheckStage('estimate', 30, _estimate_stage),
+]
+
+
+class PasswordPolicy:
+    """
+    Tells whether a password is acceptable, possibly from a partial result: too short or found in a dictionary, it is
+    refused as soon as the stage telling it ran; it is accepted once all the stages the policy looks at ran, unless the
+    dictionary search was cut short by its budget, which leaves it undecided
+
+    >>> policy = PasswordPolicy(min_length_score=16)
+    >>> policy.verdict(PasswordRobustness(0, None, None), {'length'})
+    False
+    >>> policy.verdict(PasswordRobustness(32, None, None), {'length'}) is None
+    True
+    >>> policy.verdict(PasswordRobustness(32, None, False), {'length', 'dictionary'})
+    True
+    >>> policy.verdict(PasswordRobustness(32, None, False, budget_exceeded=True), {'length', 'dictionary'}) is None
+    True
+    """
+    min_length_score: int
+    allow_dictionary_words: bool
+
+    def __init__(self, min_length_score: int = 16, allow_dictionary_words: bool = False):
+        """
+        :param min_length_score: the lowest length score accepted (see password_length_score) [16, 8 characters]
+        :type min_length_score: int
+        :param allow_dictionary_words: accept the passwords found in a dictionary [False]
+        :type allow_dictionary_words: bool
+        """
+        self.min_length_score = min_length_score
+        self.allow_dictionary_words = allow_dictionary_words
+
+    def verdict(self, robustness: PasswordRobustness, ran: set):
+        """
+        :param robustness: the metrics computed so far
+        :type robustness: PasswordRobustness
+        :param ran: the names of the stages that ran
+        :type ran: set[str]
+        :return: True if the password is acceptable, False if it is not, None if it cannot be told yet
+        :rtype: bool
+        """
+        if 'length' in ran and robustness.length_score < self.min_length_score:
+            return False
+        if not self.allow_dictionary_words and 'dictionary' in ran and robustness.exists_in_dictionary:
+            return False
+        if self.allow_dictionary_words:
+            return True if 'length' in ran else None
+        if {'length', 'dictionary'} <= ran and not robustness.budget_exceeded:
+            return True
+        return None
+
+
+class CheckPipeline:
+    """
+    The stages of a check, run by increasing cost (in the given order for equal costs), each one being timed.
+    The stages a stage requires must be there, and cheaper or given before it
+
+    >>> from passwordChecker.substitute import CharacterProjector
+    >>> pipeline = CheckPipeline(policy=PasswordPolicy())
+    >>> robustness = pipeline.run('paf', DictionaryChecker(CharacterProjector()), fast_verdict=True)
+    >>> robustness.verdict, [s.name for s in robustness.stages], robustness.exists_in_dictionary
+    (False, ['length'], None)
+    >>> robustness = pipeline.run('paf', DictionaryChecker(CharacterProjector()))
+    >>> robustness.verdict, [s.name for s in robustness.stages], robustness.exists_in_dictionary
+    (False, ['length', 'bruteForce', 'dictionary', 'fuzzy', 'embedded', 'estimate'], False)
+    >>> CheckPipeline([CheckStage('fuzzy', 1, _fuzzy_stage, requires=('dictionary',))])
+    Traceback (most recent call last):
+    ...
+    ValueError: Stage fuzzy requires dictionary to run before it
+    """
+    stages: list
+    policy: PasswordPolicy
+
+    def __init__(self, stages: list = None, policy: PasswordPolicy = None):
+        """
+        :param stages: the stages [DEFAULT_STAGES]
+        :type stages: list[CheckStage]
+        :param policy: tells whether the passwords are acceptable, None not to [None]
+        :type policy: PasswordPolicy
+        """
+        self.stages = sorted(stages if stages is not None else DEFAULT_STAGES, key=lambda stage: stage.cost)
+        self.policy = policy
+        before = set()
+        for stage in self.stages:
+            for required in stage.requires:
+                if required not in before:
+                    raise ValueError(f'Stage {stage.name} requires {required} to run before it')
+            before.add(stage.name)
+
+    def __repr__(self):
+        return f'pipeline {self.stages}'
+
+    def run(self, password: str, dictionary_checker: DictionaryChecker, fast_verdict: bool = False):
+        """
+        :param password: the password to analyze
+        :type password: str
+        :param dictionary_checker: to check if the word exists in some dictionaries
+        :type dictionary_checker: DictionaryChecker
+        :param fast_verdict: stop as soon as the policy tells whether the password is acceptable [False]
+        :type fast_verdict: bool
+        :return: the robustness, with the metrics of the stages that ran
+        :rtype: PasswordRobustness
+        """
+        context = CheckContext(password, dictionary_checker)
+        robustness = context.robustness
+        ran = set()
+        for stage in self.stages:
+            start = time.perf_counter()
+            stage.run(context)
+            robustness.stages.append(StageRun(stage.name, (time.perf_counter() - start) * 1000))
+            ran.add(stage.name)
+            if self.policy is not None:
+                robustness.verdict = self.policy.verdict(robustness, ran)
+                if fast_verdict and robustness.verdict is not None:
+                    break
+        robustness.budget_exceeded = context.budget is not None and context.budget.exceeded
+        return robustness
+
+
+# the pipeline of the checks not given one
+default_pipeline = CheckPipeline()
+
+
+def compute_robustness(password: str, dictionaryChecker: DictionaryChecker, cache: RobustnessCache = None,
+                       pipeline: CheckPipeline = None, fast_verdict: bool = False):
     """
     aggregates the differents robustness measures
     :param dictionaryChecker: to check of the word exist in some dicitonaries
     :type dictionaryChecker: DictionaryChecker
     :param password: the password to analyze
     :type password: str
+    :param cache: where to look for a result already computed, and keep it, unless for a fast verdict [None]
+    :type cache: RobustnessCache
+    :param pipeline: the stages to run [default_pipeline]
+    :type pipeline: CheckPipeline
+    :param fast_verdict: stop as soon as the pipeline policy tells whether the password is acceptable [False]
+    :type fast_verdict: bool
     :return: the robustess structure
     :rtype: PasswordRobustness
+
+    >>> from passwordChecker.substitute import CharacterProjector
+    >>> cache, dicoChecker = RobustnessCache(), DictionaryChecker(CharacterProjector())
+    >>> [len(compute_robustness('paf', dicoChecker, cache).stages) for _ in range(2)]
+    [6, 0]
+    """
+    pipeline = pipeline or default_pipeline
+    # a fast verdict is partial, whereas the cached results are complete
+    if cache is not None and not fast_verdict:
+        computed = []
+
+        def compute():
+            computed.append(pipeline.run(password, dictionaryChecker))
+            return computed[0]
+
+        robustness = cache.get_or_compute(password, dictionaryChecker.generation, compute)
+        # the stages of a cached result ran for another check, no stage ran for this one
+        return robustness if computed else robustness.without_stages()
+    return pipeline.run(password, dictionaryChecker, fast_verdict)
+
+
+def compute_robustness_batch(passwords, dictionaryChecker: DictionaryChecker, cache: RobustnessCache = None,
+                             pipeline: CheckPipeline = None):
+    """
+    computes the robustness of several passwords at once, sharing the dictionary checker and its projection state.
+    Identical passwords within the batch are only computed once
+    :param passwords: the passwords to analyze
+    :type passwords: iterable[str]
+    :param dictionaryChecker: to check of the word exist in some dicitonaries
+    :type dictionaryChecker: DictionaryChecker
+    :param cache: where to look for results already computed, and keep them [None]
+    :type cache: RobustnessCache
+    :param pipeline: the stages to run [default_pipeline]
+    :type pipeline: CheckPipeline
+    :return: the robustness structures, in the same order as the passwords
+    :rtype: list[PasswordRobustness]
+
+    >>> from passwordChecker.substitute import CharacterProjector
+    >>> results = compute_robustness_batch(['paf', 'chien', 'paf'], DictionaryChecker(CharacterProjector()))
+    >>> [r.length_score for r in results]
+    [0, 16, 0]
+    >>> results[0] is results[2]
+    True
+    """
+    return list(iter_robustness(passwords, dictionaryChecker, cache, pipeline))
+
+
+def iter_robustness(passwords, dictionaryChecker: DictionaryChecker, cache: RobustnessCache = None,
+                    pipeline: CheckPipeline = None, window: int = 1000):
+    """
+    lazy version of compute_robustness_batch, yielding the results as the passwords are consumed (e.g. from a stream).
+    A stream may be endless: identical passwords are only computed once within the last distinct ones (the passwords
+    themselves being held meanwhile), further repeats being left to the cache
+    :param passwords: the passwords to analyze
+    :type passwords: iterable[str]
+    :param dictionaryChecker: to check of the word exist in some dicitonaries
+    :type dictionaryChecker: DictionaryChecker
+    :param cache: where to look for results already computed, and keep them [None]
+    :type cache: RobustnessCache
+    :param pipeline: the stages to run [default_pipeline]
+    :type pipeline: CheckPipeline
+    :param window: the number of distinct passwords whose results are reused [1000]
+    :type window: int
+    :return: the robustness structures, in the same order as the passwords
+    :rtype: generator
+
+    >>> from passwordChecker.substitute import CharacterProjector
+    >>> passwords = ['paf', 'chien', 'paf', 'girafe', 'chien']
+    >>> results = list(iter_robustness(passwords, DictionaryChecker(CharacterProjector()), window=2))
+    >>> results[0] is results[2], results[1] is results[4]
+    (True, False)
     """
-    return PasswordRobustness(
-        length_score=password_length_score(password),
-        brute_force_ms=compute_brute_force_ms(password),
-        exists_in_dictionary=dictionaryChecker.contains(password)
-    )
+    computed = OrderedDict()
+    for password in passwords:
+        robustness = computed.get(password)
+        if robustness is None:
+            robustness = computed[password] = compute_robustness(password, dictionaryChecker, cache, pipeline)
+            if len(computed) > window:
+                computed.popitem(last=False)
+        else:
+            computed.move_to_end(password)
+        yield robustness
@@ -0,0 +1,342 @@
+# How the API services (main.py for Flask, asgi.py) set themselves up from the resources directory
+import mmap
+import multiprocessing
+import os
+import struct
+from threading import Event, Lock, Thread
+import time
+
+from passwordChecker.budget import DEFAULT_MAX_STEPS
+from passwordChecker.dictionary import DictionaryChecker
+from passwordChecker.substitute import CharacterProjector, ScramblingParams
+
+
+def create_dictionary_checker(resources: str = 'resources', max_trailing: int = 4, max_edit_distance: int = 0,
+                              min_embedded_length: int = 0, max_work: int = DEFAULT_MAX_STEPS, load_processes: int = 1,
+                              compact: bool = False):
+    """
+    Load the dictionaries found in the resources directory:
+     * the compiled index dictionaries.idx (python -m passwordChecker.index resources/dictionaries
+       resources/dictionaries.idx), memory mapped and shared by all the workers, with its Bloom filter if any,
+     * or else the dictionaries text files,
+     * plus the large breach corpora of the hashed directory (python -m passwordChecker.hashed).
+    :param resources: the resources directory ['resources']
+    :type resources: str
+    :param max_trailing: the tolerated trailing numbers/punctuation [4]
+    :type max_trailing: int
+    :param max_edit_distance: the typos tolerated by the fuzzy matching, 0 to disable it [0]
+    :type max_edit_distance: int
+    :param min_embedded_length: the shortest dictionary words looked for within the passwords, 0 not to [0]
+    :type min_embedded_length: int
+    :param max_work: the steps the search of one password can take, None for no limit [DEFAULT_MAX_STEPS]
+    :type max_work: int
+    :param load_processes: the processes projecting the text files, None for the cpu count. The service loads them
+    in its own process by default, not to fork a pool from a server master process [1]
+    :type load_processes: int
+    :param compact: hold each text dictionary as a CompactDictionary, taking about 50 times less memory for slower
+    lookups, rather than merging them [False]
+    :type compact: bool
+    :return: the loaded checker
+    :rtype: DictionaryChecker
+    """
+    scrambling_params = ScramblingParams(max_trailing=max_trailing, max_edit_distance=max_edit_distance,
+                                         min_embedded_length=min_embedded_length)
+    character_projector = CharacterProjector(scrambling_params=scrambling_params)
+    dico_checker = DictionaryChecker(character_projector=character_projector, merged=not compact, max_work=max_work,
+                                     compact=compact)
+
+    if os.path.exists(f'{resources}/dictionaries.idx'):
+        dico_checker.load_index(f'{resources}/dictionaries.idx')
+        if os.path.exists(f'{resources}/dictionaries.idx.bloom'):
+            dico_checker.load_prefilter(f'{resources}/dictionaries.idx.bloom')
+    else:
+        dico_checker.load_all_dictionaries(f'{resources}/dictionaries', load_processes)
+    if os.path.isdir(f'{resources}/hashed'):
+        for filename in sorted(os.listdir(f'{resources}/hashed')):
+            dico_checker.load_hashed_dictionary(f'{resources}/hashed/{filename}')
+    if max_edit_distance > 0:
+        print(f'Built {dico_checker.build_fuzzy_index()}')
+    # also finds the dictionary patterns of the guesses estimates
+    print(f'Built {dico_checker.build_word_automaton()}')
+    return dico_checker
+
+
+# the last published sequence, then a ring of (sequence, change, file name) entries
+_SEQUENCE = struct.Struct('<Q')
+_CHANGE = struct.Struct('<QB255p')
+_CHANGES = ('reload', 'add', 'remove')
+
+
+class DictionaryChanges:
+    """
+    The dictionary changes requested to one worker (see DictionaryReloader), published in memory shared by the worker
+    processes forked after it was created, so the others apply them too.
+    Only the latest changes are kept: a worker which missed more reloads all the dictionaries instead
+
+    >>> changes = DictionaryChanges(capacity=2)
+    >>> changes.publish('add', 'one.txt'), changes.publish('remove', 'two.txt')
+    (1, 2)
+    >>> changes.since(0)
+    [(1, 'add', 'one.txt'), (2, 'remove', 'two.txt')]
+    >>> changes.publish('add', 'two.txt')
+    3
+    >>> changes.since(0)
+    [(3, 'reload', '')]
+    """
+    capacity: int
+
+    def __init__(self, capacity: int = 64):
+        """
+        :param capacity: the number of changes kept [64]
+        :type capacity: int
+        """
+        self.capacity = capacity
+        self._lock = multiprocessing.Lock()
+        self._memory = mmap.mmap(-1, _SEQUENCE.size + capacity * _CHANGE.size)
+
+    @property
+    def sequence(self):
+        """
+        The sequence of the last published change, 0 if none was
+        """
+        return _SEQUENCE.unpack_from(self._memory, 0)[0]
+
+    def _offset(self, sequence: int):
+        return _SEQUENCE.size + (sequence % self.capacity) * _CHANGE.size
+
+    def publish(self, change: str, name: str = ''):
+        """
+        :param change: 'reload', 'add' or 'remove'
+        :type change: str
+        :param name: the dictionary file name, for an add or a remove ['']
+        :type name: str
+        :return: the sequence of the change
+        :rtype: int
+        """
+        with self._lock:
+            sequence = self.sequence + 1
+            _CHANGE.pack_into(self._memory, self._offset(sequence), sequence, _CHANGES.index(change),
+                              name.encode('utf-8'))
+            _SEQUENCE.pack_into(self._memory, 0, sequence)
+        return sequence
+
+    def since(self, sequence: int):
+        """
+        :param sequence: the last change already applied
+        :type sequence: int
+        :return: the (sequence, change, name) published after it, in order
+        :rtype: list[tuple]
+        """
+        with self._lock:
+            last = self.sequence
+            changes = []
+            for expected in range(sequence + 1, last + 1):
+                found, change, name = _CHANGE.unpack_from(self._memory, self._offset(expected))
+                if found != expected:
+                    return [(last, 'reload', '')]
+                changes.append((found, _CHANGES[change], name.decode('utf-8')))
+            return changes
+
+
+def _resource_files(resources: str):
+    """
+    :return: the modification time and size of each dictionary file of the resources directory, by path
+    :rtype: dict[str, tuple]
+    """
+    files = {}
+    for dirname in [resources, f'{resources}/dictionaries', f'{resources}/hashed']:
+        if os.path.isdir(dirname):
+            for entry in os.scandir(dirname):
+                if entry.is_file():
+                    stat = entry.stat()
+                    files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+class DictionaryReloader:
+    """
+    Changes the dictionaries of a serving checker without making the checks wait. Changes are requested (reload,
+    add_dictionary, remove_dictionary) or found in the resources directory, then applied by a background thread: the
+    new dictionaries are built aside and swapped in at once (see DictionaryChecker.swap), the checks going on with the
+    previous ones meanwhile.
+    Requested changes are published through DictionaryChanges to all the worker processes forked after the reloader
+    was created, each one applying them in its own thread, and each one checking the resources directory on its own.
+    Threads do not survive a fork: start is called in each worker, typically before each request, and only starts its
+    thread once per process. Without it, the changes are only applied by apply_changes
+    """
+    resources: str
+    watch_seconds: float
+    reloads: int
+    applied: int
+
+    def __init__(self, dictionary_checker: DictionaryChecker, resources: str = 'resources',
+                 changes: DictionaryChanges = None, watch_seconds: float = 0):
+        """
+        :param dictionary_checker: the serving checker
+        :type dictionary_checker: DictionaryChecker
+        :param resources: the resources directory it was created from ['resources']
+        :type resources: str
+        :param changes: where the changes are published to the worker processes [a new DictionaryChanges]
+        :type changes: DictionaryChanges
+        :param watch_seconds: the interval at which the thread checks the resources directory for changes, 0 not to [0]
+        :type watch_seconds: float
+        """
+        self.dictionary_checker = dictionary_checker
+        self.resources = resources
+        self.changes = changes if changes is not None else DictionaryChanges()
+        self.watch_seconds = watch_seconds
+        self.reloads = 0
+        self.last_error = None
+        # the sequence of the last published change applied by this process
+        self.applied = self.changes.sequence
+        self._files = _resource_files(resources)
+        self._checked = time.monotonic()
+        # one change at a time
+        self._lock = Lock()
+        self._start_lock = Lock()
+        self._wakeup = Event()
+        # the process whose thread is running
+        self._pid = None
+
+    def _dictionary_path(self, name: str):
+        # only files of the dictionaries directory can be loaded
+        return f'{self.resources}/dictionaries/{os.path.basename(name)}'
+
+    def start(self):
+        """
+        Start the thread applying the changes in this process, unless it is running already
+        """
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # not to inherit the state of a thread of the parent process
+            self._lock, self._wakeup = Lock(), Event()
+            self._pid = os.getpid()
+            Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        while True:
+            # the changes published by the other workers are found within a second, the ones of this worker at once
+            self._wakeup.wait(min(self.watch_seconds or 1, 1))
+            self._wakeup.clear()
+            try:
+                self.apply_changes()
+                if self.watch_seconds and time.monotonic() - self._checked >= self.watch_seconds:
+                    self.check_files()
+            except Exception as e:
+                self.last_error = e
+                print(f'Could not apply the dictionary changes: {e}')
+
+    def _request(self, change: str, name: str = ''):
+        sequence = self.changes.publish(change, name)
+        self._wakeup.set()
+        return sequence
+
+    def reload(self):
+        """
+        Request a reload of all the dictionaries, applied in the background by each worker
+        :return: the sequence of the change (see applied)
+        :rtype: int
+        """
+        return self._request('reload')
+
+    def add_dictionary(self, name: str):
+        """
+        Request the load (or reload) of a file of the dictionaries directory, without loading the others again
+        :param name: the file name
+        :type name: str
+        :return: the sequence of the change (see applied)
+        :rtype: int
+        :raise FileNotFoundError: if there is no such file
+        """
+        path = self._dictionary_path(name)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f'No dictionary file {path}')
+        return self._request('add', name)
+
+    def remove_dictionary(self, name: str):
+        """
+        Request the removal of a dictionary loaded from the dictionaries directory
+        :param name: the file name
+        :type name: str
+        :return: the sequence of the change (see applied)
+        :rtype: int
+        :raise ValueError: if no such dictionary is loaded
+        """
+        path = self._dictionary_path(name)
+        if not any(d.name == path or path in getattr(d, 'dictionary_names', ())
+                   for d in self.dictionary_checker.dictionaries):
+            raise ValueError(f'No dictionary {path}')
+        return self._request('remove', name)
+
+    def _reload(self):
+        files = _resource_files(self.resources)
+        scrambling_params = self.dictionary_checker.character_projector.scrambling_params
+        self.dictionary_checker.swap(create_dictionary_checker(self.resources, scrambling_params.max_trailing,
+                                                               scrambling_params.max_edit_distance,
+                                                               scrambling_params.min_embedded_length,
+                                                               self.dictionary_checker.max_work,
+                                                               compact=self.dictionary_checker.compact))
+        self._files = files
+
+    def _apply(self, change: str, name: str):
+        if change == 'reload':
+            self._reload()
+        elif change == 'add':
+            self.dictionary_checker.add_dictionary(self._dictionary_path(name))
+        else:
+            self.dictionary_checker.remove_dictionary(self._dictionary_path(name))
+
+    def apply_changes(self):
+        """
+        Apply the changes published since the last call, as the thread does: the changes before a reload are skipped
+        :return: True if some changes were applied
+        :rtype: bool
+        """
+        with self._lock:
+            changes = self.changes.since(self.applied)
+            reloads = [i for i, (_, change, _) in enumerate(changes) if change == 'reload']
+            for sequence, change, name in changes[reloads[-1] if reloads else 0:]:
+                try:
+                    self._apply(change, name)
+                    self.reloads += 1
+                    self.last_error = None
+                except Exception as e:
+                    self.last_error = e
+                    print(f'Could not apply the dictionary change {change} {name}: {e}')
+            if changes:
+                self.applied = changes[-1][0]
+            return len(changes) > 0
+
+    def check_files(self):
+        """
+        Apply the changes of the resources directory since the last check, as the thread does every watch_seconds
+        :return: True if some changes were found
+        :rtype: bool
+        """
+        self._checked = time.monotonic()
+        with self._lock:
+            files = _resource_files(self.resources)
+            if files == self._files:
+                return False
+            changed = {path for path in files.keys() | self._files.keys() if files.get(path) != self._files.get(path)}
+            dictionaries_dir = f'{self.resources}/dictionaries/'
+            uses_index = any(path.endswith('.idx') for path in files.keys() | self._files.keys())
+            try:
+                if uses_index or not all(path.startswith(dictionaries_dir) for path in changed):
+                    self._reload()
+                else:
+                    for path in sorted(changed):
+                        if path in files:
+                            self.dictionary_checker.add_dictionary(path)
+                        else:
+                            self.dictionary_checker.remove_dictionary(path)
+                self.reloads += 1
+                self.last_error = None
+            except Exception as e:
+                self.last_error = e
+                print(f'Could not reload the dictionaries: {e}')
+            self._files = files
+        return True
@@ -0,0 +1,287 @@
+# Interactive clients check the password at each keystroke: 'p', 'pa', 'paf'...
+# A session keeps, for each prefix of the password, what was computed for it (char types, trailing characters, nodes
+# reached in the dictionaries prefix trees), so appending or deleting a character only costs the work for that
+# character. The guesses estimate is kept along, and only computed again from the start when a character of a new type
+# changes the brute force alphabet.
+from collections import OrderedDict
+import secrets
+from threading import Lock
+import time
+
+from passwordChecker.budget import WorkBudget
+from passwordChecker.complexity import get_char_type, char_types_alphabet_size, estimate_brute_force_ms, \
+    password_length_score
+from passwordChecker.dictionary import DictionaryChecker
+from passwordChecker.estimator import GuessEstimator, MAX_ANALYZED_LENGTH
+from passwordChecker.robustness import PasswordRobustness
+
+
+class _Frame:
+    """
+    The state after a given prefix of the password
+    """
+
+    def __init__(self, char_types: frozenset, trailing_run: int, frontier: list, matches: list,
+                 truncated: bool = False):
+        # the char types met so far
+        self.char_types = char_types
+        # the number of trailing characters that could be wiped, at the end of the prefix
+        self.trailing_run = trailing_run
+        # the (dictionary, tree, node, word) reached in the prefix trees
+        self.frontier = frontier
+        # the (dictionary, word) whose word ends exactly on this prefix
+        self.matches = matches
+        # whether a work budget ran out while building the frontier of this prefix or of a shorter one, which are then
+        # missing some nodes
+        self.truncated = truncated
+
+
+class RobustnessSession:
+    """
+    The robustness of a password being typed, updated incrementally.
+    Dictionaries which cannot be walked by prefix (hashed ones) are searched from scratch when the result is asked.
+
+    >>> from passwordChecker.dictionary import PasswordDictionary
+    >>> from passwordChecker.substitute import CharacterProjector, ScramblingParams
+    >>> dicoChecker = DictionaryChecker(CharacterProjector(scrambling_params=ScramblingParams(max_trailing=2)))
+    >>> dicoChecker.dictionaries = [PasswordDictionary('paf', ['paf', 'ie', 'chien'])]
+    >>> session = RobustnessSession(dicoChecker)
+    >>> session.check('ch').exists_in_dictionary
+    False
+    >>> session.check('ch1en').exists_in_dictionary
+    True
+    >>> session.check('ch1en42').exists_in_dictionary
+    True
+    >>> session.check('ch1en421').exists_in_dictionary
+    False
+    >>> session.check('ch1en4').dictionaries
+    ['paf']
+    >>> dicoChecker.max_work = 3
+    >>> RobustnessSession(dicoChecker).check('ch1en').budget_exceeded
+    True
+    """
+    dictionary_checker: DictionaryChecker
+    last_access: float
+
+    def __init__(self, dictionaryChecker: DictionaryChecker):
+        """
+        :param dictionaryChecker: to check of the word exist in some dicitonaries
+        :type dictionaryChecker: DictionaryChecker
+        """
+        self.dictionary_checker = dictionaryChecker
+        self.lock = Lock()
+        self.last_access = time.monotonic()
+        self._reset()
+
+    def _reset(self):
+        character_projector = self.dictionary_checker.character_projector
+        self._generation = self.dictionary_checker.generation
+        self._trailing_chars = set(character_projector.trailing_chars())
+        self._max_trailing = character_projector.scrambling_params.max_trailing
+        self._password = ''
+
+        frontier = []
+        self._unwalkable = []
+        for dictionary in self.dictionary_checker.dictionaries:
+            tree = dictionary.prefix_tree()
+            if tree is None:
+                self._unwalkable.append(dictionary)
+            else:
+                frontier.append((dictionary, tree, tree.root(), ''))
+        matches = [(dictionary, word) for dictionary, tree, node, word in frontier if tree.value(node) is not None]
+        self._frames = [_Frame(frozenset(), 0, frontier, matches)]
+        # the estimate of the analyzed characters, for their char types, None when they changed
+        self._estimator = None
+        self._estimator_types = None
+
+    @property
+    def password(self):
+        return self._password
+
+    def _estimated_types(self):
+        return self._frames[min(len(self._password), MAX_ANALYZED_LENGTH)].char_types
+
+    def append(self, chars: str, budget: WorkBudget = None):
+        """
+        Add characters at the end of the password
+        :param chars: the typed characters
+        :type chars: str
+        :param budget: one step is spent per prefix tree node extended, the frontier of the following characters being
+            left incomplete once it is exhausted [None]
+        :type budget: WorkBudget
+        """
+        project_char = self.dictionary_checker.character_projector.project_char
+        for c in chars:
+            previous = self._frames[-1]
+            char_type = get_char_type(c)
+            char_types = previous.char_types if char_type in previous.char_types else previous.char_types | {char_type}
+            trailing_run = previous.trailing_run + 1 if c in self._trailing_chars else 0
+
+            frontier = []
+            truncated = previous.truncated
+            for dictionary, tree, node, word in previous.frontier:
+                if budget is not None and not budget.spend():
+                    truncated = True
+                    break
+                for projected in project_char(c):
+                    child = tree.child(node, projected)
+                    if child is not None:
+                        frontier.append((dictionary, tree, child, word + projected))
+            matches = [(dictionary, word) for dictionary, tree, node, word in frontier
+                       if tree.value(node) is not None]
+
+            self._frames.append(_Frame(char_types, trailing_run, frontier, matches, truncated))
+            self._password += c
+            if self._estimator is not None:
+                if self._estimated_types() == self._estimator_types:
+                    self._estimator.append(c)
+                else:
+                    self._estimator = None
+
+    def pop(self, count: int = 1):
+        """
+        Remove characters from the end of the password
+        :param count: the number of characters to remove [1]
+        :type count: int
+        """
+        count = min(count, len(self._password))
+        if count > 0:
+            del self._frames[-count:]
+            self._password = self._password[:-count]
+            if self._estimator is not None:
+                if self._estimated_types() == self._estimator_types:
+                    self._estimator.pop(count)
+                else:
+                    self._estimator = None
+
+    def update(self, password: str, budget: WorkBudget = None):
+        """
+        Move to a new password, only recomputing what changed since the common prefix with the current one
+        :param password: the new password
+        :type password: str
+        :param budget: the work that can be spent on the appended characters (see append) [None]
+        :type budget: WorkBudget
+        """
+        if self._generation != self.dictionary_checker.generation:
+            self._reset()
+        common = 0
+        for a, b in zip(self._password, password):
+            if a != b:
+                break
+            common += 1
+        self.pop(len(self._password) - common)
+        self.append(password[common:], budget)
+
+    def robustness(self, budget: WorkBudget = None):
+        """
+        :param budget: the work that can be spent on the searches not done incrementally, shared with the update of the
+            password if any [dictionary_checker.new_budget()]
+        :type budget: WorkBudget
+        :return: the robustness of the current password, whose budget is exceeded as well if the frontier of the prefix
+            trees is incomplete
+        :rtype: PasswordRobustness
+        """
+        length = len(self._password)
+        current = self._frames[-1]
+        # same as CharacterProjector.truncation_lengths, from the trailing characters count
+        shortest = length - min(current.trailing_run, self._max_trailing)
+
+        names = set()
+        for frame in self._frames[shortest:]:
+            for dictionary, word in frame.matches:
+                names.update(dictionary.sources(word))
+        # the hashed dictionaries enumerate the candidates, from the budget left by the prefix trees frontier
+        if budget is None:
+            budget = self.dictionary_checker.new_budget()
+        if self._unwalkable:
+            lengths = range(shortest, length + 1)
+            projected_chars = self.dictionary_checker.character_projector.project_chars(self._password)
+            for dictionary in self._unwalkable:
+                for word in dictionary.walk(projected_chars, lengths, budget):
+                    names.update(dictionary.sources(word))
+
+        dictionaries = sorted(names)
+        fuzzy_match = self.dictionary_checker.fuzzy_match(self._password, budget) if not dictionaries else None
+        embedded_words = self.dictionary_checker.embedded_words(self._password, budget)
+        if self._estimator is None:
+            # the automaton states are bounded by its size, as the prefix trees frontier
+            self._estimator_types = self._estimated_types()
+            self._estimator = GuessEstimator(char_types_alphabet_size(self._estimator_types), self.dictionary_checker,
+                                             undoable=True)
+            self._estimator.append(self._password)
+        guess_estimate = self._estimator.estimate()
+        return PasswordRobustness(
+            length_score=password_length_score(self._password),
+            brute_force_ms=estimate_brute_force_ms(char_types_alphabet_size(current.char_types), length),
+            exists_in_dictionary=len(dictionaries) > 0,
+            dictionaries=dictionaries,
+            budget_exceeded=current.truncated or (budget is not None and budget.exceeded),
+            fuzzy_match=fuzzy_match,
+            embedded_words=embedded_words,
+            guess_estimate=guess_estimate
+        )
+
+    def check(self, password: str):
+        """
+        Thread safe update then robustness, sharing one work budget as the searches of compute_robustness do
+        :param password: the new password
+        :type password: str
+        :return: the robustness of the password
+        :rtype: PasswordRobustness
+        """
+        with self.lock:
+            self.last_access = time.monotonic()
+            budget = self.dictionary_checker.new_budget()
+            self.update(password, budget)
+            return self.robustness(budget)
+
+
+class SessionStore:
+    """
+    Holds the sessions, by id, dropping the least recently used ones beyond a maximum count or an idle time
+    """
+    max_sessions: int
+    ttl_seconds: float
+
+    def __init__(self, dictionaryChecker: DictionaryChecker, max_sessions: int = 10000, ttl_seconds: float = 300):
+        """
+        :param dictionaryChecker: the checker the sessions are built upon
+        :type dictionaryChecker: DictionaryChecker
+        :param max_sessions: the maximum number of sessions kept [10000]
+        :type max_sessions: int
+        :param ttl_seconds: how long an idle session is kept [300]
+        :type ttl_seconds: float
+        """
+        self.dictionary_checker = dictionaryChecker
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, session_id: str = None):
+        """
+        Get a session by id, or a new one if the id is unknown or expired
+        :param session_id: the session id [None]
+        :type session_id: str
+        :return: the session id (a new one if the session was created) and the session
+        :rtype: tuple[str, RobustnessSession]
+        """
+        now = time.monotonic()
+        with self._lock:
+            while self._sessions:
+                oldest_id, oldest = next(iter(self._sessions.items()))
+                if now - oldest.last_access <= self.ttl_seconds and len(self._sessions) < self.max_sessions:
+                    break
+                del self._sessions[oldest_id]
+
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                session_id = secrets.token_urlsafe(16)
+                session = self._sessions[session_id] = RobustnessSession(self.dictionary_checker)
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_access = now
+            return session_id, session
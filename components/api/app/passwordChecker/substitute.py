@@ -1,6 +1,8 @@
-from itertools import product, chain
+from itertools import product
 import re
 
+from passwordChecker.budget import WorkBudget
+
 
 # if a word such as 'bonjour' is passed, we want to check variants, by substituting letters, adding punctuation and
 # so on. This file contains the function to check on the fly all those variants
@@ -9,7 +11,9 @@ class ScramblingParams:
     def __init__(self,
                  max_trailing: int = 0,
                  trailing_numbers: bool = True,
-                 trailing_punctuations: bool = True
+                 trailing_punctuations: bool = True,
+                 max_edit_distance: int = 0,
+                 min_embedded_length: int = 0
                  ):
         """
         Defines the space to look for when we scan for scrambled passwords
@@ -19,12 +23,19 @@ class ScramblingParams:
         :type trailing_numbers: bool
         :param trailing_punctuations: should we be tolerant to trailing punctuation characters [True]
         :type trailing_punctuations: bool
-
+        :param max_edit_distance: also look for the dictionary words within this number of typos (insertions,
+            deletions, substitutions or swaps of characters), 0 for exact matches only (see passwordChecker.fuzzy) [0]
+        :type max_edit_distance: int
+        :param min_embedded_length: also look for the dictionary words of at least this length anywhere within the
+            password, 0 not to (see passwordChecker.embedded) [0]
+        :type min_embedded_length: int
 
         """
         self.trailing_numbers = trailing_numbers
         self.trailing_punctuations = trailing_punctuations
         self.max_trailing = max_trailing
+        self.max_edit_distance = max_edit_distance
+        self.min_embedded_length = min_embedded_length
 
 
 _sub_dict = {
@@ -71,10 +82,18 @@ class CharacterProjector:
         """
 
         self.scrambling_params = scrambling_params
+        self.subst_dict = subst_dict
         self.character_projection = CharacterProjector.build_character_projection(subst_dict)
-        self.trailing_regexp = self.build_trailing_regexp()
 
-        self.trailing_cleaning_regexp = CharacterProjector.build_regexp(_numbers + _punctuation, is_tail=True)
+        # the projection compiled for the fast path: characters with a single projection are translated at once by
+        # str.translate, only the ambiguous ones go through the combinations
+        self._translation = str.maketrans({c: projected[0] for c, projected in self.character_projection.items()
+                                           if len(projected) == 1})
+        self._ambiguous = {c: projected for c, projected in self.character_projection.items() if len(projected) > 1}
+        self._ambiguous_chars = frozenset(self._ambiguous)
+        # str.rstrip does what the tail anchored regular expressions do, in a single call
+        self._trailing_chars = ''.join(self.trailing_chars())
+        self._cleaning_chars = ''.join(_numbers + _punctuation)
 
     def index_password(self, password: str):
         """
@@ -94,8 +113,7 @@ class CharacterProjector:
         >>> CharacterProjector().index_password('he6a')
         ['heba', 'hega']
         """
-        cleaned_up = self.trailing_cleaning_regexp.sub('', password)
-        return self.project_word(cleaned_up)
+        return self.project_word(password.rstrip(self._cleaning_chars))
 
     def potential_indexes(self, password: str):
         """
@@ -114,13 +132,50 @@ class CharacterProjector:
         ['heiio__']
         """
 
-        if self.trailing_regexp:
-            m = self.trailing_regexp.search(password)
-            if m:
-                truncated_passwords = [password[0:i] for i in range(m.start(), m.end() + 1)]
-                return list(chain(*[self.project_word(p) for p in truncated_passwords]))
+        return list(self.iter_indexes(password))
 
-        return self.project_word(password)
+    def iter_indexes(self, password: str, budget: WorkBudget = None):
+        """
+        Lazy potential_indexes: the candidates are built one at a time, the shortest truncations first, as dictionary
+        words are indexed without their trailing numbers/punctuation
+        :param password: the submitted password
+        :type password: str
+        :param budget: one step is spent per candidate, the generation stops when it is exhausted [None]
+        :type budget: WorkBudget
+        :return: a generator of the potential indexes
+        :rtype: generator
+        >>> from itertools import islice
+        >>> list(islice(CharacterProjector().iter_indexes('9' * 40), 2))
+        ['gggggggggggggggggggggggggggggggggggggggg', 'gggggggggggggggggggggggggggggggggggggggq']
+        >>> list(CharacterProjector().iter_indexes('pa9', WorkBudget(1)))
+        ['pag']
+        """
+        projected_chars = self.project_chars(password)
+        for length in self.truncation_lengths(password):
+            for chars in product(*projected_chars[0:length]):
+                if budget is not None and not budget.spend():
+                    return
+                yield ''.join(chars)
+
+    def truncation_lengths(self, password: str):
+        """
+        The lengths the password might have had when indexed, once its trailing numbers/punctuation are wiped
+        :param password: the submitted password
+        :type password: str
+        :return: the potential lengths
+        :rtype: range
+        >>> CharacterProjector().truncation_lengths('HE!io')
+        range(5, 6)
+        >>> CharacterProjector(scrambling_params=ScramblingParams(max_trailing=2)).truncation_lengths('HeL101234')
+        range(7, 10)
+        >>> CharacterProjector(scrambling_params=ScramblingParams(max_trailing=2)).truncation_lengths('HE!io__')
+        range(7, 8)
+        """
+        length = len(password)
+        if self._trailing_chars:
+            trailing = min(length - len(password.rstrip(self._trailing_chars)), self.scrambling_params.max_trailing)
+            return range(length - trailing, length + 1)
+        return range(length, length + 1)
 
     def trim(self, word):
         """
@@ -153,9 +208,34 @@ class CharacterProjector:
         ['pag', 'paq']
         >>> CharacterProjector({'q': ['q', '9'], 'g': ['g', '6', '9']}).project_word('pa99')
         ['pagg', 'pagq', 'paqg', 'paqq']
+        >>> CharacterProjector().project_word('G0 Ou9ht!')
+        ['go oughti', 'go ouqhti', 'go qughti', 'go quqhti', 'gq oughti', 'gq ouqhti', 'gq qughti', 'gq quqhti']
         """
-        combinatorial = [self.project_char(c) for c in word]
-        return [''.join(c) for c in product(*combinatorial)]
+        translated = word.translate(self._translation)
+        if self._ambiguous_chars.isdisjoint(word):
+            return [translated]
+
+        positions = [i for i, c in enumerate(word) if c in self._ambiguous_chars]
+        chars = list(translated)
+        projected = []
+        for alternatives in product(*[self._ambiguous[word[i]] for i in positions]):
+            for i, c in zip(positions, alternatives):
+                chars[i] = c
+            projected.append(''.join(chars))
+        return projected
+
+    def project_chars(self, word):
+        """
+        Project each character of the word, without combining them
+        :param word: the original word, typically a scrambled password
+        :type word: str
+        :return: for each position, the list of projected characters
+        :rtype: list[list[str]]
+        >>> CharacterProjector({'q': ['q', '9'], 'g': ['g', '6', '9']}).project_chars('pa9')
+        [['p'], ['a'], ['g', 'q']]
+        """
+        projection = self.character_projection
+        return [projection.get(c) or [c] for c in word]
 
     def project_char(self, char):
         """
@@ -181,34 +261,25 @@ class CharacterProjector:
         """
         return self.character_projection.get(char, [char])
 
-    def build_trailing_regexp(self):
+    def trailing_chars(self):
         """
-        Build the regular expression that is able to catch the trailing number/punctuation, depending on
-        the CharacterProjector properties
-        :return: the regular expression to capture what is eventually to be trimmed. Or None
-        :rtype: Regexp
-        >>> proj = CharacterProjector(scrambling_params=ScramblingParams(max_trailing=0, trailing_punctuations=True, trailing_numbers=True))
-        >>> proj.build_trailing_regexp()
-
-        >>> proj = CharacterProjector(scrambling_params=ScramblingParams(max_trailing=2, trailing_punctuations=True, trailing_numbers=True))
-        >>> proj.build_trailing_regexp().sub('', 'abcdef1!4?')
-        'abcdef1!'
-        >>> proj = CharacterProjector(scrambling_params=ScramblingParams(max_trailing=8, trailing_punctuations=True, trailing_numbers=True))
-        >>> proj.build_trailing_regexp().sub('', 'abcdef1!4?')
-        'abcdef'
+        The characters that can be wiped at the end of a password, depending on the CharacterProjector properties
+        :return: the list of characters, empty if nothing is to be wiped
+        :rtype: list[str]
+        >>> CharacterProjector(scrambling_params=ScramblingParams(max_trailing=2, trailing_punctuations=False)).trailing_chars()
+        ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9']
+        >>> CharacterProjector(scrambling_params=ScramblingParams(max_trailing=2, trailing_numbers=False)).trailing_chars()
+        ['!', '@', '#', '$', '%', '^', '&', '*', '?']
+        >>> CharacterProjector(scrambling_params=ScramblingParams(max_trailing=0)).trailing_chars()
+        []
         """
+        trailing_chars = []
         if self.scrambling_params.max_trailing > 0:
+            if self.scrambling_params.trailing_punctuations:
+                trailing_chars += _punctuation
             if self.scrambling_params.trailing_numbers:
-                if self.scrambling_params.trailing_punctuations:
-                    trailing_chars = _punctuation + _numbers
-                else:
-                    trailing_chars = _numbers
-            else:
-                if self.scrambling_params.trailing_punctuations:
-                    trailing_chars = _numbers
-            return CharacterProjector.build_regexp(trailing_chars, is_tail=True,
-                                                   max_length=self.scrambling_params.max_trailing)
-        return None
+                trailing_chars += _numbers
+        return trailing_chars
 
     @staticmethod
     def build_regexp(chars: list, is_not: bool = False, is_head: bool = False, is_tail: bool = False,
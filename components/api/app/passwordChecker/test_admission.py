@@ -0,0 +1,119 @@
+import multiprocessing
+from threading import Event, Thread
+import time
+from unittest import TestCase
+
+from passwordChecker.admission import SharedRateLimiter, SingleFlight
+
+
+class SharedRateLimiterTest(TestCase):
+    def test_clients_have_their_own_bucket(self):
+        now = [0.0]
+        limiter = SharedRateLimiter(rate=1, burst=3, clock=lambda: now[0])
+
+        self.assertEqual([0, 0, 0], [limiter.admit('abuser') for _ in range(3)])
+        self.assertGreater(limiter.admit('abuser'), 0)
+        self.assertEqual(0, limiter.admit('user'))
+        now[0] = 1
+        self.assertEqual(0, limiter.admit('abuser'))
+        self.assertGreater(limiter.admit('abuser'), 0)
+
+    def test_batch_goes_into_debt(self):
+        now = [0.0]
+        limiter = SharedRateLimiter(rate=10, burst=10, clock=lambda: now[0])
+
+        self.assertEqual(0, limiter.admit('client', cost=50))
+        self.assertAlmostEqual(4.1, limiter.admit('client'))
+        now[0] = 4.1
+        self.assertEqual(0, limiter.admit('client'))
+
+    def test_workers_share_buckets(self):
+        limiter = SharedRateLimiter(rate=1, burst=5, clock=lambda: 0)
+
+        def worker():
+            limiter.admit('abuser')
+            limiter.admit('abuser')
+
+        fork = multiprocessing.get_context('fork')
+        workers = [fork.Process(target=worker) for _ in range(4)]
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join()
+
+        # as many requests admitted as with a single worker
+        self.assertEqual((5, 3), (limiter.admitted, limiter.rejected))
+        self.assertGreater(limiter.admit('abuser'), 0)
+        self.assertEqual(0, limiter.admit('user'))
+
+    def test_forgets_least_recent_clients(self):
+        now = [0.0]
+        limiter = SharedRateLimiter(rate=0.001, burst=1, max_clients=2, clock=lambda: now[0])
+        for client in ['a', 'b', 'a', 'c']:
+            limiter.admit(client)
+            now[0] += 1
+
+        # b was forgotten, its bucket is full again
+        self.assertEqual(0, limiter.admit('b'))
+
+
+class SingleFlightTest(TestCase):
+    def test_concurrent_calls_share_one_computation(self):
+        flights = SingleFlight()
+        started, release = Event(), Event()
+        computations = []
+
+        def compute():
+            computations.append(1)
+            started.set()
+            release.wait(5)
+            return 'computed paf'
+
+        results = []
+        leader = Thread(target=lambda: results.append(flights.do('paf', compute)))
+        leader.start()
+        started.wait(5)
+        followers = [Thread(target=lambda: results.append(flights.do('paf', compute))) for _ in range(4)]
+        for follower in followers:
+            follower.start()
+        while flights.shared < 4:
+            time.sleep(0.001)
+        # another key is not held back
+        self.assertEqual('computed chien', flights.do('chien', lambda: 'computed chien'))
+        release.set()
+        for thread in [leader] + followers:
+            thread.join()
+
+        self.assertEqual(['computed paf'] * 5, results)
+        self.assertEqual(1, len(computations))
+        self.assertEqual(0, len(flights))
+        self.assertEqual('computed again', flights.do('paf', lambda: 'computed again'))
+
+    def test_errors_are_shared(self):
+        flights = SingleFlight()
+        started, release = Event(), Event()
+        errors = []
+
+        def compute():
+            started.set()
+            release.wait(5)
+            raise ValueError('paf')
+
+        def call():
+            try:
+                flights.do('paf', compute)
+            except ValueError as e:
+                errors.append(str(e))
+
+        threads = [Thread(target=call)]
+        threads[0].start()
+        started.wait(5)
+        threads.append(Thread(target=call))
+        threads[1].start()
+        while flights.shared < 1:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(['paf', 'paf'], errors)
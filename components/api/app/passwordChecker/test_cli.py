@@ -0,0 +1,56 @@
+import csv
+import io
+import json
+from unittest import TestCase
+
+from passwordChecker.cli import audit
+
+
+class CliTest(TestCase):
+    passwords = ['chien', 'flap42!', 'frout', 'chien', 'p4F le Chï3n !', 'ñandú']
+
+    def test_audit_ndjson(self):
+        out = io.StringIO()
+        count = audit(iter(p + '\n' for p in self.passwords), out, processes=2, chunk_size=2,
+                      dictionaries='app/resources/test/dictionaries')
+
+        self.assertEqual(len(self.passwords), count)
+        got = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(self.passwords, [r['password'] for r in got])
+        self.assertEqual(list(range(1, len(self.passwords) + 1)), [r['line'] for r in got])
+        self.assertEqual([True, True, False, True, False, False], [r['existsInDictionary'] for r in got])
+        self.assertEqual([16, 16, 16, 16, 64, 16], [r['lengthScore'] for r in got])
+
+    def test_audit_verdict(self):
+        strict, lenient = io.StringIO(), io.StringIO()
+        audit(iter(p + '\n' for p in self.passwords), strict, processes=1,
+              dictionaries='app/resources/test/dictionaries')
+        audit(iter(p + '\n' for p in self.passwords), lenient, processes=1,
+              dictionaries='app/resources/test/dictionaries', min_length_score=32, allow_dictionary_words=True)
+
+        got = [json.loads(line) for line in strict.getvalue().splitlines()]
+        self.assertEqual([False, False, True, False, True, True], [r['verdict'] for r in got])
+        self.assertEqual(['length', 'bruteForce', 'dictionary', 'fuzzy', 'embedded', 'estimate'],
+                         [s['name'] for s in got[0]['stages']])
+        self.assertEqual([False, False, False, False, True, False],
+                         [json.loads(line)['verdict'] for line in lenient.getvalue().splitlines()])
+
+    def test_audit_compact(self):
+        merged, compact = io.StringIO(), io.StringIO()
+        for out, is_compact in [(merged, False), (compact, True)]:
+            audit(iter(p + '\n' for p in self.passwords), out, processes=1, compact=is_compact,
+                  dictionaries='app/resources/test/dictionaries', min_embedded_length=3)
+
+        # the same results, but for the durations of the stages
+        got = [[{**r, 'stages': [s['name'] for s in r['stages']]} for r in map(json.loads, out.getvalue().splitlines())]
+               for out in (merged, compact)]
+        self.assertEqual(got[0], got[1])
+
+    def test_audit_csv(self):
+        out = io.StringIO()
+        audit(iter(p + '\n' for p in self.passwords), out, output_format='csv', processes=1,
+              dictionaries='app/resources/test/dictionaries')
+
+        got = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual(self.passwords, [r['password'] for r in got])
+        self.assertEqual('True', got[0]['existsInDictionary'])
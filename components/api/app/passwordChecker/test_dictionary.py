@@ -1,5 +1,7 @@
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 
+from passwordChecker import loader
 from passwordChecker.dictionary import DictionaryChecker
 from passwordChecker.substitute import CharacterProjector, ScramblingParams
 
@@ -29,6 +31,40 @@ class DictionaryTest(TestCase):
         self.assertTrue('chien' in got_one.words)
         self.assertTrue('fiap' in got_two.words)
 
+    def test_load_all_dictionaries_compressed_in_parallel(self):
+        import gzip
+        import lzma
+        import shutil
+
+        with TemporaryDirectory() as tmp_dir:
+            for name, compressed_open, extension in [('one', gzip.open, 'gz'), ('two', lzma.open, 'xz')]:
+                with open(f'app/resources/test/dictionaries/{name}.txt', 'rb') as f, \
+                        compressed_open(f'{tmp_dir}/{name}.txt.{extension}', 'wb') as g:
+                    shutil.copyfileobj(f, g)
+
+            for merged in [False, True]:
+                for processes in [1, 2]:
+                    dico_checker = DictionaryChecker(CharacterProjector(), merged=merged)
+                    dico_checker.load_all_dictionaries(tmp_dir, processes=processes)
+                    self.assertEqual([f'{tmp_dir}/one.txt.gz'], dico_checker.matching_dictionaries('chien'))
+                    self.assertEqual([f'{tmp_dir}/two.txt.xz'], dico_checker.matching_dictionaries('flap'))
+                    self.assertEqual(6, sum(1 for d in dico_checker.dictionaries for _ in d))
+
+    def test_read_all_words(self):
+        import shutil
+
+        with TemporaryDirectory() as tmp_dir:
+            filenames = []
+            for i in range(5):
+                filenames.append(f'{tmp_dir}/{i}.txt')
+                shutil.copy('app/resources/test/dictionaries/one.txt', filenames[-1])
+
+            for processes in [1, 2]:
+                read = list(loader.read_all_words(filenames, CharacterProjector(), processes))
+                self.assertEqual(filenames, [filename for filename, _ in read])
+                for _, words in read:
+                    self.assertEqual({'paf', 'ie', 'chien'}, words)
+
     def test_load_all_dictionaries_with_trailing(self):
         dico_checker = DictionaryChecker(CharacterProjector(scrambling_params=ScramblingParams(max_trailing=4)))
         dico_checker.load_all_dictionaries('app/resources/test/dictionaries')
@@ -39,3 +75,171 @@ class DictionaryTest(TestCase):
         self.assertTrue(dico_checker.contains('flap42'))
         self.assertTrue(dico_checker.contains('flap42!'))
         self.assertFalse(dico_checker.contains('flap42!4545'))
+
+    def test_contains_matches_potential_indexes(self):
+        projector = CharacterProjector(scrambling_params=ScramblingParams(max_trailing=4))
+        dico_checker = DictionaryChecker(projector)
+        dico_checker.load_all_dictionaries('app/resources/test/dictionaries')
+
+        for password in ['ch1en', 'CHIEN', 'f|@p42', 'g1r@f3!', 'chien9', 'girafe99999', 'paf', 'pafpaf', '9q9q9q']:
+            expected = any(d.contains_exact(w) for w in projector.potential_indexes(password)
+                           for d in dico_checker.dictionaries)
+            self.assertEqual(expected, dico_checker.contains(password), password)
+
+    def test_load_all_dictionaries_merged(self):
+        projector = CharacterProjector(scrambling_params=ScramblingParams(max_trailing=4))
+        separated = DictionaryChecker(projector)
+        separated.load_all_dictionaries('app/resources/test/dictionaries')
+        merged = DictionaryChecker(projector, merged=True)
+        merged.load_all_dictionaries('app/resources/test/dictionaries')
+
+        self.assertEqual(1, len(merged.dictionaries))
+        for password in ['chien', 'flap42!', 'frout', 'flap42!4545', 'g1r@f3', ' LA']:
+            self.assertEqual(separated.contains(password), merged.contains(password), password)
+            self.assertEqual(separated.matching_dictionaries(password), merged.matching_dictionaries(password),
+                             password)
+        self.assertEqual(['app/resources/test/dictionaries/two.txt'], merged.matching_dictionaries('F1@p'))
+
+    def test_load_all_dictionaries_compact(self):
+        projector = CharacterProjector(scrambling_params=ScramblingParams(max_trailing=4, min_embedded_length=3))
+        plain = DictionaryChecker(projector)
+        plain.load_all_dictionaries('app/resources/test/dictionaries')
+        compact = DictionaryChecker(projector, compact=True)
+        compact.load_all_dictionaries('app/resources/test/dictionaries')
+        plain.build_word_automaton()
+        compact.build_word_automaton()
+
+        self.assertEqual({d.name: sorted(d) for d in plain.dictionaries},
+                         {d.name: sorted(d) for d in compact.dictionaries})
+        for password in ['chien', 'flap42!', 'frout', 'flap42!4545', 'g1r@f3', ' LA', 'xxgirafe12yy']:
+            self.assertEqual(sorted(plain.matching_dictionaries(password)),
+                             sorted(compact.matching_dictionaries(password)), password)
+            self.assertEqual(repr(plain.embedded_words(password)), repr(compact.embedded_words(password)), password)
+        with self.assertRaises(AttributeError):
+            compact.dictionaries[0].words = set()
+
+    def test_prefilter(self):
+        dico_checker = DictionaryChecker(CharacterProjector(scrambling_params=ScramblingParams(max_trailing=4)),
+                                         merged=True)
+        dico_checker.load_all_dictionaries('app/resources/test/dictionaries')
+        prefilter = dico_checker.build_prefilter(error_rate=0.001)
+
+        self.assertEqual(6, prefilter.count)
+        self.assertTrue(dico_checker.contains('chien'))
+        self.assertTrue(dico_checker.contains('flap42!'))
+        self.assertFalse(dico_checker.contains('frout'))
+        self.assertFalse(dico_checker.contains('flap42!4545'))
+        self.assertGreater(prefilter.misses, 0)
+        self.assertGreater(prefilter.hits, 0)
+
+        with TemporaryDirectory() as tmp_dir:
+            prefilter.save(f'{tmp_dir}/words.bloom')
+            dico_checker.load_prefilter(f'{tmp_dir}/words.bloom')
+        self.assertEqual(prefilter.bits, dico_checker.prefilter.bits)
+        self.assertEqual(prefilter.hash_count, dico_checker.prefilter.hash_count)
+        self.assertTrue(dico_checker.contains('girafe'))
+
+    def test_fuzzy_match(self):
+        dico_checker = DictionaryChecker(
+            CharacterProjector(scrambling_params=ScramblingParams(max_trailing=4, max_edit_distance=1)), merged=True)
+        dico_checker.load_all_dictionaries('app/resources/test/dictionaries')
+        self.assertIsNone(dico_checker.fuzzy_match('chiien'))
+        dico_checker.build_fuzzy_index()
+
+        match = dico_checker.fuzzy_match('Chiien42')
+        self.assertEqual(('chien', 1, ['app/resources/test/dictionaries/one.txt']),
+                         (match.word, match.distance, match.dictionaries))
+        self.assertEqual('girafe', dico_checker.fuzzy_match('g1rafle').word)
+        # too far, or too short to tell a typo from another word
+        self.assertIsNone(dico_checker.fuzzy_match('chat'))
+        self.assertIsNone(dico_checker.fuzzy_match('pif'))
+
+        # the index follows the dictionaries
+        dico_checker.remove_dictionary('app/resources/test/dictionaries/one.txt')
+        self.assertIsNone(dico_checker.fuzzy_match('chiien'))
+        dico_checker.add_dictionary('app/resources/test/dictionaries/one.txt')
+        self.assertEqual('chien', dico_checker.fuzzy_match('chiien').word)
+
+    def test_embedded_words(self):
+        dico_checker = DictionaryChecker(
+            CharacterProjector(scrambling_params=ScramblingParams(max_trailing=4, min_embedded_length=4)), merged=True)
+        dico_checker.load_all_dictionaries('app/resources/test/dictionaries')
+        self.assertEqual([], dico_checker.embedded_words('xxchien2020yy'))
+        dico_checker.build_word_automaton()
+
+        found = dico_checker.embedded_words('xxCh1en2020fl@pyy')
+        self.assertEqual([('chien', 2, 7, ['app/resources/test/dictionaries/one.txt']),
+                          ('fiap', 11, 15, ['app/resources/test/dictionaries/two.txt'])],
+                         [(w.word, w.start, w.end, w.dictionaries) for w in found])
+        # too short to tell
+        self.assertEqual([], dico_checker.embedded_words('monpafdog'))
+
+        dico_checker.remove_dictionary('app/resources/test/dictionaries/one.txt')
+        self.assertEqual(['fiap'], [w.word for w in dico_checker.embedded_words('xxchienflap')])
+        dico_checker.add_dictionary('app/resources/test/dictionaries/one.txt')
+        self.assertEqual(['chien', 'fiap'], [w.word for w in dico_checker.embedded_words('xxchienflap')])
+
+    def test_add_and_remove_dictionary(self):
+        for merged in [False, True]:
+            dico_checker = DictionaryChecker(CharacterProjector(scrambling_params=ScramblingParams(max_trailing=4)),
+                                             merged=merged)
+            dico_checker.add_dictionary('app/resources/test/dictionaries/one.txt')
+            before = dico_checker.dictionaries
+            generation = dico_checker.generation
+
+            dico_checker.add_dictionary('app/resources/test/dictionaries/two.txt')
+            self.assertEqual(['app/resources/test/dictionaries/two.txt'], dico_checker.matching_dictionaries('ia'))
+            self.assertEqual(['app/resources/test/dictionaries/one.txt'], dico_checker.matching_dictionaries('ie'))
+            self.assertGreater(dico_checker.generation, generation)
+            # the previous list, still walked by the checks in flight, is left as it was
+            self.assertFalse(any(d.contains_exact('fiap') for d in before))
+
+            dico_checker.add_dictionary('app/resources/test/dictionaries/two.txt')
+            self.assertEqual(['app/resources/test/dictionaries/two.txt'], dico_checker.matching_dictionaries('f1ap'))
+
+            dico_checker.remove_dictionary('app/resources/test/dictionaries/one.txt')
+            self.assertFalse(dico_checker.contains('chien'))
+            self.assertEqual(['app/resources/test/dictionaries/two.txt'], dico_checker.matching_dictionaries('ia'))
+            with self.assertRaises(ValueError):
+                dico_checker.remove_dictionary('app/resources/test/dictionaries/one.txt')
+
+    def test_replace_dictionary(self):
+        dico_checker = DictionaryChecker(
+            CharacterProjector(scrambling_params=ScramblingParams(max_trailing=4, max_edit_distance=1)))
+        with TemporaryDirectory() as tmp_dir:
+            filename = f'{tmp_dir}/animals.txt'
+            with open(filename, 'w') as f:
+                f.write('chien\n')
+            dico_checker.add_dictionary(filename)
+            prefilter, fuzzy_index = dico_checker.build_prefilter(), dico_checker.build_fuzzy_index()
+            generation = dico_checker.generation
+
+            with open(filename, 'w') as f:
+                f.write('girafe\n')
+            dico_checker.add_dictionary(filename)
+
+        self.assertGreater(dico_checker.generation, generation)
+        # the replaced words are no longer matched
+        self.assertIsNone(dico_checker.fuzzy_match('chiien'))
+        self.assertEqual('girafe', dico_checker.fuzzy_match('giirafe').word)
+        self.assertTrue(dico_checker.contains('girafe'))
+        # the published prefilter and fuzzy index, still read by the checks in flight, are left as they were
+        self.assertEqual(1, prefilter.count)
+        self.assertNotIn('girafe', prefilter)
+        self.assertEqual('chien', fuzzy_index.nearest('chiien').word)
+
+    def test_swap(self):
+        projector = CharacterProjector(scrambling_params=ScramblingParams(max_trailing=4))
+        dico_checker = DictionaryChecker(projector)
+        dico_checker.load_all_dictionaries('app/resources/test/dictionaries')
+        dico_checker.build_prefilter()
+        reloaded = DictionaryChecker(projector)
+        reloaded.dictionaries = [reloaded.load_dictionary('app/resources/test/dictionaries/two.txt')]
+
+        generation = dico_checker.generation
+        dico_checker.swap(reloaded)
+
+        self.assertGreater(dico_checker.generation, generation)
+        self.assertIsNone(dico_checker.prefilter)
+        self.assertFalse(dico_checker.contains('chien'))
+        self.assertTrue(dico_checker.contains('flap'))
@@ -0,0 +1,23 @@
+from unittest import TestCase
+
+from passwordChecker.dictionary import DictionaryChecker
+from passwordChecker.estimator import MAX_ANALYZED_LENGTH, estimate_guesses
+from passwordChecker.substitute import CharacterProjector, ScramblingParams
+
+
+class EstimatorTest(TestCase):
+    def test_dictionary_patterns(self):
+        dico_checker = DictionaryChecker(CharacterProjector(scrambling_params=ScramblingParams(max_trailing=4)))
+        dico_checker.load_all_dictionaries('app/resources/test/dictionaries')
+        without_words = estimate_guesses('G1rafe2020!', dico_checker)
+        dico_checker.build_word_automaton()
+
+        estimate = estimate_guesses('G1rafe2020!', dico_checker)
+        self.assertEqual(['dictionary', 'year', 'bruteforce'], [p.kind for p in estimate.patterns])
+        self.assertEqual([(0, 6), (6, 10), (10, 11)], [(p.start, p.end) for p in estimate.patterns])
+        self.assertLess(estimate.guesses, without_words.guesses)
+        self.assertLess(estimate.crack_time_ms, without_words.crack_time_ms)
+
+    def test_long_password(self):
+        estimate = estimate_guesses('x' * 10 * MAX_ANALYZED_LENGTH)
+        self.assertEqual([('repeat', 0, MAX_ANALYZED_LENGTH)], [(p.kind, p.start, p.end) for p in estimate.patterns])
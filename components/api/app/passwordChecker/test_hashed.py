@@ -0,0 +1,115 @@
+from array import array
+import os
+import struct
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from passwordChecker.dictionary import DictionaryChecker
+from passwordChecker.hashed import build_hashed_dictionary, HashedDictionary, word_hash
+from passwordChecker.robustness import compute_robustness
+from passwordChecker.substitute import CharacterProjector, ScramblingParams
+
+
+class HashedDictionaryTest(TestCase):
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.filename = os.path.join(self.tmp_dir.name, 'test.hdx')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_build_with_several_runs(self):
+        words = [f'word{i}' for i in range(1000)] + ['chien', 'CHIEN', 'ch1en']
+        count = build_hashed_dictionary(iter(words), self.filename, CharacterProjector(), chunk_size=100)
+        # trailing numbers are cleaned, and the chien variants project to the same word
+        self.assertEqual(2, count)
+
+        words = [f'{a}{b}{c}' for a in 'abcdefghjk' for b in 'abcdefghjk' for c in 'mnprstuwxy'] + ['chien']
+        count = build_hashed_dictionary(iter(words), self.filename, CharacterProjector(), chunk_size=100)
+        self.assertEqual(1001, count)
+
+        dictionary = HashedDictionary(self.filename)
+        self.assertEqual(1001, len(dictionary))
+        for word in words:
+            self.assertTrue(dictionary.contains_exact(CharacterProjector().index_password(word)[0]), word)
+        self.assertFalse(dictionary.contains_exact('girafe'))
+        self.assertFalse(dictionary.contains_exact('zzz'))
+        dictionary.close()
+
+    def test_empty(self):
+        build_hashed_dictionary(iter([]), self.filename, CharacterProjector())
+        dictionary = HashedDictionary(self.filename)
+
+        self.assertEqual(0, len(dictionary))
+        self.assertFalse(dictionary.contains_exact('chien'))
+        dictionary.close()
+
+    def test_checker_with_hashed_dictionary(self):
+        projector = CharacterProjector(scrambling_params=ScramblingParams(max_trailing=4))
+        with open('app/resources/test/dictionaries/one.txt') as f:
+            build_hashed_dictionary(f, self.filename, projector)
+        dico_checker = DictionaryChecker(projector)
+        dico_checker.load_hashed_dictionary(self.filename)
+
+        self.assertTrue(dico_checker.contains('chien'))
+        self.assertTrue(dico_checker.contains('CH1EN42'))
+        self.assertFalse(dico_checker.contains('flap'))
+        self.assertEqual([self.filename], dico_checker.matching_dictionaries('paf!'))
+        dico_checker.dictionaries[0].close()
+
+    def test_walk_pruned_by_prefixes(self):
+        build_hashed_dictionary(iter(['gggg', 'paf']), self.filename, CharacterProjector())
+        dictionary = HashedDictionary(self.filename)
+
+        # 2 ** 20 candidates, but only the 'g' ones are extended, up to 'gggg'
+        steps = [0]
+
+        class CountingBudget:
+            def spend(self):
+                steps[0] += 1
+                return True
+
+        words = list(dictionary.walk(CharacterProjector().project_chars('9' * 20), range(1, 21), CountingBudget()))
+        self.assertEqual(['gggg'], words)
+        self.assertEqual(8, steps[0])
+        dictionary.close()
+
+    def test_first_format(self):
+        with open(self.filename, 'wb') as f:
+            f.write(struct.pack('<8sQ', b'PWCHSH01', 1))
+            array('Q', [word_hash('gggg')]).tofile(f)
+        dictionary = HashedDictionary(self.filename)
+
+        self.assertEqual(1, len(dictionary))
+        self.assertEqual(['gggg'], list(dictionary.walk(CharacterProjector().project_chars('9999'), range(1, 5))))
+        dictionary.close()
+
+    def test_without_prefixes(self):
+        build_hashed_dictionary(iter(['gggg', 'paf']), self.filename, CharacterProjector())
+        with_prefixes = os.path.getsize(self.filename)
+        build_hashed_dictionary(iter(['gggg', 'paf']), self.filename, CharacterProjector(), prefixes=False)
+        dictionary = HashedDictionary(self.filename)
+
+        self.assertLess(os.path.getsize(self.filename), with_prefixes)
+        self.assertEqual(['gggg'], list(dictionary.walk(CharacterProjector().project_chars('9999'), range(1, 5))))
+        self.assertTrue(dictionary.contains_exact('paf'))
+        dictionary.close()
+
+    def test_work_budget(self):
+        build_hashed_dictionary(iter(['gggg', 'paf']), self.filename, CharacterProjector())
+        dico_checker = DictionaryChecker(CharacterProjector(), max_work=100)
+        dico_checker.load_hashed_dictionary(self.filename)
+
+        robustness = compute_robustness('9' * 20, dico_checker)
+        self.assertFalse(robustness.exists_in_dictionary)
+        self.assertFalse(robustness.budget_exceeded)
+
+        robustness = compute_robustness('9999', dico_checker)
+        self.assertTrue(robustness.exists_in_dictionary)
+        self.assertFalse(robustness.budget_exceeded)
+
+        dico_checker.max_work = 3
+        robustness = compute_robustness('9999', dico_checker)
+        self.assertFalse(robustness.exists_in_dictionary)
+        self.assertTrue(robustness.budget_exceeded)
+        dico_checker.dictionaries[0].close()
@@ -0,0 +1,63 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from passwordChecker.dictionary import DictionaryChecker, PasswordDictionary
+from passwordChecker.index import compile_index, MappedIndex
+from passwordChecker.substitute import CharacterProjector, ScramblingParams
+
+
+class IndexTest(TestCase):
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.filename = os.path.join(self.tmp_dir.name, 'test.idx')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_compile_and_load(self):
+        count = compile_index([PasswordDictionary('one', ['paf', 'ie', 'chien']),
+                               PasswordDictionary('two', ['fiap', 'ia', 'chien', 'éié'])], self.filename)
+        self.assertEqual(6, count)
+
+        index = MappedIndex(self.filename)
+        self.assertEqual(6, len(index))
+        self.assertEqual(['one', 'two'], index.dictionary_names)
+        self.assertTrue(index.contains_exact('chien'))
+        self.assertTrue(index.contains_exact('éié'))
+        self.assertFalse(index.contains_exact('chie'))
+        self.assertFalse(index.contains_exact('zzz'))
+        self.assertEqual(['one', 'two'], index.sources('chien'))
+        self.assertEqual(['two'], index.sources('ia'))
+        self.assertEqual([], index.sources('girafe'))
+        index.close()
+
+    def test_walk(self):
+        compile_index([PasswordDictionary('one', ['pag', 'paqg', 'fiap'])], self.filename)
+        index = MappedIndex(self.filename)
+
+        self.assertEqual(['pag', 'paqg'], list(index.walk([['p'], ['a'], ['g', 'q'], ['g', 'q']], range(3, 5))))
+        self.assertEqual([], list(index.walk([['p'], ['i']], range(2, 3))))
+        index.close()
+
+    def test_empty_index(self):
+        compile_index([], self.filename)
+        index = MappedIndex(self.filename)
+
+        self.assertEqual(0, len(index))
+        self.assertFalse(index.contains_exact('paf'))
+        self.assertEqual([], list(index.walk([], range(0, 1))))
+        index.close()
+
+    def test_checker_with_index(self):
+        projector = CharacterProjector(scrambling_params=ScramblingParams(max_trailing=4))
+        text_checker = DictionaryChecker(projector)
+        text_checker.load_all_dictionaries('app/resources/test/dictionaries')
+        compile_index(text_checker.dictionaries, self.filename)
+
+        index_checker = DictionaryChecker(projector)
+        index_checker.load_index(self.filename)
+
+        for password in ['chien', 'CH1EN', 'flap42!', 'flap42!4545', 'frout', 'g1r@f3', '9q9q9q']:
+            self.assertEqual(text_checker.contains(password), index_checker.contains(password), password)
+        index_checker.dictionaries[0].close()
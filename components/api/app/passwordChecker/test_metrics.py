@@ -0,0 +1,65 @@
+from unittest import TestCase
+
+from passwordChecker.budget import WorkBudget
+from passwordChecker.dictionary import DictionaryChecker
+from passwordChecker.metrics import MetricsRegistry, instrument, uninstrument
+from passwordChecker.robustness import compute_robustness
+from passwordChecker.substitute import CharacterProjector, ScramblingParams
+
+
+class MetricsTest(TestCase):
+    def tearDown(self):
+        uninstrument()
+
+    def test_instrument(self):
+        contains = DictionaryChecker.contains
+        dico_checker = DictionaryChecker(CharacterProjector(scrambling_params=ScramblingParams(max_trailing=4)),
+                                         merged=True)
+        dico_checker.load_all_dictionaries('app/resources/test/dictionaries')
+        registry = MetricsRegistry()
+        instrument(registry)
+        with self.assertRaises(ValueError):
+            instrument(registry)
+
+        for password in ['chien', 'ch1en42', 'frout']:
+            compute_robustness(password, dico_checker)
+        dico_checker.contains('flap')
+        rendered = registry.render()
+
+        self.assertIn('password_checker_function_duration_seconds_count{function="matching_dictionaries"} 3',
+                      rendered)
+        self.assertIn('password_checker_function_duration_seconds_count{function="compute_brute_force_ms"} 3',
+                      rendered)
+        # the projection of the three checks and of the contains
+        self.assertIn('password_checker_function_duration_seconds_count{function="truncation_lengths"} 4', rendered)
+        self.assertIn('password_checker_function_duration_seconds_count{function="project_chars"} 4', rendered)
+        self.assertIn('password_checker_dictionary_checks_total{function="matching_dictionaries"} 3', rendered)
+        self.assertIn('password_checker_dictionary_found_total{function="matching_dictionaries"} 2', rendered)
+        self.assertIn('password_checker_dictionary_found_total{function="contains"} 1', rendered)
+        self.assertIn('password_checker_dictionary_hits_total{dictionary="app/resources/test/dictionaries/one.txt"} 2',
+                      rendered)
+        self.assertIn('password_checker_candidates_count{function="contains"} 1', rendered)
+
+        uninstrument()
+        self.assertIs(contains, DictionaryChecker.contains)
+
+    def test_shared_budget(self):
+        dico_checker = DictionaryChecker(CharacterProjector(scrambling_params=ScramblingParams(max_trailing=4)),
+                                         merged=True)
+        dico_checker.load_all_dictionaries('app/resources/test/dictionaries')
+        registry = MetricsRegistry()
+        instrument(registry)
+
+        budget = WorkBudget(1000)
+        dico_checker.contains('chien', budget)
+        spent = budget.max_steps - budget.remaining
+        dico_checker.matching_dictionaries('chien', budget)
+        exhausted = WorkBudget(1)
+        for _ in range(3):
+            dico_checker.contains('ch1en42', exhausted)
+        rendered = registry.render()
+
+        # each search counts its own steps only, and the exhaustion once, by the search it happened in
+        self.assertGreater(spent, 0)
+        self.assertIn(f'password_checker_candidates_sum{{function="matching_dictionaries"}} {spent}', rendered)
+        self.assertIn('password_checker_budget_exceeded_total 1', rendered)
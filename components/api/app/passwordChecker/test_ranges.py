@@ -0,0 +1,41 @@
+import json
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from passwordChecker.dictionary import DictionaryChecker
+from passwordChecker.ranges import build_ranges, lookup_password
+from passwordChecker.substitute import CharacterProjector, ScramblingParams
+
+
+class RangesTest(TestCase):
+    def test_lookup_password_same_as_dictionary_checker(self):
+        dico_checker = DictionaryChecker(CharacterProjector(scrambling_params=ScramblingParams(max_trailing=4)))
+        dico_checker.load_all_dictionaries('app/resources/test/dictionaries')
+
+        with TemporaryDirectory() as tmp_dir:
+            count = build_ranges(dico_checker.dictionaries, dico_checker.character_projector, tmp_dir,
+                                 prefix_length=2)
+            self.assertEqual(6, count)
+            self.assertEqual(256, len(os.listdir(f'{tmp_dir}/range')))
+            with open(f'{tmp_dir}/projection.json') as f:
+                manifest = json.load(f)
+            self.assertEqual(2, manifest['prefixLength'])
+            self.assertEqual(4, manifest['maxTrailing'])
+
+            # a client rebuilds its projector from the manifest
+            client_projector = CharacterProjector(manifest['substitutions'],
+                                                  ScramblingParams(max_trailing=manifest['maxTrailing']))
+            fetched = []
+
+            def fetch_range(prefix):
+                fetched.append(prefix)
+                with open(f'{tmp_dir}/range/{prefix}') as f:
+                    return f.read()
+
+            for password in ['chien', 'Ch1en42!', 'flap', 'f|@p', 'g1r@f3', 'frout', 'paf', ' LA']:
+                self.assertEqual(dico_checker.matching_dictionaries(password),
+                                 lookup_password(password, client_projector, fetch_range, manifest['prefixLength'],
+                                                 manifest['dictionaries']),
+                                 password)
+            self.assertTrue(all(len(prefix) == 2 for prefix in fetched))
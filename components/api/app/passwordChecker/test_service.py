@@ -0,0 +1,117 @@
+import os
+import shutil
+from tempfile import TemporaryDirectory
+import time
+from unittest import TestCase
+
+from passwordChecker.dictionary import CompactDictionary
+from passwordChecker.service import create_dictionary_checker, DictionaryChanges, DictionaryReloader
+
+
+class DictionaryReloaderTest(TestCase):
+    def test_check_files(self):
+        with TemporaryDirectory() as resources:
+            os.mkdir(f'{resources}/dictionaries')
+            shutil.copy('app/resources/test/dictionaries/one.txt', f'{resources}/dictionaries')
+            dico_checker = create_dictionary_checker(resources)
+            reloader = DictionaryReloader(dico_checker, resources)
+            self.assertFalse(reloader.check_files())
+
+            shutil.copy('app/resources/test/dictionaries/two.txt', f'{resources}/dictionaries')
+            self.assertTrue(reloader.check_files())
+            self.assertTrue(dico_checker.contains('flap'))
+
+            os.remove(f'{resources}/dictionaries/one.txt')
+            self.assertTrue(reloader.check_files())
+            self.assertFalse(dico_checker.contains('chien'))
+            self.assertEqual(2, reloader.reloads)
+            self.assertIsNone(reloader.last_error)
+
+    def test_compact(self):
+        with TemporaryDirectory() as resources:
+            os.mkdir(f'{resources}/dictionaries')
+            shutil.copy('app/resources/test/dictionaries/one.txt', f'{resources}/dictionaries')
+            dico_checker = create_dictionary_checker(resources, compact=True)
+
+            self.assertEqual([CompactDictionary], [type(d) for d in dico_checker.dictionaries])
+            self.assertTrue(dico_checker.contains('chien'))
+
+            shutil.copy('app/resources/test/dictionaries/two.txt', f'{resources}/dictionaries')
+            reloader = DictionaryReloader(dico_checker, resources)
+            reloader.reload()
+            self.assertTrue(reloader.apply_changes())
+            self.assertEqual([CompactDictionary] * 2, [type(d) for d in dico_checker.dictionaries])
+
+    def test_reload(self):
+        with TemporaryDirectory() as resources:
+            os.mkdir(f'{resources}/dictionaries')
+            shutil.copy('app/resources/test/dictionaries/one.txt', f'{resources}/dictionaries')
+            dico_checker = create_dictionary_checker(resources)
+            session_generation = dico_checker.generation
+
+            shutil.copy('app/resources/test/dictionaries/two.txt', f'{resources}/dictionaries')
+            reloader = DictionaryReloader(dico_checker, resources)
+            reloader.reload()
+            # only requested: the dictionaries are changed when the changes are applied
+            self.assertEqual(session_generation, dico_checker.generation)
+            self.assertTrue(reloader.apply_changes())
+
+            self.assertGreater(dico_checker.generation, session_generation)
+            self.assertEqual([f'{resources}/dictionaries/two.txt'], dico_checker.matching_dictionaries('flap'))
+            self.assertTrue(dico_checker.contains('chien'))
+            self.assertEqual(1, reloader.reloads)
+
+    def test_published_changes(self):
+        with TemporaryDirectory() as resources:
+            os.mkdir(f'{resources}/dictionaries')
+            shutil.copy('app/resources/test/dictionaries/one.txt', f'{resources}/dictionaries')
+            # two workers sharing the published changes
+            changes = DictionaryChanges()
+            checkers = [create_dictionary_checker(resources) for _ in range(2)]
+            reloaders = [DictionaryReloader(dico_checker, resources, changes) for dico_checker in checkers]
+
+            shutil.copy('app/resources/test/dictionaries/two.txt', f'{resources}/dictionaries')
+            self.assertEqual(1, reloaders[0].add_dictionary('two.txt'))
+            self.assertRaises(FileNotFoundError, reloaders[0].add_dictionary, 'three.txt')
+            self.assertFalse(checkers[0].contains('flap'))
+            for dico_checker, reloader in zip(checkers, reloaders):
+                self.assertTrue(reloader.apply_changes())
+                self.assertTrue(dico_checker.contains('flap'))
+                self.assertFalse(reloader.apply_changes())
+
+            reloaders[1].remove_dictionary('one.txt')
+            self.assertRaises(ValueError, reloaders[1].remove_dictionary, 'four.txt')
+            self.assertTrue(reloaders[0].apply_changes())
+            self.assertFalse(checkers[0].contains('chien'))
+
+            # the changes before a reload are skipped
+            reloaders[1].add_dictionary('one.txt')
+            self.assertEqual(4, reloaders[0].reload())
+            reloads = reloaders[1].reloads
+            for dico_checker, reloader in zip(checkers, reloaders):
+                self.assertTrue(reloader.apply_changes())
+                self.assertTrue(dico_checker.contains('chien'))
+                self.assertEqual(4, reloader.applied)
+            self.assertEqual(reloads + 1, reloaders[1].reloads)
+            self.assertIsNone(reloaders[1].last_error)
+
+    def test_start(self):
+        with TemporaryDirectory() as resources:
+            os.mkdir(f'{resources}/dictionaries')
+            shutil.copy('app/resources/test/dictionaries/one.txt', f'{resources}/dictionaries')
+            dico_checker = create_dictionary_checker(resources)
+            reloader = DictionaryReloader(dico_checker, resources, watch_seconds=0.1)
+            reloader.start()
+            reloader.start()
+
+            # applied by the thread, then found in the resources directory by the thread
+            shutil.copy('app/resources/test/dictionaries/two.txt', f'{resources}/dictionaries')
+            change = reloader.reload()
+            os.remove(f'{resources}/dictionaries/one.txt')
+            deadline = time.monotonic() + 10
+            while (reloader.applied < change or dico_checker.contains('chien')) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(change, reloader.applied)
+            self.assertTrue(dico_checker.contains('flap'))
+            self.assertFalse(dico_checker.contains('chien'))
+            self.assertIsNone(reloader.last_error)
@@ -0,0 +1,104 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from passwordChecker.dictionary import DictionaryChecker
+from passwordChecker.estimator import MAX_ANALYZED_LENGTH
+from passwordChecker.hashed import build_hashed_dictionary
+from passwordChecker.index import compile_index
+from passwordChecker.robustness import compute_robustness
+from passwordChecker.session import RobustnessSession, SessionStore
+from passwordChecker.substitute import CharacterProjector, ScramblingParams
+
+
+class RobustnessSessionTest(TestCase):
+    typed = ['c', 'ch', 'ch1', 'ch1e', 'ch1en', 'ch1en4', 'ch1en42', 'ch1en42!', 'ch1en42!9', 'ch1en42!', 'ch',
+             'f', 'f|', 'f|@', 'f|@p', 'f|@p!', 'g1r@f3', '', '1234', '12345', 'p@F', 'p@F le', 'p@F']
+
+    def assert_same_as_compute_robustness(self, dico_checker, typed: list = None):
+        session = RobustnessSession(dico_checker)
+        for password in typed or self.typed:
+            expected = compute_robustness(password, dico_checker).serialize()
+            # a session updates its metrics incrementally, not through the stages of a pipeline
+            self.assertEqual([s['name'] for s in expected.pop('stages')],
+                             ['length', 'bruteForce', 'dictionary', 'fuzzy', 'embedded', 'estimate'])
+            got = session.check(password).serialize()
+            self.assertEqual([], got.pop('stages'))
+            self.assertEqual(expected, got, password)
+            self.assertEqual(password, session.password)
+
+    def test_separated_dictionaries(self):
+        dico_checker = DictionaryChecker(CharacterProjector(scrambling_params=ScramblingParams(max_trailing=2)))
+        dico_checker.load_all_dictionaries('app/resources/test/dictionaries')
+        self.assert_same_as_compute_robustness(dico_checker)
+
+    def test_merged_dictionaries(self):
+        dico_checker = DictionaryChecker(CharacterProjector(scrambling_params=ScramblingParams(max_trailing=4)),
+                                         merged=True)
+        dico_checker.load_all_dictionaries('app/resources/test/dictionaries')
+        dico_checker.dictionaries = [d.with_dictionary('digits', ['', 'iz']) for d in dico_checker.dictionaries]
+        self.assert_same_as_compute_robustness(dico_checker)
+
+    def test_word_automaton(self):
+        dico_checker = DictionaryChecker(CharacterProjector(scrambling_params=ScramblingParams(max_trailing=4)))
+        dico_checker.load_all_dictionaries('app/resources/test/dictionaries')
+        dico_checker.build_word_automaton()
+        # the estimate only analyzes the first characters, whatever their types beyond
+        long_password = 'g1rafe' * (MAX_ANALYZED_LENGTH // 6 + 1)
+        self.assert_same_as_compute_robustness(dico_checker, self.typed + [long_password, long_password + 'A!',
+                                                                           long_password, 'G1rafe2020'])
+
+    def test_index_and_hashed_dictionaries(self):
+        projector = CharacterProjector(scrambling_params=ScramblingParams(max_trailing=4))
+        text_checker = DictionaryChecker(projector)
+        text_checker.load_all_dictionaries('app/resources/test/dictionaries')
+        with TemporaryDirectory() as tmp_dir:
+            compile_index(text_checker.dictionaries[:1], os.path.join(tmp_dir, 'test.idx'))
+            with open('app/resources/test/dictionaries/two.txt') as f:
+                build_hashed_dictionary(f, os.path.join(tmp_dir, 'test.hdx'), projector)
+
+            dico_checker = DictionaryChecker(projector)
+            dico_checker.load_index(os.path.join(tmp_dir, 'test.idx'))
+            dico_checker.load_hashed_dictionary(os.path.join(tmp_dir, 'test.hdx'))
+            self.assert_same_as_compute_robustness(dico_checker)
+            for dictionary in dico_checker.dictionaries:
+                dictionary.close()
+
+    def test_reload(self):
+        dico_checker = DictionaryChecker(CharacterProjector())
+        session = RobustnessSession(dico_checker)
+        self.assertFalse(session.check('chien').exists_in_dictionary)
+
+        dico_checker.load_all_dictionaries('app/resources/test/dictionaries')
+        self.assertTrue(session.check('chien').exists_in_dictionary)
+
+    def test_work_budget(self):
+        dico_checker = DictionaryChecker(CharacterProjector(scrambling_params=ScramblingParams(max_trailing=2)),
+                                         max_work=3)
+        dico_checker.load_all_dictionaries('app/resources/test/dictionaries')
+        session = RobustnessSession(dico_checker)
+
+        self.assertTrue(session.check('ch1en').budget_exceeded)
+        # the incomplete frontier is kept, and still reported, by the next checks extending it
+        self.assertTrue(session.check('ch1en4').budget_exceeded)
+        self.assertFalse(session.check('ch').budget_exceeded)
+        self.assertFalse(session.check('chi').budget_exceeded)
+        dico_checker.max_work = None
+        self.assertEqual(compute_robustness('ch1en', dico_checker).serialize()['dictionaries'],
+                         session.check('ch1en').dictionaries)
+
+
+class SessionStoreTest(TestCase):
+    def test_get(self):
+        store = SessionStore(DictionaryChecker(CharacterProjector()), max_sessions=2)
+        id_1, session_1 = store.get()
+        self.assertEqual((id_1, session_1), store.get(id_1))
+
+        id_2, session_2 = store.get('unknown')
+        self.assertNotEqual(id_1, id_2)
+
+        store.get(id_1)
+        id_3, _ = store.get()
+        self.assertEqual(2, len(store))
+        # the least recently used one was dropped
+        self.assertNotEqual(id_2, store.get(id_2)[0])
@@ -0,0 +1,130 @@
+# A prefix tree over the indexed words, so a scrambled password can be searched by walking down the tree and
+# branching on each projection alternative, instead of generating every combination upfront.
+
+from passwordChecker.budget import WorkBudget
+
+_TERMINAL = ''
+
+
+class WordTrie:
+    """
+    Maps indexed words to a value, stored as a prefix tree.
+    Nodes are plain dictionaries (char -> child node), the value of a word being kept under the empty key
+
+    >>> trie = WordTrie(['paf', 'pif', 'pa'])
+    >>> len(trie)
+    3
+    >>> 'pa' in trie
+    True
+    >>> 'p' in trie
+    False
+    >>> trie.value(trie.child(trie.child(trie.root(), 'p'), 'a'))
+    True
+    """
+
+    def __init__(self, words=(), value=True):
+        """
+        :param words: the words to be added
+        :type words: iterable[str]
+        :param value: the value associated to each of the words [True]
+        """
+        self._root = {}
+        self._size = 0
+        for word in words:
+            self.add(word, value)
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, word: str):
+        node = self._root
+        for c in word:
+            node = node.get(c)
+            if node is None:
+                return False
+        return _TERMINAL in node
+
+    def add(self, word: str, value=True):
+        """
+        Add a word to the tree, or replace its value if it was already there
+        :param word: the indexed word
+        :type word: str
+        :param value: the value associated to the word [True]
+
+        >>> trie = WordTrie()
+        >>> trie.add('paf')
+        >>> trie.add('paf')
+        >>> len(trie)
+        1
+        """
+        node = self._root
+        for c in word:
+            child = node.get(c)
+            if child is None:
+                child = node[c] = {}
+            node = child
+        if _TERMINAL not in node:
+            self._size += 1
+        node[_TERMINAL] = value
+
+    def root(self):
+        return self._root
+
+    @staticmethod
+    def child(node, char: str):
+        """
+        :return: the child node reached with char, or None if no word goes this way
+        """
+        return node.get(char)
+
+    @staticmethod
+    def value(node):
+        """
+        :return: the value of the word ending on this node, or None if no word ends here
+        """
+        return node.get(_TERMINAL)
+
+
+def walk_projection(index, projected_chars: list, lengths: range, budget: WorkBudget = None):
+    """
+    Walk down an index, branching on every projection alternative, and yield the indexed words of accepted lengths.
+    Dead prefixes are pruned as soon as they are reached, so the cost is bounded by the paths present in the index,
+    not by the product of the alternatives.
+
+    :param index: a tree exposing root(), child(node, char) and value(node), such as WordTrie
+    :param projected_chars: for each position in the password, the list of projected characters
+    :type projected_chars: list[list[str]]
+    :param lengths: the accepted lengths for a word to match (see CharacterProjector.truncation_lengths)
+    :type lengths: range
+    :param budget: one step is spent per node visited, the walk stops when it is exhausted [None]
+    :type budget: WorkBudget
+    :return: a generator of the matching (word, value)
+    :rtype: generator
+
+    >>> trie = WordTrie(['pag', 'paqg', 'fiap'])
+    >>> list(walk_projection(trie, [['p'], ['a'], ['g', 'q'], ['g', 'q']], range(3, 5)))
+    [('pag', True), ('paqg', True)]
+    >>> list(walk_projection(trie, [['p'], ['a'], ['g', 'q'], ['g', 'q']], range(4, 5)))
+    [('paqg', True)]
+    >>> list(walk_projection(trie, [['p'], ['i']], range(2, 3)))
+    []
+    >>> list(walk_projection(trie, [['p'], ['a'], ['g', 'q'], ['g', 'q']], range(3, 5), WorkBudget(4)))
+    [('pag', True)]
+    """
+    max_length = lengths[-1]
+    stack = [(index.root(), '')]
+    while stack:
+        node, word = stack.pop()
+        if budget is not None and not budget.spend():
+            return
+        depth = len(word)
+        if depth in lengths:
+            value = index.value(node)
+            if value is not None:
+                yield word, value
+        if depth < max_length:
+            # reversed, so the alternatives are popped in their original order
+            for c in reversed(projected_chars[depth]):
+                child = index.child(node, c)
+                if child is not None:
+                    stack.append((child, word + c))
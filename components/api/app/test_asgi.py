@@ -0,0 +1,89 @@
+import asyncio
+import json
+from unittest import TestCase
+from unittest.mock import patch
+
+import asgi
+from passwordChecker.admission import SharedRateLimiter
+from passwordChecker.budget import DEFAULT_MAX_STEPS
+
+
+async def _request(path: str, body: dict, headers: list = ()):
+    received = [{'type': 'http.request', 'body': json.dumps(body).encode('utf-8')}]
+    sent = []
+
+    async def receive():
+        return received.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi.app({'type': 'http', 'method': 'POST', 'path': path, 'headers': list(headers),
+                    'client': ('10.0.0.1', 4242)}, receive, send)
+    start, response = sent
+    return start['status'], dict(start['headers']), json.loads(response['body'])
+
+
+def serve(*requests):
+    """
+    Run the app lifespan (starting and stopping the checking processes) around the requests
+    :return: the status, headers and body of each response
+    :rtype: list[tuple]
+    """
+    async def run():
+        lifespan = asyncio.Queue()
+        started = asyncio.Event()
+
+        async def send(message):
+            if message['type'] == 'lifespan.startup.complete':
+                started.set()
+
+        lifespan.put_nowait({'type': 'lifespan.startup'})
+        task = asyncio.create_task(asgi.app({'type': 'lifespan'}, lifespan.get, send))
+        await started.wait()
+        responses = [await _request(*request) for request in requests]
+        lifespan.put_nowait({'type': 'lifespan.shutdown'})
+        await task
+        return responses
+
+    return asyncio.run(run())
+
+
+class AsgiTest(TestCase):
+    def test_check(self):
+        (status, _, body), (batch_status, _, batch_body) = serve(('/api/check', {'password': 'chien'}),
+                                                                 ('/api/check/batch', {'passwords': ['chien', 'paf']}))
+
+        self.assertEqual(200, status)
+        self.assertTrue(body['existsInDictionary'])
+        self.assertEqual(200, batch_status)
+        self.assertEqual([True, False], [r['existsInDictionary'] for r in batch_body['results']])
+
+    def test_work_budget(self):
+        self.assertEqual(DEFAULT_MAX_STEPS, asgi.dico_checker.max_work)
+
+    def test_bad_request(self):
+        [(status, _, body)] = serve(('/api/check', {'passwords': ['chien']}))
+
+        self.assertEqual(400, status)
+
+    def test_too_long(self):
+        [(status, _, _)] = serve(('/api/check/batch', {'passwords': ['chien', 'a' * (asgi.max_password_length + 1)]}))
+
+        self.assertEqual(413, status)
+
+    def test_batch_too_large(self):
+        with patch.object(asgi, 'max_batch_size', 2):
+            [(status, _, body)] = serve(('/api/check/batch', {'passwords': ['chien', 'paf', 'girafe']}))
+
+        self.assertEqual(413, status)
+        self.assertIn('batch of 3 passwords', body['error'])
+
+    def test_rate_limited(self):
+        with patch.object(asgi, 'rate_limiter', SharedRateLimiter(rate=1, burst=1)):
+            (status, _, _), (limited_status, headers, _) = serve(('/api/check', {'password': 'chien'}),
+                                                                 ('/api/check', {'password': 'chien'}))
+
+        self.assertEqual(200, status)
+        self.assertEqual(429, limited_status)
+        self.assertEqual(b'1', headers[b'retry-after'])
@@ -0,0 +1,88 @@
+import json
+import sys
+from unittest import TestCase
+from unittest.mock import patch
+
+import main
+
+
+class BatchEndpointTest(TestCase):
+    def setUp(self):
+        self.client = main.app.test_client()
+
+    def test_json_batch(self):
+        response = self.client.post('/api/check/batch', json={'passwords': ['chien', 'paf', 'chien']})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([True, False, True], [r['existsInDictionary'] for r in response.get_json()['results']])
+
+    def test_json_batch_too_large(self):
+        with patch.object(main, 'max_batch_size', 2):
+            response = self.client.post('/api/check/batch', json={'passwords': ['chien', 'paf', 'girafe']})
+
+        self.assertEqual(413, response.status_code)
+        self.assertIn('batch of 3 passwords', response.get_json()['error'])
+
+    def test_ndjson_stream(self):
+        body = ''.join(json.dumps({'password': p}) + '\n' for p in ['chien', 'paf', 'flurbix', 'chien'])
+        response = self.client.post('/api/check/batch', data=body, content_type='application/x-ndjson')
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('application/x-ndjson', response.mimetype)
+        results = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual([True, False, False, True], [r['existsInDictionary'] for r in results])
+
+    def test_ndjson_stream_stops_at_refused_password(self):
+        passwords = ['chien', 'a' * (main.max_password_length + 1), 'paf']
+        body = ''.join(json.dumps({'password': p}) + '\n' for p in passwords)
+        response = self.client.post('/api/check/batch', data=body, content_type='application/x-ndjson')
+
+        results = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(2, len(results))
+        self.assertTrue(results[0]['existsInDictionary'])
+        self.assertIn('error', results[1])
+
+    def test_ndjson_stream_malformed_lines(self):
+        body = '{"password": "chien"}\nnot json\n{"passwd": "paf"}\n{"password": 12}\n{"password": "chien"}\n'
+        response = self.client.post('/api/check/batch', data=body, content_type='application/x-ndjson')
+
+        results = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(5, len(results))
+        self.assertTrue(results[0]['existsInDictionary'])
+        self.assertEqual(['malformed line 2', 'malformed line 3', 'malformed line 4'],
+                         [r['error'].split(':')[0] for r in results[1:4]])
+        self.assertTrue(results[4]['existsInDictionary'])
+
+
+class CheckEndpointTest(TestCase):
+    def setUp(self):
+        self.client = main.app.test_client()
+
+    def test_no_length_limit(self):
+        with patch.object(main, 'max_password_length', None):
+            response = self.client.post('/api/check', json={'password': '€' * 400})
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(sys.float_info.max, response.get_json()['bruteForceMs'])
+
+
+class AdminEndpointTest(TestCase):
+    def setUp(self):
+        self.client = main.app.test_client()
+        self.headers = {'Authorization': 'Bearer paf'}
+
+    def test_changes_in_background(self):
+        reloader = main.DictionaryReloader(main.dico_checker, main.resources, main.DictionaryChanges())
+        generation = main.dico_checker.generation
+        with patch.object(main, 'admin_token', 'paf'), patch.object(main, 'dictionary_reloader', reloader), \
+                patch.object(reloader, 'start'):
+            reload_response = self.client.post('/api/admin/dictionaries/reload', headers=self.headers)
+            delete_response = self.client.delete('/api/admin/dictionaries/flurbix.txt', headers=self.headers)
+            list_response = self.client.get('/api/admin/dictionaries', headers=self.headers)
+
+        # only requested: the worker thread applies them
+        self.assertEqual(202, reload_response.status_code)
+        self.assertEqual({'reloading': True, 'change': 1}, reload_response.get_json())
+        self.assertEqual(400, delete_response.status_code)
+        self.assertEqual(0, list_response.get_json()['appliedChange'])
+        self.assertEqual(generation, main.dico_checker.generation)
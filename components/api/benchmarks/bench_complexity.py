@@ -0,0 +1,46 @@
+# Compares the per-password complexity functions with the NumPy batch engine.
+#   python benchmarks/bench_complexity.py [--count 100000]
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from passwordChecker.batch_complexity import compute_complexity_batch  # noqa: E402
+from passwordChecker.complexity import password_length_score, compute_brute_force_ms  # noqa: E402
+
+_alphabet = string.ascii_letters + string.digits + string.punctuation + ' éèêëïîùüöçà'
+
+
+def generate_passwords(count: int, seed: int = 42):
+    rnd = random.Random(seed)
+    return [''.join(rnd.choices(_alphabet, k=rnd.randint(4, 24))) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the complexity metrics, per password against batched')
+    parser.add_argument('--count', type=int, default=100000, help='number of passwords [100000]')
+    args = parser.parse_args()
+
+    passwords = generate_passwords(args.count)
+
+    start = time.perf_counter()
+    for password in passwords:
+        password_length_score(password)
+        compute_brute_force_ms(password)
+    per_password = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = compute_complexity_batch(passwords)
+    batch.brute_force_ms
+    batched = time.perf_counter() - start
+
+    print(f'per password: {args.count / per_password:12.0f} passwords/s')
+    print(f'batched:      {args.count / batched:12.0f} passwords/s ({per_password / batched:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
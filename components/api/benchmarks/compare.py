@@ -0,0 +1,62 @@
+# Compares two reports of suite.py, typically the base and the head of a change, and fails on regressions.
+#   python benchmarks/compare.py base.json head.json [--threshold 10]
+import argparse
+import json
+import sys
+
+
+def compare(base: dict, head: dict, threshold: float = 10):
+    """
+    :param base: the benchmarks of the reference report
+    :type base: dict[str, dict]
+    :param head: the benchmarks of the report to check
+    :type head: dict[str, dict]
+    :param threshold: the percentage beyond which a slower throughput or a higher p95 latency is a regression [10]
+    :type threshold: float
+    :return: for each benchmark of both reports: its name, the throughput and p95 changes in percent, the allocation
+        peak change in KiB, and whether it regressed
+    :rtype: list[tuple]
+
+    >>> compare({'a': {'ops_per_s': 100, 'p95_us': 10, 'peak_kib': 1}}, {'a': {'ops_per_s': 80, 'p95_us': 10, 'peak_kib': 3}})
+    [('a', -20.0, 0.0, 2, True)]
+    """
+    rows = []
+    for name in base:
+        if name not in head:
+            continue
+        b, h = base[name], head[name]
+        throughput = 100 * (h['ops_per_s'] - b['ops_per_s']) / b['ops_per_s'] if b['ops_per_s'] else 0.0
+        p95 = 100 * (h['p95_us'] - b['p95_us']) / b['p95_us'] if b['p95_us'] else 0.0
+        rows.append((name, throughput, p95, h['peak_kib'] - b['peak_kib'], throughput < -threshold or p95 > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two benchmark reports')
+    parser.add_argument('base', help='the reference report')
+    parser.add_argument('head', help='the report to check')
+    parser.add_argument('--threshold', type=float, default=10,
+                        help='percentage of throughput loss or p95 latency increase tolerated [10]')
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+
+    print(f'base {base["meta"]["commit"]}  head {head["meta"]["commit"]}')
+    regressions = 0
+    for name, throughput, p95, peak, regressed in compare(base['benchmarks'], head['benchmarks'], args.threshold):
+        regressions += regressed
+        print(f'{name:32} ops/s {throughput:+7.1f}%  p95 {p95:+7.1f}%  peak {peak:+9.1f}KiB'
+              + ('  REGRESSION' if regressed else ''))
+    for name in head['benchmarks'].keys() - base['benchmarks'].keys():
+        print(f'{name:32} new')
+
+    if regressions:
+        print(f'{regressions} regressions beyond {args.threshold}%')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# Generated password corpora for the benchmarks. They are built from a seed (and the dictionaries for the realistic
+# ones), so two runs, on two commits, measure the same passwords.
+import os
+import random
+import string
+
+_leet = {'a': '@4', 'e': '3', 'i': '1!|', 'l': '1|', 'o': '0', 's': '$5', 't': '7+', 'g': '69', 'b': '8', 'z': '2'}
+# characters projected to several letters, or wiped as trailing characters, multiplying the candidates
+_ambiguous = '9061!|'
+_high_entropy = string.ascii_letters + string.digits + string.punctuation
+_unicode = 'éèêëïîùüöçàÉÈÇ' + 'ßøåñžłő' + 'пароль' + '密码' + '🔑🐶'
+
+
+def read_dictionary_words(dirname: str):
+    """
+    :param dirname: a dictionaries directory, one word per line files
+    :type dirname: str
+    :return: the words of all the files, in a stable order
+    :rtype: list[str]
+    """
+    words = []
+    for filename in sorted(os.listdir(dirname)):
+        with open(os.path.join(dirname, filename), 'r') as f:
+            words.extend(w.strip() for w in f if w.strip())
+    return words
+
+
+def common_words(rnd: random.Random, words: list, size: int):
+    """
+    Dictionary words as they are, the cheapest to find
+    """
+    return rnd.choices(words, k=size)
+
+
+def leet_variants(rnd: random.Random, words: list, size: int):
+    """
+    Dictionary words with substituted characters, some capitals and trailing numbers/punctuation
+    """
+    passwords = []
+    for word in rnd.choices(words, k=size):
+        chars = [rnd.choice(_leet[c]) if c in _leet and rnd.random() < 0.5 else c for c in word]
+        if chars and rnd.random() < 0.3:
+            chars[0] = chars[0].upper()
+        trailing = ''.join(rnd.choices(string.digits + '!@#$', k=rnd.randint(0, 4)))
+        passwords.append(''.join(chars) + trailing)
+    return passwords
+
+
+def ambiguous_strings(rnd: random.Random, size: int, min_length: int = 12, max_length: int = 40):
+    """
+    Long strings of ambiguous characters, the worst case of the dictionary search
+    """
+    return [''.join(rnd.choices(_ambiguous, k=rnd.randint(min_length, max_length))) for _ in range(size)]
+
+
+def random_passwords(rnd: random.Random, size: int, min_length: int = 12, max_length: int = 24):
+    """
+    High entropy passwords, as a password manager generates them
+    """
+    return [''.join(rnd.choices(_high_entropy, k=rnd.randint(min_length, max_length))) for _ in range(size)]
+
+
+def unicode_passwords(rnd: random.Random, words: list, size: int):
+    """
+    Dictionary words mixed with non ASCII characters, from accents to other scripts and emojis
+    """
+    return [word + ''.join(rnd.choices(_unicode, k=rnd.randint(1, 4))) for word in rnd.choices(words, k=size)]
+
+
+def generate_corpora(words: list, size: int, seed: int = 42):
+    """
+    :param words: the dictionary words the realistic corpora are drawn from
+    :type words: list[str]
+    :param size: the number of passwords per corpus
+    :type size: int
+    :param seed: the random seed [42]
+    :type seed: int
+    :return: the passwords, by corpus name
+    :rtype: dict[str, list[str]]
+    """
+    rnd = random.Random(seed)
+    return {
+        'common': common_words(rnd, words, size),
+        'leet': leet_variants(rnd, words, size),
+        'ambiguous': ambiguous_strings(rnd, size),
+        'random': random_passwords(rnd, size),
+        'unicode': unicode_passwords(rnd, words, size),
+    }
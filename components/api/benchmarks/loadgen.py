@@ -0,0 +1,185 @@
+# Load generator, to see how a running API holds when some of its clients abuse it: users post dictionary words and
+# their leetspeak variants (see corpora.py) at a human pace, while abusers post long strings of ambiguous characters,
+# a new one each time so no cache helps, as fast as they can. Each client has its own identity, sent as
+# X-Forwarded-For, so the rate limiter tells them apart on a local run. The users and abusers latencies are reported
+# apart, as JSON.
+#   RATE_LIMIT_PER_SECOND=5 RATE_LIMIT_CLIENT_HEADER=X-Forwarded-For flask run --with-threads
+#   python ../benchmarks/loadgen.py http://localhost:5000 --users 8 --abusers 4 --duration 10
+import argparse
+from collections import Counter
+import http.client
+import json
+import math
+import os
+import random
+from threading import Thread
+import time
+from urllib.parse import urlsplit
+
+from corpora import ambiguous_strings, common_words, leet_variants, read_dictionary_words
+
+_default_dictionaries = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'resources',
+                                     'dictionaries')
+
+
+def percentile(sorted_values: list, percent: float):
+    """
+    :return: the nearest rank percentile, None if there is no value
+    """
+    if not sorted_values:
+        return None
+    return sorted_values[max(1, math.ceil(len(sorted_values) * percent / 100)) - 1]
+
+
+def summarize(latencies: list, statuses: Counter, seconds: float):
+    """
+    :param latencies: the durations of the successful requests, in seconds
+    :type latencies: list[float]
+    :param statuses: the count of responses per HTTP status, 0 for the connection errors
+    :type statuses: Counter
+    :param seconds: how long the load ran
+    :type seconds: float
+    :return: the requests, their throughput per second and the p50/p95/p99 latencies of the successful ones, in ms
+    :rtype: dict
+    """
+    latencies = sorted(latencies)
+
+    def ms(percent):
+        value = percentile(latencies, percent)
+        return value * 1000 if value is not None else None
+
+    requests = sum(statuses.values())
+    return {
+        'requests': requests,
+        'per_s': requests / seconds if seconds > 0 else 0.0,
+        'p50_ms': ms(50),
+        'p95_ms': ms(95),
+        'p99_ms': ms(99),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+class LoadClient(Thread):
+    """
+    One client posting passwords to /api/check until the deadline, over its own connection
+    """
+
+    def __init__(self, url: str, client: str, next_password, think_s: float, deadline: float):
+        """
+        :param url: the API base url, such as http://localhost:5000
+        :type url: str
+        :param client: the client identity, sent as X-Forwarded-For
+        :type client: str
+        :param next_password: gives the next password to post
+        :type next_password: callable
+        :param think_s: the pause between two requests, in seconds
+        :type think_s: float
+        :param deadline: when to stop, in time.monotonic() seconds
+        :type deadline: float
+        """
+        super().__init__(daemon=True)
+        self.url = urlsplit(url)
+        self.client = client
+        self.next_password = next_password
+        self.think_s = think_s
+        self.deadline = deadline
+        self.latencies = []
+        self.statuses = Counter()
+
+    def run(self):
+        connection = http.client.HTTPConnection(self.url.hostname, self.url.port or 80, timeout=30)
+        headers = {'Content-Type': 'application/json', 'X-Forwarded-For': self.client}
+        while time.monotonic() < self.deadline:
+            body = json.dumps({'password': self.next_password()})
+            start = time.perf_counter()
+            try:
+                connection.request('POST', f'{self.url.path.rstrip("/")}/api/check', body, headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                status = 0
+            if status == 200:
+                self.latencies.append(time.perf_counter() - start)
+            self.statuses[status] += 1
+            if self.think_s:
+                time.sleep(self.think_s)
+        connection.close()
+
+
+def run_clients(clients: list):
+    """
+    :param clients: the clients, to be run at once
+    :type clients: list[LoadClient]
+    :return: how long they ran, in seconds
+    :rtype: float
+    """
+    start = time.monotonic()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    return time.monotonic() - start
+
+
+def group_summary(clients: list, seconds: float):
+    return summarize([latency for client in clients for latency in client.latencies],
+                     sum((client.statuses for client in clients), Counter()), seconds)
+
+
+def run_load(url: str, words: list, users: int = 8, abusers: int = 4, duration_s: float = 10, think_s: float = 0.5,
+             abuser_length: int = 128, seed: int = 42):
+    """
+    Run users and abusers at once against the API
+    :param url: the API base url, such as http://localhost:5000
+    :type url: str
+    :param words: the dictionary words the users passwords are drawn from
+    :type words: list[str]
+    :param users: the well behaved clients [8]
+    :type users: int
+    :param abusers: the clients posting adversarial passwords without pause [4]
+    :type abusers: int
+    :param duration_s: how long to run, in seconds [10]
+    :type duration_s: float
+    :param think_s: the pause of the users between two requests [0.5]
+    :type think_s: float
+    :param abuser_length: the length of the adversarial passwords [128, the longest the API accepts by default]
+    :type abuser_length: int
+    :param seed: the random seed [42]
+    :type seed: int
+    :return: the summary of the users and of the abusers requests (see summarize)
+    :rtype: dict
+    """
+    rnd = random.Random(seed)
+    user_passwords = common_words(rnd, words, 1000) + leet_variants(rnd, words, 1000)
+    deadline = time.monotonic() + duration_s
+    user_clients = [LoadClient(url, f'10.0.1.{i}', lambda: rnd.choice(user_passwords), think_s, deadline)
+                    for i in range(users)]
+    abuser_clients = [LoadClient(url, f'10.0.2.{i}', lambda: ambiguous_strings(rnd, 1, abuser_length, abuser_length)[0],
+                                 0, deadline)
+                      for i in range(abusers)]
+    seconds = run_clients(user_clients + abuser_clients)
+    return {'users': group_summary(user_clients, seconds), 'abusers': group_summary(abuser_clients, seconds)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load a running API with users and abusers, and report latencies')
+    parser.add_argument('url', help='the API base url, such as http://localhost:5000')
+    parser.add_argument('--dictionaries', default=_default_dictionaries,
+                        help='the dictionaries the users passwords are drawn from [app/resources/dictionaries]')
+    parser.add_argument('--users', type=int, default=8, help='well behaved clients [8]')
+    parser.add_argument('--abusers', type=int, default=4, help='clients posting adversarial passwords [4]')
+    parser.add_argument('--duration', type=float, default=10, help='seconds to run [10]')
+    parser.add_argument('--think', type=float, default=0.5, help='seconds of pause of the users between requests [0.5]')
+    parser.add_argument('--abuser-length', type=int, default=128, help='length of the adversarial passwords [128]')
+    parser.add_argument('--seed', type=int, default=42, help='random seed [42]')
+    args = parser.parse_args()
+
+    results = run_load(args.url, read_dictionary_words(args.dictionaries), args.users, args.abusers, args.duration,
+                       args.think, args.abuser_length, args.seed)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,417 @@
+# Load test of the HTTP API: starts the app of main.py locally (Flask dev server, gunicorn or uWSGI, or in process
+# through the Flask test client), replays a mix of generated passwords (see corpora.py) against /api/check from
+# concurrent clients, for each combination of worker processes and threads, and reports the throughput, the
+# p50/p95/p99 latencies and the memory of each server process, sampled from /proc, into a JSON report.
+#   python benchmarks/loadtest.py --server gunicorn --workers 1,2,4 --threads 1,4 --slo-p99-ms 100 -o load.json
+# The report has the layout of the suite.py ones, so two of them are compared the same way:
+#   python benchmarks/compare.py base-load.json head-load.json
+import argparse
+from collections import Counter
+import json
+import os
+import platform
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+from threading import Event, Thread
+import time
+import urllib.error
+import urllib.request
+
+from corpora import generate_corpora, read_dictionary_words
+from loadgen import LoadClient, group_summary, run_clients
+from suite import _commit
+
+_default_app_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app')
+_servers = ['flask', 'gunicorn', 'uwsgi', 'testclient']
+
+
+def parse_mix(mix: str):
+    """
+    :param mix: the weight of each corpus, such as 'common:5,leet:3,ambiguous:1'
+    :type mix: str
+    :return: the weights, by corpus name
+    :rtype: dict[str, float]
+    """
+    weights = {}
+    for item in mix.split(','):
+        name, _, weight = item.partition(':')
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def replayed_passwords(words: list, mix: dict, size: int, seed: int = 42):
+    """
+    :param words: the dictionary words the realistic corpora are drawn from
+    :type words: list[str]
+    :param mix: the weight of each corpus (see corpora.generate_corpora for their names)
+    :type mix: dict[str, float]
+    :param size: the passwords to draw
+    :type size: int
+    :param seed: the random seed [42]
+    :type seed: int
+    :return: the passwords, drawn from the corpora according to their weight
+    :rtype: list[str]
+    """
+    corpora = generate_corpora(words, size, seed)
+    unknown = set(mix) - set(corpora)
+    if unknown:
+        raise ValueError(f'Unknown corpora {sorted(unknown)}, among {sorted(corpora)}')
+    rnd = random.Random(seed)
+    names = list(mix)
+    return [rnd.choice(corpora[name]) for name in rnd.choices(names, weights=[mix[n] for n in names], k=size)]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def server_command(server: str, port: int, workers: int, threads: int):
+    """
+    :return: the command serving main.py from the app directory
+    :rtype: list[str]
+    """
+    if server == 'flask':
+        # the dev server forks a process per request or runs a thread per request, not both
+        if workers > 1 and threads > 1:
+            raise ValueError('the Flask dev server runs either several processes or threads')
+        return [sys.executable, '-c', 'from werkzeug.serving import run_simple; import main; '
+                                      f'run_simple("127.0.0.1", {port}, main.app, threaded={threads > 1}, '
+                                      f'processes={workers})']
+    if server == 'gunicorn':
+        return ['gunicorn', '--workers', str(workers), '--threads', str(threads), '--bind', f'127.0.0.1:{port}',
+                '--log-level', 'warning', 'main:app']
+    if server == 'uwsgi':
+        # as in the Docker image: the app is loaded by the master, then the workers are forked
+        return ['uwsgi', '--http-socket', f'127.0.0.1:{port}', '--wsgi-file', 'main.py', '--callable', 'app',
+                '--master', '--processes', str(workers), '--threads', str(threads), '--die-on-term',
+                '--disable-logging']
+    raise ValueError(f'Unknown server {server}, among {_servers}')
+
+
+def _wait_ready(url: str, process: subprocess.Popen, timeout_s: float):
+    """
+    Wait for the server to answer a check, the dictionaries being loaded at start up
+    """
+    deadline = time.monotonic() + timeout_s
+    request = urllib.request.Request(f'{url}/api/check', data=b'{"password": "paf"}',
+                                     headers={'Content-Type': 'application/json'})
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'the server exited with {process.returncode}')
+        try:
+            with urllib.request.urlopen(request, timeout=5):
+                return
+        except (OSError, urllib.error.URLError):
+            time.sleep(0.2)
+    raise RuntimeError(f'the server did not answer within {timeout_s}s')
+
+
+def _stop(process: subprocess.Popen):
+    # the workers are in the server session, and go with it
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(10)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+    except ProcessLookupError:
+        pass
+
+
+def process_tree(pid: int):
+    """
+    :return: the process and its descendants, from /proc
+    :rtype: list[int]
+    """
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # the command name, in parentheses, may contain spaces
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    tree = [pid]
+    for p in tree:
+        tree.extend(children.get(p, ()))
+    return tree
+
+
+def process_memory(pid: int):
+    """
+    :return: the resident memory of the process, and its proportional share of the pages shared with others (e.g.
+        the dictionaries of the forked workers), in KiB; None when unknown
+    :rtype: tuple
+    """
+    rss = pss = None
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            rss = next((int(line.split()[1]) for line in f if line.startswith('VmRSS:')), None)
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            pss = next((int(line.split()[1]) for line in f if line.startswith('Pss:')), None)
+    except OSError:
+        pass
+    return rss, pss
+
+
+class MemorySampler(Thread):
+    """
+    Samples the memory of a process and its descendants, keeping the largest values of each
+    """
+
+    def __init__(self, pid: int, interval_s: float = 0.5):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval_s = interval_s
+        self.peaks = {}
+        self.peak_total_pss = 0
+        self._stopped = Event()
+
+    def sample(self):
+        total_pss = 0
+        for pid in process_tree(self.pid):
+            rss, pss = process_memory(pid)
+            if rss is None:
+                continue
+            peak_rss, peak_pss = self.peaks.get(pid, (0, 0))
+            self.peaks[pid] = (max(peak_rss, rss), max(peak_pss, pss or 0))
+            total_pss += pss or 0
+        # the processes may come and go (the Flask dev server forks one per request): only those alive at once add up
+        self.peak_total_pss = max(self.peak_total_pss, total_pss)
+
+    def run(self):
+        while not self._stopped.is_set():
+            self.sample()
+            self._stopped.wait(self.interval_s)
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+        self.sample()
+
+    def report(self):
+        """
+        :return: the peak rss_kib and pss_kib of each process, and the peak of their total pss, the memory of the server
+        :rtype: dict
+        """
+        processes = [{'pid': pid, 'rss_kib': rss, 'pss_kib': pss} for pid, (rss, pss) in sorted(self.peaks.items())]
+        return {'processes': processes, 'total_pss_kib': self.peak_total_pss}
+
+
+class InProcessClient(Thread):
+    """
+    A client posting to the app through the Flask test client, without network, with the interface of LoadClient
+    """
+
+    def __init__(self, app, next_password, deadline: float):
+        super().__init__(daemon=True)
+        self.client = app.test_client()
+        self.next_password = next_password
+        self.deadline = deadline
+        self.latencies = []
+        self.statuses = Counter()
+
+    def run(self):
+        while time.monotonic() < self.deadline:
+            password = self.next_password()
+            start = time.perf_counter()
+            status = self.client.post('/api/check', json={'password': password}).status_code
+            if status == 200:
+                self.latencies.append(time.perf_counter() - start)
+            self.statuses[status] += 1
+
+
+def run_load(clients: list, warmup_s: float):
+    """
+    :param clients: the clients, built by a function of their deadline
+    :type clients: callable
+    :param warmup_s: the seconds of load before the measured one, to fill the caches
+    :type warmup_s: float
+    :return: the summary of the measured load (see loadgen.summarize)
+    :rtype: dict
+    """
+    if warmup_s:
+        run_clients(clients(time.monotonic() + warmup_s))
+    measured = clients(None)
+    return group_summary(measured, run_clients(measured))
+
+
+def load_test(server: str, workers: int, threads: int, passwords: list, concurrency: int = 8,
+              duration_s: float = 10, warmup_s: float = 2, env: dict = None, ready_timeout_s: float = 300):
+    """
+    Start the app, load it, stop it
+    :param server: 'flask', 'gunicorn', 'uwsgi' or 'testclient'
+    :type server: str
+    :param workers: the server worker processes
+    :type workers: int
+    :param threads: the threads of each worker
+    :type threads: int
+    :param passwords: the passwords the clients pick from
+    :type passwords: list[str]
+    :param concurrency: the clients posting at once, each one as soon as its previous request was answered [8]
+    :type concurrency: int
+    :param duration_s: the seconds of measured load [10]
+    :type duration_s: float
+    :param warmup_s: the seconds of load before [2]
+    :type warmup_s: float
+    :param env: environment variables of the app, such as {'MIN_EMBEDDED_LENGTH': '4'} [None]
+    :type env: dict
+    :param ready_timeout_s: the seconds the app has to load its dictionaries [300]
+    :type ready_timeout_s: float
+    :return: the throughput (ops_per_s), latencies (p50_us, p95_us, p99_us), statuses, and the memory of the
+        server processes, its total as peak_kib
+    :rtype: dict
+    """
+    rnd = random.Random(42)
+
+    def next_password():
+        return rnd.choice(passwords)
+
+    if server == 'testclient':
+        if workers > 1:
+            raise ValueError('the test client runs the app in this process only')
+        os.environ.update(env or {})
+        import main
+        sampler = MemorySampler(os.getpid())
+
+        def clients(deadline):
+            deadline = deadline or time.monotonic() + duration_s
+            return [InProcessClient(main.app, next_password, deadline) for _ in range(concurrency)]
+    else:
+        port = _free_port()
+        url = f'http://127.0.0.1:{port}'
+        process = subprocess.Popen(server_command(server, port, workers, threads), env={**os.environ, **(env or {})},
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+        try:
+            _wait_ready(url, process, ready_timeout_s)
+        except RuntimeError:
+            _stop(process)
+            raise
+        sampler = MemorySampler(process.pid)
+
+        def clients(deadline):
+            deadline = deadline or time.monotonic() + duration_s
+            return [LoadClient(url, f'10.0.3.{i}', next_password, 0, deadline) for i in range(concurrency)]
+
+    sampler.start()
+    try:
+        summary = run_load(clients, warmup_s)
+    finally:
+        sampler.stop()
+        if server != 'testclient':
+            _stop(process)
+
+    def us(ms):
+        return ms * 1000 if ms is not None else None
+
+    memory = sampler.report()
+    return {
+        'server': server,
+        'workers': workers,
+        'threads': threads,
+        'concurrency': concurrency,
+        'requests': summary['requests'],
+        'ops_per_s': summary['per_s'],
+        'p50_us': us(summary['p50_ms']),
+        'p95_us': us(summary['p95_ms']),
+        'p99_us': us(summary['p99_ms']),
+        'statuses': summary['statuses'],
+        'processes': memory['processes'],
+        'peak_kib': memory['total_pss_kib'],
+    }
+
+
+def _ints(values: str):
+    return [int(v) for v in values.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the HTTP API for several worker and thread counts')
+    parser.add_argument('-o', '--output', default=None, help='the JSON report file')
+    parser.add_argument('--app-dir', default=_default_app_dir,
+                        help='the app directory whose code is load tested, e.g. from a worktree of another commit')
+    parser.add_argument('--server', choices=_servers, default='flask', help='how the app is served [flask]')
+    parser.add_argument('--workers', type=_ints, default=[1], help='worker process counts, comma separated [1]')
+    parser.add_argument('--threads', type=_ints, default=[1], help='thread counts per worker, comma separated [1]')
+    parser.add_argument('--concurrency', type=int, default=8, help='clients posting at once [8]')
+    parser.add_argument('--duration', type=float, default=10, help='seconds of measured load per run [10]')
+    parser.add_argument('--warmup', type=float, default=2, help='seconds of load before each measure [2]')
+    parser.add_argument('--mix', default='common:5,leet:3,random:1,ambiguous:1,unicode:0',
+                        help='weight of each corpus in the replayed passwords [common:5,leet:3,random:1,ambiguous:1,'
+                             'unicode:0]')
+    parser.add_argument('--size', type=int, default=2000, help='distinct passwords per corpus [2000]')
+    parser.add_argument('--seed', type=int, default=42, help='corpora random seed [42]')
+    parser.add_argument('--env', action='append', default=[],
+                        help='KEY=VALUE environment variable of the app, such as MIN_EMBEDDED_LENGTH=4, can be repeated')
+    parser.add_argument('--slo-p99-ms', type=float, default=None,
+                        help='the p99 latency objective: a run beyond it, or with failed requests, misses it, and the '
+                             'command exits with 1')
+    args = parser.parse_args()
+
+    if args.server in ('gunicorn', 'uwsgi') and shutil.which(args.server) is None:
+        parser.error(f'{args.server} is not installed')
+    app_dir = os.path.abspath(args.app_dir)
+    output = os.path.abspath(args.output) if args.output else None
+    sys.path.insert(0, app_dir)
+    os.chdir(app_dir)
+
+    mix = parse_mix(args.mix)
+    env = dict(item.split('=', 1) for item in args.env)
+    passwords = replayed_passwords(read_dictionary_words('resources/dictionaries'), mix, args.size, args.seed)
+    meta = {
+        'commit': _commit(app_dir),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'server': args.server,
+        'concurrency': args.concurrency,
+        'duration': args.duration,
+        'warmup': args.warmup,
+        'mix': mix,
+        'size': args.size,
+        'seed': args.seed,
+        'env': env,
+        'slo_p99_ms': args.slo_p99_ms,
+    }
+    print(f'commit {meta["commit"]}, python {meta["python"]}, {meta["cpu_count"]} cpus, {args.server}')
+
+    results = {}
+    missed = 0
+    for workers in args.workers:
+        for threads in args.threads:
+            name = f'{args.server}/w{workers}/t{threads}'
+            try:
+                result = load_test(args.server, workers, threads, passwords, args.concurrency, args.duration,
+                                   args.warmup, env)
+            except (ValueError, RuntimeError) as e:
+                print(f'{name:24} skipped: {e}')
+                continue
+            if args.slo_p99_ms is not None:
+                result['slo_met'] = result['p99_us'] is not None and result['p99_us'] <= args.slo_p99_ms * 1000 \
+                    and set(result['statuses']) == {'200'}
+                missed += not result['slo_met']
+            results[name] = result
+            print(f'{name:24} {result["ops_per_s"]:9.1f} req/s  p50 {(result["p50_us"] or 0) / 1000:8.1f}ms  '
+                  f'p95 {(result["p95_us"] or 0) / 1000:8.1f}ms  p99 {(result["p99_us"] or 0) / 1000:8.1f}ms  '
+                  f'{len(result["processes"])} processes {result["peak_kib"] / 1024:7.1f}MiB'
+                  + ('' if result.get('slo_met', True) else '  SLO missed'))
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump({'meta': meta, 'benchmarks': results}, f, indent=2)
+        print(f'Report written to {output}')
+    sys.exit(1 if missed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+# Benchmark suite: throughput, latency percentiles and allocation peaks of the dictionary loading and checks, on
+# generated corpora (see corpora.py), written as a JSON report.
+#   python benchmarks/suite.py -o head.json
+# To compare with another commit, check it out aside and run the same suite against its code:
+#   git worktree add /tmp/base <commit>
+#   python benchmarks/suite.py --app-dir /tmp/base/components/api/app -o base.json
+#   python benchmarks/compare.py base.json head.json
+import argparse
+from contextlib import redirect_stdout
+import json
+import os
+import platform
+import signal
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from corpora import generate_corpora, read_dictionary_words
+
+_default_app_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app')
+
+
+# not an Exception, so it goes through the error handlers (e.g. Flask answering 500) up to measure
+class _Timeout(BaseException):
+    pass
+
+
+def _raise_timeout(signum, frame):
+    raise _Timeout()
+
+
+def _call(operation, x, timeout_s: float):
+    """
+    :return: None, 'error' or 'timeout'
+    """
+    signal.setitimer(signal.ITIMER_REAL, timeout_s)
+    try:
+        operation(x)
+    except _Timeout:
+        return 'timeout'
+    except Exception:
+        return 'error'
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    return None
+
+
+def _percentile(sorted_values: list, percent: float):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * percent / 100))]
+
+
+def measure(operation, inputs: list, repeat: int = 1, memory_sample: int = 100, timeout_s: float = 1,
+            max_timeouts: int = 5):
+    """
+    Time an operation over inputs, then measure its allocations on a sample of them, under tracemalloc.
+    An operation running beyond the timeout is interrupted, so a pathological input cannot hang the suite
+    :param operation: called with each input
+    :type operation: callable
+    :param inputs: the inputs
+    :type inputs: list
+    :param repeat: the passes over the inputs [1]
+    :type repeat: int
+    :param memory_sample: the inputs whose allocations are traced, 0 for none [100]
+    :type memory_sample: int
+    :param timeout_s: the time after which an operation is interrupted [1]
+    :type timeout_s: float
+    :param max_timeouts: the interrupted operations after which the benchmark is given up [5]
+    :type max_timeouts: int
+    :return: ops, ops_per_s, p50_us, p95_us, p99_us, max_us, the largest allocation peak of an operation (peak_kib),
+        the number of operations which raised an error or were interrupted, and whether the benchmark was given up
+    :rtype: dict
+    """
+    signal.signal(signal.SIGALRM, _raise_timeout)
+    latencies = []
+    outcomes = {'error': 0, 'timeout': 0}
+    for x in [x for _ in range(repeat) for x in inputs]:
+        if outcomes['timeout'] >= max_timeouts:
+            break
+        start = time.perf_counter_ns()
+        outcome = _call(operation, x, timeout_s)
+        latencies.append(time.perf_counter_ns() - start)
+        if outcome:
+            outcomes[outcome] += 1
+
+    peak = 0
+    if memory_sample and outcomes['timeout'] < max_timeouts:
+        tracemalloc.start()
+        for x in inputs[:memory_sample]:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            _call(operation, x, timeout_s)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'ops': len(latencies),
+        'ops_per_s': len(latencies) / (sum(latencies) / 1e9) if sum(latencies) else 0.0,
+        'p50_us': _percentile(latencies, 50) / 1000,
+        'p95_us': _percentile(latencies, 95) / 1000,
+        'p99_us': _percentile(latencies, 99) / 1000,
+        'max_us': latencies[-1] / 1000,
+        'peak_kib': peak / 1024,
+        'errors': outcomes['error'],
+        'timeouts': outcomes['timeout'],
+        'given_up': outcomes['timeout'] >= max_timeouts,
+    }
+
+
+def _commit(app_dir: str):
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=app_dir, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _create_dictionary_checker():
+    # the way the API loads its dictionaries, falling back on the plain loading of the commits before the service
+    try:
+        from passwordChecker.service import create_dictionary_checker
+        return create_dictionary_checker('resources')
+    except ImportError:
+        from passwordChecker.dictionary import DictionaryChecker
+        from passwordChecker.substitute import CharacterProjector, ScramblingParams
+        dico_checker = DictionaryChecker(CharacterProjector(scrambling_params=ScramblingParams(max_trailing=4)))
+        dico_checker.load_all_dictionaries('resources/dictionaries')
+        return dico_checker
+
+
+def run_suite(size: int = 2000, seed: int = 42, repeat: int = 3, api_size: int = 500, selected: str = None,
+              report=print):
+    """
+    Run the benchmarks, from the app directory (the resources are relative to it)
+    :param size: the passwords per corpus [2000]
+    :type size: int
+    :param seed: the corpora random seed [42]
+    :type seed: int
+    :param repeat: the passes over each corpus [3]
+    :type repeat: int
+    :param api_size: the passwords per corpus posted to the Flask endpoint [500]
+    :type api_size: int
+    :param selected: only run the benchmarks whose name contains it [None]
+    :type selected: str
+    :param report: called with each result line
+    :type report: callable
+    :return: the results, by benchmark name
+    :rtype: dict[str, dict]
+    """
+    from passwordChecker.robustness import compute_robustness
+
+    results = {}
+
+    def run(name, operation, inputs, **kwargs):
+        if selected and selected not in name:
+            return
+        # the loading reports would be mixed with the results
+        with redirect_stdout(sys.stderr):
+            result = results[name] = measure(operation, inputs, **kwargs)
+        report(f'{name:32} {result["ops_per_s"]:12.0f} ops/s  p50 {result["p50_us"]:9.1f}us  '
+               f'p95 {result["p95_us"]:9.1f}us  p99 {result["p99_us"]:9.1f}us  peak {result["peak_kib"]:9.1f}KiB'
+               + (f'  {result["errors"]} errors' if result['errors'] else '')
+               + (f'  {result["timeouts"]} timeouts' if result['timeouts'] else '')
+               + ('  given up' if result['given_up'] else ''))
+
+    run('load_all_dictionaries', lambda _: _create_dictionary_checker(), [None] * repeat, memory_sample=1,
+        timeout_s=60)
+
+    with redirect_stdout(sys.stderr):
+        dico_checker = _create_dictionary_checker()
+    corpora = generate_corpora(read_dictionary_words('resources/dictionaries'), size, seed)
+
+    for corpus, passwords in corpora.items():
+        run(f'contains/{corpus}', dico_checker.contains, passwords, repeat=repeat)
+    for corpus, passwords in corpora.items():
+        run(f'compute_robustness/{corpus}', lambda p: compute_robustness(p, dico_checker), passwords, repeat=repeat)
+
+    if not selected or 'api_check' in selected:
+        with redirect_stdout(sys.stderr):
+            import main
+        client = main.app.test_client()
+
+        def post_check(password):
+            response = client.post('/api/check', json={'password': password})
+            if response.status_code != 200:
+                raise ValueError(f'status {response.status_code}')
+
+        for corpus, passwords in corpora.items():
+            run(f'api_check/{corpus}', post_check, passwords[:api_size])
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the dictionary loading and the password checks')
+    parser.add_argument('-o', '--output', default=None, help='the JSON report file')
+    parser.add_argument('--app-dir', default=_default_app_dir,
+                        help='the app directory whose code is benchmarked, e.g. from a worktree of another commit')
+    parser.add_argument('--size', type=int, default=2000, help='passwords per corpus [2000]')
+    parser.add_argument('--api-size', type=int, default=500, help='passwords per corpus posted to the API [500]')
+    parser.add_argument('--seed', type=int, default=42, help='corpora random seed [42]')
+    parser.add_argument('--repeat', type=int, default=3, help='passes over each corpus [3]')
+    parser.add_argument('-k', '--select', default=None, help='only run the benchmarks whose name contains it')
+    args = parser.parse_args()
+
+    app_dir = os.path.abspath(args.app_dir)
+    output = os.path.abspath(args.output) if args.output else None
+    sys.path.insert(0, app_dir)
+    os.chdir(app_dir)
+
+    meta = {
+        'commit': _commit(app_dir),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'size': args.size,
+        'api_size': args.api_size,
+        'seed': args.seed,
+        'repeat': args.repeat,
+    }
+    print(f'commit {meta["commit"]}, python {meta["python"]}, {meta["cpu_count"]} cpus')
+    results = run_suite(args.size, args.seed, args.repeat, args.api_size, args.select)
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump({'meta': meta, 'benchmarks': results}, f, indent=2)
+        print(f'Report written to {output}')
+
+
+if __name__ == '__main__':
+    main()
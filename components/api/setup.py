@@ -4,8 +4,12 @@ setup(
     name='Password Checker',
     version='1.0',
     long_description=__doc__,
-    packages=find_packages(),
+    packages=find_packages('app'),
+    package_dir={'': 'app'},
     include_package_data=True,
     zip_safe=False,
-    install_requires=['Flask']
+    install_requires=['Flask', 'numpy'],
+    entry_points={
+        'console_scripts': ['password-checker=passwordChecker.cli:main'],
+    }
 )